@@ -1,5 +1,7 @@
+import dbt.adapters.default as default
 import dbt.adapters.postgres as postgres
 
 
 def reset():
     postgres.connection_cache = {}
+    default.relation_cache.clear()
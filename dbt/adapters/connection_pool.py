@@ -0,0 +1,329 @@
+import json
+import multiprocessing
+import threading
+import time
+
+import dbt.exceptions
+
+from dbt.logger import GLOBAL_LOGGER as logger
+
+
+# how long to wait for a connection to be released once every connection
+# in the pool is in use
+DEFAULT_ACQUIRE_TIMEOUT = 300
+
+# idle connections are closed after this long, and connections that have
+# been idle for more than DEFAULT_CHECK_AFTER are checked before they're
+# handed out again
+DEFAULT_MAX_IDLE_TIME = 600
+DEFAULT_CHECK_AFTER = 30
+
+pools_lock = multiprocessing.Lock()
+pools = {}
+
+
+def get_credentials(profile):
+    credentials = profile.copy()
+
+    credentials.pop('type', None)
+    credentials.pop('threads', None)
+
+    return credentials
+
+
+def get_pool_key(adapter, profile):
+    # connections store their credentials rather than the whole profile, so
+    # a profile and its credentials must map to the same pool
+    return (adapter.type(),
+            json.dumps(get_credentials(profile), sort_keys=True, default=str))
+
+
+def get_max_connections(profile):
+    # we add a magic number, 2 because there are overhead connections,
+    # one for pre- and post-run hooks and other misc operations that occur
+    # before the run starts, and one for integration tests.
+    return profile.get('threads', 1) + 2
+
+
+def get_pool(adapter, profile):
+    key = get_pool_key(adapter, profile)
+
+    with pools_lock:
+        pool = pools.get(key)
+
+        if pool is None:
+            pool = ConnectionPool(adapter, profile,
+                                  get_max_connections(profile))
+            pools[key] = pool
+
+        elif 'threads' in profile:
+            pool.max_connections = get_max_connections(profile)
+
+        return pool
+
+
+def find_pool(adapter, profile):
+    """returns the pool that `get_pool` returned for `profile`. Unlike
+    `get_pool`, this never creates a pool, so it's safe to call with the
+    credentials of a connection that might have outlived its pool."""
+    key = get_pool_key(adapter, profile)
+
+    with pools_lock:
+        pool = pools.get(key)
+
+    if pool is None:
+        raise dbt.exceptions.InternalException(
+            'Tried to use a {} connection whose pool no longer exists.'
+            .format(adapter.type()))
+
+    return pool
+
+
+def close_quietly(connection):
+    handle = connection.get('handle')
+
+    if handle is not None:
+        try:
+            handle.close()
+        except Exception as e:
+            logger.debug('Error closing connection: {}'.format(str(e)))
+
+    connection['state'] = 'closed'
+
+
+def remove_pools():
+    with pools_lock:
+        to_return = list(pools.values())
+        pools.clear()
+
+        return to_return
+
+
+class ConnectionPool(object):
+    """
+    The connections opened by an adapter for a single profile. Connections
+    are checked out by name, and named connections are handed back to the
+    pool with `release`, after which they can be reused under another name.
+
+    If every connection is in use, `acquire` waits for one to be released
+    (up to `acquire_timeout` seconds) rather than failing. Connections that
+    have sat idle for a while are checked with the adapter before they're
+    reused, and closed once they've been idle for `max_idle_time` seconds.
+    """
+
+    def __init__(self, adapter, profile, max_connections,
+                 acquire_timeout=DEFAULT_ACQUIRE_TIMEOUT,
+                 max_idle_time=DEFAULT_MAX_IDLE_TIME,
+                 check_after=DEFAULT_CHECK_AFTER):
+        self.adapter = adapter
+        self.profile = profile.copy()
+        self.max_connections = max_connections
+        self.acquire_timeout = acquire_timeout
+        self.max_idle_time = max_idle_time
+        self.check_after = check_after
+
+        # connections are acquired and released from the runner's threads
+        self.condition = threading.Condition(threading.Lock())
+
+        self.in_use = {}
+
+        # (connection, released_at) of the open connections nobody is using,
+        # most recently released last
+        self.available = []
+
+        # connections that are in use, available, or being opened
+        self.num_allocated = 0
+
+        self.num_acquired = 0
+        self.num_opened = 0
+        self.num_waits = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.num_dead = 0
+        self.num_evicted = 0
+
+    def get_in_use(self, name):
+        with self.condition:
+            return self.in_use.get(name)
+
+    def set_in_use(self, name, connection):
+        with self.condition:
+            self.in_use[name] = connection
+
+    def acquire(self, name):
+        start_time = time.time()
+
+        while True:
+            connection, idle_time = self.checkout(name, start_time)
+
+            if connection is None:
+                connection = self.open(name)
+                break
+
+            if idle_time < self.check_after or \
+               self.adapter.is_connection_alive(connection):
+                break
+
+            logger.debug('Discarding a dead connection from the pool.')
+            self.discard(connection)
+
+            with self.condition:
+                self.num_dead += 1
+
+        connection['name'] = name
+
+        wait_time = time.time() - start_time
+
+        with self.condition:
+            self.in_use[name] = connection
+            self.num_acquired += 1
+            self.total_wait_time += wait_time
+            self.max_wait_time = max(self.max_wait_time, wait_time)
+
+        return connection
+
+    def checkout(self, name, start_time):
+        """returns an (available connection, idle time) pair, or (None, None)
+        if the caller should open a new connection. Blocks until one of the
+        two is possible."""
+        deadline = start_time + self.acquire_timeout
+        waited = False
+
+        # closing a connection can mean waiting on the network, so evicted
+        # connections are only closed once the condition has been released
+        to_close = []
+
+        try:
+            with self.condition:
+                while True:
+                    to_close.extend(self.evict_idle())
+
+                    if len(self.available) > 0:
+                        logger.debug('Re-using an available connection from '
+                                     'the pool.')
+                        connection, released_at = self.available.pop()
+                        return connection, time.time() - released_at
+
+                    if self.num_allocated < self.max_connections:
+                        logger.debug('Opening a new connection ({} currently '
+                                     'allocated)'.format(self.num_allocated))
+                        self.num_allocated += 1
+                        return None, None
+
+                    remaining = deadline - time.time()
+
+                    if remaining <= 0:
+                        raise dbt.exceptions.InternalException(
+                            'Timed out after {}s waiting for a connection for '
+                            '"{}": the maximum number of connections ({}) are '
+                            'already allocated!'.format(self.acquire_timeout,
+                                                        name,
+                                                        self.max_connections))
+
+                    if not waited:
+                        logger.debug('Waiting for a connection to be released '
+                                     'for "{}".'.format(name))
+                        self.num_waits += 1
+                        waited = True
+
+                    self.condition.wait(remaining)
+        finally:
+            for connection in to_close:
+                close_quietly(connection)
+
+    def open(self, name):
+        try:
+            connection = self.adapter.open_new_connection(self.profile, name)
+        except BaseException:
+            with self.condition:
+                self.num_allocated -= 1
+                self.condition.notify()
+            raise
+
+        with self.condition:
+            self.num_opened += 1
+
+        return connection
+
+    def release(self, name):
+        with self.condition:
+            connection = self.in_use.pop(name, None)
+
+            if connection is None:
+                return
+
+            if connection.get('state') == 'open':
+                connection['name'] = None
+                self.available.append((connection, time.time()))
+            else:
+                self.num_allocated -= 1
+
+            self.condition.notify()
+
+    def discard(self, connection):
+        close_quietly(connection)
+
+        with self.condition:
+            self.num_allocated -= 1
+            self.condition.notify()
+
+    def evict_idle(self):
+        """takes the connections that have been idle for too long out of the
+        pool, and returns them. The caller is responsible for closing them.
+        Must be called with the condition held."""
+        # available connections are ordered by release time, so the idlest
+        # are at the front
+        now = time.time()
+        evicted = []
+
+        while len(self.available) > 0:
+            connection, released_at = self.available[0]
+
+            if now - released_at < self.max_idle_time:
+                break
+
+            logger.debug('Closing a connection that was idle for {:0.0f}s.'
+                         .format(now - released_at))
+
+            self.available.pop(0)
+            self.num_evicted += 1
+            self.num_allocated -= 1
+
+            evicted.append(connection)
+
+        return evicted
+
+    def get_stats(self):
+        with self.condition:
+            if self.num_acquired > 0:
+                mean_wait_time = self.total_wait_time / self.num_acquired
+            else:
+                mean_wait_time = 0.0
+
+            return {
+                'acquired': self.num_acquired,
+                'opened': self.num_opened,
+                'waits': self.num_waits,
+                'mean_wait_time': mean_wait_time,
+                'max_wait_time': self.max_wait_time,
+                'dead': self.num_dead,
+                'evicted': self.num_evicted,
+            }
+
+    def cleanup(self):
+        with self.condition:
+            for name, connection in self.in_use.items():
+                if connection.get('state') != 'closed':
+                    logger.debug("Connection '{}' was left open."
+                                 .format(name))
+                else:
+                    logger.debug("Connection '{}' was properly closed."
+                                 .format(name))
+
+            # garbage collect, but don't close them in case someone
+            # still has a handle
+            self.in_use = {}
+            self.available = []
+            self.num_allocated = 0
+
+        logger.debug("Connection pool stats: {}".format(self.get_stats()))
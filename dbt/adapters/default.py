@@ -1,22 +1,22 @@
 import copy
-import multiprocessing
 import re
 import time
 import yaml
 
 from contextlib import contextmanager
 
+import dbt.adapters.connection_pool
 import dbt.exceptions
 import dbt.flags
 
+from dbt.adapters.relation_cache import RelationCache
 from dbt.contracts.connection import validate_connection
 from dbt.logger import GLOBAL_LOGGER as logger
 from dbt.schema import Column
 
 
-lock = multiprocessing.Lock()
-connections_in_use = {}
-connections_available = []
+# relations and columns known to exist, reset at the start of each invocation
+relation_cache = RelationCache()
 
 
 class DefaultAdapter(object):
@@ -74,14 +74,19 @@ class DefaultAdapter(object):
     @classmethod
     def drop(cls, profile, relation, relation_type, model_name=None):
         if relation_type == 'view':
-            return cls.drop_view(profile, relation, model_name)
+            to_return = cls.drop_view(profile, relation, model_name)
         elif relation_type == 'table':
-            return cls.drop_table(profile, relation, model_name)
+            to_return = cls.drop_table(profile, relation, model_name)
         else:
             raise RuntimeError(
                 "Invalid relation_type '{}'"
                 .format(relation_type))
 
+        relation_cache.drop_relation(cls.get_default_schema(profile),
+                                     relation)
+
+        return to_return
+
     @classmethod
     def drop_view(cls, profile, view, model_name):
         schema = cls.get_default_schema(profile)
@@ -123,6 +128,8 @@ class DefaultAdapter(object):
 
         connection, cursor = cls.add_query(profile, sql, model_name)
 
+        relation_cache.rename_relation(schema, from_name, to_name)
+
     @classmethod
     def execute_model(cls, profile, model):
         parts = re.split(r'-- (DBT_OPERATION .*)', model.get('wrapped_sql'))
@@ -174,6 +181,52 @@ class DefaultAdapter(object):
     @classmethod
     def get_columns_in_table(cls, profile, schema_name, table_name,
                              model_name=None):
+        # unqualified tables (eg. temporary tables) aren't cached
+        if schema_name is None:
+            return cls.query_for_columns_in_table(
+                profile, schema_name, table_name, model_name)
+
+        if not relation_cache.has_columns(schema_name):
+            relation_cache.set_schema_columns(
+                schema_name,
+                cls.query_for_columns(profile, schema_name, model_name))
+
+        columns = relation_cache.get_columns(schema_name, table_name)
+
+        if columns is None:
+            columns = cls.query_for_columns_in_table(
+                profile, schema_name, table_name, model_name)
+            relation_cache.set_columns(schema_name, table_name, columns)
+
+        return columns
+
+    @classmethod
+    def query_for_columns(cls, profile, schema_name, model_name=None):
+        """Returns a dict of {table_name: [Column]} for every table in the
+        schema"""
+        sql = """
+        select table_name, column_name, data_type, character_maximum_length
+        from information_schema.columns
+        where table_schema = '{schema_name}'
+        order by table_name, ordinal_position
+        """.format(schema_name=schema_name).strip()
+
+        connection, cursor = cls.add_query(
+            profile, sql, model_name)
+
+        data = cursor.fetchall()
+        columns = {}
+
+        for row in data:
+            table_name, name, data_type, char_size = row
+            column = Column(name, data_type, char_size)
+            columns.setdefault(table_name, []).append(column)
+
+        return columns
+
+    @classmethod
+    def query_for_columns_in_table(cls, profile, schema_name, table_name,
+                                   model_name=None):
         sql = """
         select column_name, data_type, character_maximum_length
         from information_schema.columns
@@ -184,6 +237,8 @@ class DefaultAdapter(object):
             sql += (" AND table_schema = '{schema_name}'"
                     .format(schema_name=schema_name))
 
+        sql += " order by ordinal_position"
+
         connection, cursor = cls.add_query(
             profile, sql, model_name)
 
@@ -225,6 +280,8 @@ class DefaultAdapter(object):
                 cls.alter_column_type(profile, to_schema, to_table,
                                       column_name, new_type, model_name)
 
+                relation_cache.invalidate_columns(to_schema, to_table)
+
     ###
     # SANE ANSI SQL DEFAULTS
     ###
@@ -263,16 +320,24 @@ class DefaultAdapter(object):
         return profile.get('schema')
 
     @classmethod
-    def get_connection(cls, profile, name=None, recache_if_missing=True):
-        global connections_in_use
+    def get_pool(cls, profile):
+        return dbt.adapters.connection_pool.get_pool(cls, profile)
+
+    @classmethod
+    def find_pool(cls, profile):
+        return dbt.adapters.connection_pool.find_pool(cls, profile)
 
+    @classmethod
+    def get_connection(cls, profile, name=None, recache_if_missing=True):
         if name is None:
             # if a name isn't specified, we'll re-use a single handle
             # named 'master'
             name = 'master'
 
-        if connections_in_use.get(name):
-            return connections_in_use.get(name)
+        connection = cls.get_pool(profile).get_in_use(name)
+
+        if connection:
+            return connection
 
         if not recache_if_missing:
             raise dbt.exceptions.InternalException(
@@ -282,124 +347,98 @@ class DefaultAdapter(object):
         logger.debug('Acquiring new {} connection "{}".'
                      .format(cls.type(), name))
 
-        connection = cls.acquire_connection(profile, name)
-        connections_in_use[name] = connection
+        cls.acquire_connection(profile, name)
 
         return cls.get_connection(profile, name)
 
-    @classmethod
-    def total_connections_allocated(cls):
-        global connections_in_use, connections_available
-
-        return len(connections_in_use) + len(connections_available)
-
     @classmethod
     def acquire_connection(cls, profile, name):
-        global connections_available, lock
+        return cls.get_pool(profile).acquire(name)
 
-        # we add a magic number, 2 because there are overhead connections,
-        # one for pre- and post-run hooks and other misc operations that occur
-        # before the run starts, and one for integration tests.
-        max_connections = profile.get('threads', 1) + 2
-
-        try:
-            lock.acquire()
-            num_allocated = cls.total_connections_allocated()
+    @classmethod
+    def open_new_connection(cls, profile, name):
+        credentials = dbt.adapters.connection_pool.get_credentials(
+            copy.deepcopy(profile))
 
-            if len(connections_available) > 0:
-                logger.debug('Re-using an available connection from the pool.')
-                to_return = connections_available.pop()
-                to_return['name'] = name
-                return to_return
+        result = {
+            'type': cls.type(),
+            'name': name,
+            'state': 'init',
+            'transaction_open': False,
+            'handle': None,
+            'credentials': credentials
+        }
 
-            elif num_allocated >= max_connections:
-                raise dbt.exceptions.InternalException(
-                    'Tried to request a new connection "{}" but '
-                    'the maximum number of connections are already '
-                    'allocated!'.format(name))
+        if dbt.flags.STRICT_MODE:
+            validate_connection(result)
 
-            logger.debug('Opening a new connection ({} currently allocated)'
-                         .format(num_allocated))
+        return cls.open_connection(result)
 
-            credentials = copy.deepcopy(profile)
+    @classmethod
+    def is_connection_alive(cls, connection):
+        """
+        Checks that a connection which has been sitting in the pool can still
+        run queries.
+        """
+        handle = connection.get('handle')
 
-            credentials.pop('type', None)
-            credentials.pop('threads', None)
+        if connection.get('state') != 'open' or handle is None:
+            return False
 
-            result = {
-                'type': cls.type(),
-                'name': name,
-                'state': 'init',
-                'transaction_open': False,
-                'handle': None,
-                'credentials': credentials
-            }
+        try:
+            cursor = handle.cursor()
+            cursor.execute('select 1')
+            cursor.fetchall()
 
-            if dbt.flags.STRICT_MODE:
-                validate_connection(result)
+            # don't leave the check's transaction open
+            handle.rollback()
+        except Exception as e:
+            logger.debug("Connection failed liveness check: {}"
+                         .format(str(e)))
+            return False
 
-            return cls.open_connection(result)
-        finally:
-            lock.release()
+        return True
 
     @classmethod
     def release_connection(cls, profile, name):
-        global connections_in_use, connections_available, lock
+        pool = cls.get_pool(profile)
 
-        if connections_in_use.get(name) is None:
+        if pool.get_in_use(name) is None:
             return
 
         to_release = cls.get_connection(profile, name,
                                         recache_if_missing=False)
 
-        try:
-            lock.acquire()
-
-            if to_release.get('state') == 'open':
+        if to_release.get('state') == 'open':
 
-                if to_release.get('transaction_open') is True:
-                    cls.rollback(to_release)
+            if to_release.get('transaction_open') is True:
+                cls.rollback(to_release)
 
-                to_release['name'] = None
-                connections_available.append(to_release)
-            else:
-                cls.close(to_release)
+        else:
+            cls.close(to_release)
 
-            del connections_in_use[name]
-        finally:
-            lock.release()
+        pool.release(name)
 
     @classmethod
     def cleanup_connections(cls):
-        global connections_in_use, connections_available
-
-        try:
-            lock.acquire()
-
-            for name, connection in connections_in_use.items():
-                if connection.get('state') != 'closed':
-                    logger.debug("Connection '{}' was left open."
-                                 .format(name))
-                else:
-                    logger.debug("Connection '{}' was properly closed."
-                                 .format(name))
-
-            # garbage collect, but don't close them in case someone
-            # still has a handle
-            connections_in_use = {}
-            connections_available = []
-
-        finally:
-            lock.release()
+        for pool in dbt.adapters.connection_pool.remove_pools():
+            pool.cleanup()
 
     @classmethod
     def reload(cls, connection):
-        return cls.get_connection(connection.get('credentials'),
-                                  connection.get('name'))
+        name = connection.get('name')
+        pool = cls.find_pool(connection.get('credentials'))
+        reloaded = pool.get_in_use(name)
+
+        if reloaded is None:
+            raise dbt.exceptions.InternalException(
+                'Tried to reload connection "{}", but it is not in use.'
+                .format(name))
+
+        return reloaded
 
     @classmethod
     def begin(cls, profile, name='master'):
-        global connections_in_use
         connection = cls.get_connection(profile, name)
 
         if dbt.flags.STRICT_MODE:
@@ -413,15 +452,13 @@ class DefaultAdapter(object):
         cls.add_query(profile, 'BEGIN', name, auto_begin=False)
 
         connection['transaction_open'] = True
-        connections_in_use[name] = connection
+        cls.get_pool(profile).set_in_use(name, connection)
 
         return connection
 
     @classmethod
     def commit_if_has_connection(cls, profile, name):
-        global connections_in_use
-
-        if connections_in_use.get(name) is None:
+        if cls.get_pool(profile).get_in_use(name) is None:
             return
 
         connection = cls.get_connection(profile, name, False)
@@ -430,8 +467,6 @@ class DefaultAdapter(object):
 
     @classmethod
     def commit(cls, connection):
-        global connections_in_use
-
         if dbt.flags.STRICT_MODE:
             validate_connection(connection)
 
@@ -446,7 +481,8 @@ class DefaultAdapter(object):
         connection.get('handle').commit()
 
         connection['transaction_open'] = False
-        connections_in_use[connection.get('name')] = connection
+        cls.find_pool(connection.get('credentials')).set_in_use(
+            connection.get('name'), connection)
 
         return connection
 
@@ -465,8 +501,13 @@ class DefaultAdapter(object):
         logger.debug('On {}: ROLLBACK'.format(connection.get('name')))
         connection.get('handle').rollback()
 
+        # the cache was updated as relations were created, dropped and
+        # renamed in the transaction, so it no longer matches the database
+        cls.clear_relation_cache()
+
         connection['transaction_open'] = False
-        connections_in_use[connection.get('name')] = connection
+        cls.find_pool(connection.get('credentials')).set_in_use(
+            connection.get('name'), connection)
 
         return connection
 
@@ -483,7 +524,8 @@ class DefaultAdapter(object):
         connection.get('handle').close()
 
         connection['state'] = 'closed'
-        connections_in_use[connection.get('name')] = connection
+        cls.find_pool(connection.get('credentials')).set_in_use(
+            connection.get('name'), connection)
 
         return connection
 
@@ -539,11 +581,45 @@ class DefaultAdapter(object):
                      model_name=None):
         logger.debug('Creating table "%s"."%s".', schema, table)
         sql = cls.get_create_table_sql(schema, table, columns, sort, dist)
-        return cls.add_query(profile, sql, model_name)
+        to_return = cls.add_query(profile, sql, model_name)
+
+        cls.cache_created_relation(schema, table, 'table')
+
+        return to_return
+
+    @classmethod
+    def list_relations(cls, profile, schema, model_name=None):
+        """
+        Returns a dict of {relation_name: relation_type} for the schema, like
+        `query_for_existing`, but only queries the schema once per invocation.
+        """
+        relations = relation_cache.get_relations(schema)
+
+        if relations is None:
+            relations = cls.query_for_existing(profile, schema, model_name)
+            relation_cache.set_relations(schema, relations)
+
+        return relations
+
+    @classmethod
+    def cache_created_relation(cls, schema, name, relation_type):
+        """
+        Records that dbt has created (or replaced) a relation outside of
+        `create_table`, eg. by running a model's SQL.
+        """
+        relation_cache.add_relation(schema, name, relation_type)
+
+    @classmethod
+    def clear_relation_cache(cls):
+        """
+        Forgets every cached relation, eg. after running arbitrary SQL or
+        rolling back a transaction.
+        """
+        relation_cache.clear()
 
     @classmethod
     def table_exists(cls, profile, schema, table, model_name=None):
-        tables = cls.query_for_existing(profile, schema, model_name)
+        tables = cls.list_relations(profile, schema, model_name)
         exists = tables.get(table) is not None
         return exists
 
@@ -0,0 +1,131 @@
+import multiprocessing
+
+
+class RelationCache(object):
+    """
+    Remembers the relations (and their columns) that exist in each schema
+    over the course of a single invocation, so that the catalog is queried
+    once per schema instead of once per model.
+
+    Relations are loaded in bulk, one schema at a time, and then kept up to
+    date as dbt creates, drops and renames relations. Columns are loaded in
+    bulk too, but tables which dbt may have modified are marked as stale, and
+    their columns are re-read the next time they're needed.
+
+    The cache is shared by the runner's threads, hence the lock.
+    """
+
+    def __init__(self):
+        self.lock = multiprocessing.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            # {schema: {relation_name: relation_type}}
+            self.relations = {}
+
+            # {schema: {table_name: [Column]}}, and {schema: set(table_name)}
+            # of the tables whose columns may have changed since then
+            self.columns = {}
+            self.stale_columns = {}
+
+            self.hits = 0
+            self.misses = 0
+
+    def get_relations(self, schema):
+        with self.lock:
+            relations = self.relations.get(schema)
+
+            if relations is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return relations.copy()
+
+    def set_relations(self, schema, relations):
+        with self.lock:
+            self.relations[schema] = dict(relations)
+
+    def add_relation(self, schema, name, relation_type):
+        with self.lock:
+            if schema in self.relations:
+                self.relations[schema][name] = relation_type
+
+            self._invalidate_columns(schema, name)
+
+    def drop_relation(self, schema, name):
+        with self.lock:
+            if schema in self.relations:
+                self.relations[schema].pop(name, None)
+
+            if schema in self.columns:
+                self.columns[schema].pop(name, None)
+                self.stale_columns[schema].discard(name)
+
+    def rename_relation(self, schema, from_name, to_name):
+        with self.lock:
+            if schema in self.relations:
+                relation_type = self.relations[schema].pop(from_name, None)
+
+                if relation_type is not None:
+                    self.relations[schema][to_name] = relation_type
+                else:
+                    # we didn't know about the relation being renamed, so
+                    # we don't know what it's become either
+                    del self.relations[schema]
+
+            if schema in self.columns:
+                columns = self.columns[schema].pop(from_name, None)
+                self.columns[schema].pop(to_name, None)
+
+                if from_name in self.stale_columns[schema]:
+                    self.stale_columns[schema].discard(from_name)
+                    self.stale_columns[schema].add(to_name)
+                elif columns is not None:
+                    self.columns[schema][to_name] = columns
+                    self.stale_columns[schema].discard(to_name)
+                else:
+                    self.stale_columns[schema].add(to_name)
+
+    def get_columns(self, schema, table):
+        """returns the list of columns in `table`, or None if they aren't
+        known. An empty list means that the table doesn't exist."""
+        with self.lock:
+            schema_columns = self.columns.get(schema)
+
+            if (schema_columns is None or
+                    table in self.stale_columns[schema]):
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return list(schema_columns.get(table, []))
+
+    def has_columns(self, schema):
+        with self.lock:
+            return schema in self.columns
+
+    def set_schema_columns(self, schema, columns):
+        with self.lock:
+            self.columns[schema] = {table: list(table_columns)
+                                    for table, table_columns
+                                    in columns.items()}
+            self.stale_columns[schema] = set()
+
+    def set_columns(self, schema, table, columns):
+        with self.lock:
+            if schema not in self.columns:
+                return
+
+            self.columns[schema][table] = list(columns)
+            self.stale_columns[schema].discard(table)
+
+    def invalidate_columns(self, schema, table):
+        with self.lock:
+            self._invalidate_columns(schema, table)
+
+    def _invalidate_columns(self, schema, table):
+        if schema in self.columns:
+            self.columns[schema].pop(table, None)
+            self.stale_columns[schema].add(table)
@@ -7,6 +7,7 @@ import snowflake.connector.errors
 
 from contextlib import contextmanager
 
+import dbt.adapters.default
 import dbt.exceptions
 import dbt.flags as flags
 
@@ -132,6 +133,9 @@ class SnowflakeAdapter(PostgresAdapter):
 
         connection, cursor = cls.add_query(profile, sql, model_name)
 
+        dbt.adapters.default.relation_cache.rename_relation(
+            schema, from_name, to_name)
+
     @classmethod
     def execute_model(cls, profile, model):
         connection = cls.get_connection(profile, model.get('name'))
@@ -1,3 +1,8 @@
+import hashlib
+import multiprocessing
+
+from collections import OrderedDict
+
 import dbt.compat
 import dbt.exceptions
 
@@ -79,19 +84,88 @@ def create_macro_capture_env(node):
 
 env = jinja2.sandbox.SandboxedEnvironment()
 
+TEMPLATE_CACHE_SIZE = 1024
+
+
+class TemplateCache(object):
+    """
+    A bounded LRU cache of compiled template code, keyed by the kind of
+    environment that compiled it and a hash of the template source. Only the
+    code is cached: templates are rebuilt from it for every call, as each
+    call has its own globals (and possibly its own environment). The cache
+    is shared by the runner's threads, hence the lock.
+    """
+
+    def __init__(self, max_size=TEMPLATE_CACHE_SIZE):
+        self.max_size = max_size
+        self.lock = multiprocessing.Lock()
+        self.entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get_key(self, env_kind, source):
+        source_hash = hashlib.sha1(source.encode('utf-8')).hexdigest()
+        return (env_kind, source_hash)
+
+    def get(self, key):
+        with self.lock:
+            code = self.entries.pop(key, None)
+
+            if code is None:
+                self.misses += 1
+                return None
+
+            # re-insert the entry to mark it as the most recently used
+            self.entries[key] = code
+            self.hits += 1
+
+            return code
+
+    def set(self, key, code):
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = code
+
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+template_cache = TemplateCache()
+
 
 def get_template(string, ctx, node=None, capture_macros=False,
                  validate_macro=False):
     try:
         local_env = env
+        env_kind = 'default'
 
         if capture_macros:
             local_env = create_macro_capture_env(node)
+            env_kind = 'capture_macros'
 
         elif validate_macro:
             local_env = create_macro_validation_extension(node)
+            env_kind = 'validate_macro'
+
+        source = dbt.compat.to_string(string)
+
+        key = template_cache.get_key(env_kind, source)
+        code = template_cache.get(key)
+
+        if code is None:
+            code = local_env.compile(source)
+            template_cache.set(key, code)
 
-        return local_env.from_string(dbt.compat.to_string(string), globals=ctx)
+        # this is what `from_string` does, minus compiling the source
+        return local_env.template_class.from_code(
+            local_env, code, local_env.make_globals(ctx), None)
 
     except (jinja2.exceptions.TemplateSyntaxError,
             jinja2.exceptions.UndefinedError) as e:
@@ -10,8 +10,16 @@ except NameError:
 
 if WHICH_PYTHON == 2:
     basestring = basestring
+    text_type = unicode
+    from Queue import Queue
+    from __builtin__ import intern as intern_string
+    from collections import Mapping, MutableMapping
 else:
     basestring = str
+    text_type = str
+    from queue import Queue
+    from sys import intern as intern_string
+    from collections.abc import Mapping, MutableMapping
 
 
 def to_unicode(s):
@@ -36,6 +44,14 @@ def to_string(s):
             return str(s)
 
 
+def intern(s):
+    # python 2 can only intern byte strings
+    if WHICH_PYTHON == 2 and not isinstance(s, str):
+        return s
+
+    return intern_string(s)
+
+
 def write_file(path, s):
     if WHICH_PYTHON == 2:
         with codecs.open(path, 'w', encoding='utf-8') as f:
@@ -1,6 +1,6 @@
+import multiprocessing
 import os
 from collections import OrderedDict, defaultdict
-import sqlparse
 
 import dbt.project
 import dbt.utils
@@ -19,6 +19,9 @@ import dbt.contracts.graph.compiled
 import dbt.contracts.project
 import dbt.exceptions
 import dbt.flags
+import dbt.graph.selector
+import dbt.model
+import dbt.parse_cache
 import dbt.parser
 
 from dbt.adapters.factory import get_adapter
@@ -28,10 +31,10 @@ CompilableEntities = [
     "models", "data tests", "schema tests", "archives", "analyses"
 ]
 
-graph_file_name = 'graph.gpickle'
+graph_file_name = 'graph.bin'
 
 
-def print_compile_stats(stats):
+def print_compile_stats(stats, subset=False):
     names = {
         NodeType.Model: 'models',
         NodeType.Test: 'tests',
@@ -48,41 +51,58 @@ def print_compile_stats(stats):
         NodeType.Macro: 0,
     }
 
+    if subset:
+        # only models were parsed, so there's nothing to count for the rest
+        results = {
+            NodeType.Model: 0,
+            NodeType.Macro: 0,
+        }
+
     results.update(stats)
 
     stat_line = ", ".join(
         ["{} {}".format(ct, names.get(t)) for t, ct in results.items()])
 
-    logger.info("Compiled {}".format(stat_line))
+    if subset:
+        logger.info("Compiled {} for the selected models and their ancestors."
+                    " Tests, analyses and archives were not compiled."
+                    .format(stat_line))
+    else:
+        logger.info("Compiled {}".format(stat_line))
+
 
+def prepend_ctes(model, flat_graph, expanded_ctes=None):
+    """Injects the CTEs of the ephemeral models `model` refers to (and of
+    their ephemeral ancestors) into its compiled sql. `expanded_ctes`
+    remembers the CTEs that each ephemeral model expands to, so that sharing
+    it between calls expands every ephemeral model only once."""
+    if expanded_ctes is None:
+        expanded_ctes = {}
 
-def prepend_ctes(model, flat_graph):
-    model, _, flat_graph = recursively_prepend_ctes(model, flat_graph)
+    model, _, flat_graph = recursively_prepend_ctes(model, flat_graph,
+                                                    expanded_ctes)
 
     return (model, flat_graph)
 
 
-def recursively_prepend_ctes(model, flat_graph):
+def get_expanded_ctes(cte_id, flat_graph, expanded_ctes):
+    if cte_id not in expanded_ctes:
+        recursively_prepend_ctes(flat_graph.get('nodes').get(cte_id),
+                                 flat_graph, expanded_ctes)
+
+    return expanded_ctes[cte_id]
+
+
+def recursively_prepend_ctes(model, flat_graph, expanded_ctes):
     if dbt.flags.STRICT_MODE:
         dbt.contracts.graph.compiled.validate_node(model)
-        dbt.contracts.graph.compiled.validate(flat_graph)
 
     model = model.copy()
     prepend_ctes = OrderedDict()
 
-    if model.get('all_ctes_injected') is True:
-        return (model, model.get('extra_ctes').keys(), flat_graph)
-
     for cte_id in model.get('extra_ctes').keys():
-        cte_to_add = flat_graph.get('nodes').get(cte_id)
-        cte_to_add, new_prepend_ctes, flat_graph = recursively_prepend_ctes(
-            cte_to_add, flat_graph)
-
-        prepend_ctes.update(new_prepend_ctes)
-        new_cte_name = '__dbt__CTE__{}'.format(cte_to_add.get('name'))
-        prepend_ctes[cte_id] = ' {} as (\n{}\n)'.format(
-            new_cte_name,
-            cte_to_add.get('compiled_sql'))
+        prepend_ctes.update(
+            get_expanded_ctes(cte_id, flat_graph, expanded_ctes))
 
     model['extra_ctes_injected'] = True
     model['extra_ctes'] = prepend_ctes
@@ -90,11 +110,64 @@ def recursively_prepend_ctes(model, flat_graph):
         model.get('compiled_sql'),
         model.get('extra_ctes'))
 
+    if get_materialization(model) == 'ephemeral':
+        # the CTEs a model gets from this one are this one's own CTEs,
+        # followed by this one
+        ctes = prepend_ctes.copy()
+        ctes[model.get('unique_id')] = ' {} as (\n{}\n)'.format(
+            '__dbt__CTE__{}'.format(model.get('name')),
+            model.get('compiled_sql'))
+
+        expanded_ctes[model.get('unique_id')] = ctes
+
     flat_graph['nodes'][model.get('unique_id')] = model
 
     return (model, prepend_ctes, flat_graph)
 
 
+def find_leading_with(sql):
+    """
+    Returns the index just past the `with` keyword (and any whitespace after
+    it) that opens `sql`, or None if `sql` doesn't open with a `with`.
+    Leading whitespace and comments are skipped. This only tokenizes as much
+    of `sql` as it needs to, instead of parsing the whole statement.
+    """
+    index = 0
+    length = len(sql)
+
+    while True:
+        while index < length and sql[index].isspace():
+            index += 1
+
+        if sql.startswith('--', index) or sql.startswith('# ', index):
+            while index < length and sql[index] not in '\r\n':
+                index += 1
+
+        elif sql.startswith('/*', index):
+            index = sql.find('*/', index + 2)
+
+            if index == -1:
+                return None
+
+            index += 2
+
+        else:
+            break
+
+    end = index + len('with')
+
+    if sql[index:end].lower() != 'with':
+        return None
+
+    if end < length and (sql[end].isalnum() or sql[end] in '_$'):
+        return None
+
+    while end < length and sql[end].isspace():
+        end += 1
+
+    return end
+
+
 def inject_ctes_into_sql(sql, ctes):
     """
     `ctes` is a dict of CTEs in the form:
@@ -121,36 +194,45 @@ def inject_ctes_into_sql(sql, ctes):
     if len(ctes) == 0:
         return sql
 
-    parsed_stmts = sqlparse.parse(sql)
-    parsed = parsed_stmts[0]
+    sql = dbt.compat.to_string(sql)
+    injected_ctes = ", ".join(ctes.values())
 
-    with_stmt = None
-    for token in parsed.tokens:
-        if token.is_keyword and token.normalized == 'WITH':
-            with_stmt = token
-            break
+    with_end = find_leading_with(sql)
 
-    if with_stmt is None:
+    if with_end is None:
         # no with stmt, add one, and inject CTEs right at the beginning
-        first_token = parsed.token_first()
-        with_stmt = sqlparse.sql.Token(sqlparse.tokens.Keyword, 'with')
-        parsed.insert_before(first_token, with_stmt)
-    else:
-        # stmt exists, add a comma (which will come after injected CTEs)
-        trailing_comma = sqlparse.sql.Token(sqlparse.tokens.Punctuation, ',')
-        parsed.insert_after(with_stmt, trailing_comma)
+        first_token = len(sql) - len(sql.lstrip())
 
-    parsed.insert_after(
-        with_stmt,
-        sqlparse.sql.Token(sqlparse.tokens.Keyword, ", ".join(ctes.values())))
+        return (sql[:first_token] + 'with' + injected_ctes +
+                sql[first_token:])
 
-    return dbt.compat.to_string(parsed)
+    else:
+        # stmt exists, add a comma (which will come after injected CTEs)
+        return sql[:with_end] + injected_ctes + ',' + sql[with_end:]
 
 
 class Compiler(object):
     def __init__(self, project):
         self.project = project
         self.parsed_models = None
+        self.parse_cache = None
+        self.parse_pool = None
+
+        # compiler contexts shared by all of the nodes in a package. these
+        # are built lazily from the runner's threads, hence the lock.
+        self.base_context_lock = multiprocessing.Lock()
+        self.base_contexts = {}
+        self.wrapper_macro_context = None
+
+        # the CTEs each ephemeral model expands to, shared by the models
+        # that refer to it. threads racing to add an entry would only
+        # compute the same entry twice, so there's no lock.
+        self.expanded_ctes = {}
+
+        # name index used to resolve refs, and the graph it indexes
+        self.node_index_lock = multiprocessing.Lock()
+        self.node_index_graph = None
+        self.node_index = None
 
     def initialize(self):
         if not os.path.exists(self.project['target-path']):
@@ -189,7 +271,7 @@ class Compiler(object):
             else:
                 dbt.exceptions.ref_invalid_args(model, args)
 
-            target_model = dbt.utils.find_model_by_name(
+            target_model = self.find_model_by_name(
                 all_models,
                 target_model_name,
                 target_model_package)
@@ -215,14 +297,80 @@ class Compiler(object):
 
         return do_ref
 
+    def get_base_context(self, package_name, flat_graph):
+        """Returns the parts of the compiler context which are the same for
+        every node in a package: the project context, run-level built-ins
+        and the macros visible to the package. These are built once per
+        package and shared by every node, so they must not be mutated."""
+        with self.base_context_lock:
+            if package_name in self.base_contexts:
+                return self.base_contexts[package_name]
+
+            profile = self.project.run_environment()
+            adapter = get_adapter(profile)
+
+            context = self.project.context()
+            context['target'] = self.project.get_target()
+            context['flags'] = dbt.flags
+            context['run_started_at'] = '{{ run_started_at }}'
+            context['invocation_id'] = '{{ invocation_id }}'
+            context['sql_now'] = adapter.date_function()
+
+            macro_context = {}
+
+            for unique_id, macro in flat_graph.get('macros').items():
+                macro_package_name = macro.get('package_name')
+
+                macro_map = {macro.get('name'): macro.get('parsed_macro')}
+
+                if macro_context.get(macro_package_name) is None:
+                    macro_context[macro_package_name] = {}
+
+                macro_context.get(macro_package_name, {}) \
+                             .update(macro_map)
+
+                if(macro_package_name == package_name or
+                   macro_package_name == dbt.include.GLOBAL_PROJECT_NAME):
+                    macro_context.update(macro_map)
+
+            self.base_contexts[package_name] = (context, macro_context)
+
+            return self.base_contexts[package_name]
+
+    def find_model_by_name(self, flat_graph, target_name, target_package):
+        # refs are resolved from the runner's threads, and the index is
+        # updated in place if the graph has changed, hence the lock.
+        with self.node_index_lock:
+            if self.node_index_graph is not flat_graph:
+                self.node_index_graph = flat_graph
+                self.node_index = dbt.utils.NameIndex(flat_graph.get('nodes'))
+
+            return dbt.utils.find_model_by_name(flat_graph,
+                                                target_name,
+                                                target_package,
+                                                self.node_index)
+
+    def get_wrapper_macro_context(self, flat_graph):
+        with self.base_context_lock:
+            if self.wrapper_macro_context is None:
+                self.wrapper_macro_context = dbt.wrapper.get_macro_context(
+                    self.project, flat_graph.get('macros'))
+
+            return self.wrapper_macro_context
+
     def get_compiler_context(self, model, flat_graph):
-        context = self.project.context()
+        base_context, macro_context = self.get_base_context(
+            model.get('package_name'), flat_graph)
+
         profile = self.project.run_environment()
         adapter = get_adapter(profile)
 
         wrapper = dbt.wrapper.DatabaseWrapper(model, adapter, profile)
 
-        # built-ins
+        # shallow copy the shared context, and overlay the node-specific
+        # built-ins. macros take precedence over built-ins.
+        context = base_context.copy()
+
         context['ref'] = self.__ref(context, model, flat_graph)
         context['config'] = self.__model_config(model)
         context['this'] = This(
@@ -231,30 +379,10 @@ class Compiler(object):
             model.get('name')
         )
         context['var'] = Var(model, context=context)
-        context['target'] = self.project.get_target()
         context['adapter'] = wrapper
-        context['flags'] = dbt.flags
 
         context.update(wrapper.get_context_functions())
-
-        context['run_started_at'] = '{{ run_started_at }}'
-        context['invocation_id'] = '{{ invocation_id }}'
-        context['sql_now'] = adapter.date_function()
-
-        for unique_id, macro in flat_graph.get('macros').items():
-            package_name = macro.get('package_name')
-
-            macro_map = {macro.get('name'): macro.get('parsed_macro')}
-
-            if context.get(package_name) is None:
-                context[package_name] = {}
-
-            context.get(package_name, {}) \
-                   .update(macro_map)
-
-            if(package_name == model.get('package_name') or
-               package_name == dbt.include.GLOBAL_PROJECT_NAME):
-                context.update(macro_map)
+        context.update(macro_context)
 
         return context
 
@@ -272,14 +400,18 @@ class Compiler(object):
 
         context = self.get_compiler_context(compiled_node, flat_graph)
 
-        compiled_node['compiled_sql'] = dbt.clients.jinja.get_rendered(
+        compiled_sql = dbt.clients.jinja.get_rendered(
             node.get('raw_sql'),
             context,
             node)
 
+        compiled_node['compiled_sql'] = dbt.utils.share_equal_string(
+            compiled_sql, node.get('raw_sql'))
+
         compiled_node['compiled'] = True
 
-        injected_node, _ = prepend_ctes(compiled_node, flat_graph)
+        injected_node, _ = prepend_ctes(compiled_node, flat_graph,
+                                        self.expanded_ctes)
 
         if compiled_node.get('resource_type') in [NodeType.Test,
                                                   NodeType.Analysis]:
@@ -310,7 +442,8 @@ class Compiler(object):
                 injected_node,
                 self.project,
                 context,
-                flat_graph)
+                flat_graph,
+                self.get_wrapper_macro_context(flat_graph))
 
             injected_node['wrapped_sql'] = wrapped_stmt
 
@@ -366,6 +499,10 @@ class Compiler(object):
 
         return linked_graph
 
+    def get_parse_workers(self):
+        args = getattr(self.project, 'args', None)
+        return getattr(args, 'parse_workers', None)
+
     def get_all_projects(self):
         root_project = self.project.cfg
         all_projects = {root_project.get('name'): root_project}
@@ -406,7 +543,9 @@ class Compiler(object):
                     all_projects=all_projects,
                     root_dir=project.get('project-root'),
                     relative_dirs=project.get('source-paths', []),
-                    resource_type=NodeType.Model))
+                    resource_type=NodeType.Model,
+                    parse_cache=self.parse_cache,
+                    parse_pool=self.parse_pool))
 
         return parsed_models
 
@@ -421,7 +560,9 @@ class Compiler(object):
                     all_projects=all_projects,
                     root_dir=project.get('project-root'),
                     relative_dirs=project.get('analysis-paths', []),
-                    resource_type=NodeType.Analysis))
+                    resource_type=NodeType.Analysis,
+                    parse_cache=self.parse_cache,
+                    parse_pool=self.parse_pool))
 
         return parsed_models
 
@@ -437,7 +578,9 @@ class Compiler(object):
                     root_dir=project.get('project-root'),
                     relative_dirs=project.get('test-paths', []),
                     resource_type=NodeType.Test,
-                    tags={'data'}))
+                    tags={'data'},
+                    parse_cache=self.parse_cache,
+                    parse_pool=self.parse_pool))
 
         return parsed_tests
 
@@ -451,7 +594,9 @@ class Compiler(object):
                     root_project=root_project,
                     all_projects=all_projects,
                     root_dir=project.get('project-root'),
-                    relative_dirs=project.get('source-paths', [])))
+                    relative_dirs=project.get('source-paths', []),
+                    parse_cache=self.parse_cache,
+                    parse_pool=self.parse_pool))
 
         return parsed_tests
 
@@ -468,19 +613,145 @@ class Compiler(object):
         all_nodes.update(
             self.get_parsed_schema_tests(root_project, all_projects))
         all_nodes.update(
-            dbt.parser.parse_archives_from_projects(root_project,
-                                                    all_projects))
+            dbt.parser.parse_archives_from_projects(
+                root_project,
+                all_projects,
+                parse_cache=self.parse_cache))
 
         return all_nodes
 
+    def get_unparsed_models(self, all_projects):
+        unparsed_models = []
+
+        for name, project in all_projects.items():
+            unparsed_models.extend(
+                dbt.parser.load_sql_nodes(
+                    package_name=name,
+                    root_dir=project.get('project-root'),
+                    relative_dirs=project.get('source-paths', []),
+                    resource_type=NodeType.Model))
+
+        return unparsed_models
+
+    def load_selected_models(self, root_project, all_projects, include_spec):
+        """parses the models selected by `include_spec`, and every model they
+        depend on. Models are selected by name, so nothing needs to be parsed
+        to find them; their ancestors are found by parsing the selected models
+        and following their refs."""
+        unparsed_models = OrderedDict()
+        index = Linker()
+
+        for node in self.get_unparsed_models(all_projects):
+            package_name = node.get('package_name')
+            unique_id = dbt.parser.get_path(NodeType.Model, package_name,
+                                            node.get('name'))
+
+            unparsed_models[unique_id] = node
+
+            index.add_node(unique_id)
+            index.update_node_data(unique_id, {
+                'fqn': dbt.parser.get_fqn(node.get('path'),
+                                          all_projects.get(package_name)),
+            })
+
+        name_index = dbt.utils.NameIndex(unparsed_models)
+
+        to_parse = set()
+        graph_index = dbt.graph.selector.GraphIndex(index.graph)
+
+        for spec in dbt.graph.selector.split_specs(include_spec):
+            parsed_spec = dbt.graph.selector.parse_spec(spec)
+            to_parse.update(dbt.graph.selector.get_nodes_by_qualified_name(
+                self.project, index.graph,
+                parsed_spec['qualified_node_name'], graph_index))
+
+        parsed_models = {}
+
+        while len(to_parse) > 0:
+            # parse in the same order as a full parse, so refs to ambiguous
+            # names resolve to the same models
+            parsed = dbt.parser.parse_sql_nodes(
+                [node for unique_id, node in unparsed_models.items()
+                 if unique_id in to_parse],
+                root_project,
+                all_projects,
+                parse_cache=self.parse_cache,
+                parse_pool=self.parse_pool)
+
+            parsed_models.update(parsed)
+            to_parse = set()
+
+            for node in parsed.values():
+                for ref in node.get('refs', []):
+                    target_model_package = None
+
+                    if len(ref) == 1:
+                        target_model_name = ref[0]
+                    else:
+                        target_model_package, target_model_name = ref
+
+                    # missing refs are reported when the refs are processed
+                    target_model_id = name_index.find(NodeType.Model,
+                                                      target_model_name,
+                                                      target_model_package)
+
+                    if (target_model_id is not None and
+                            target_model_id not in parsed_models):
+                        to_parse.add(target_model_id)
+
+        return {unique_id: parsed_models[unique_id]
+                for unique_id in unparsed_models
+                if unique_id in parsed_models}
+
     def compile(self):
+        return self.compile_graph(self.load_all_nodes)
+
+    def compile_subgraph(self, include_spec):
+        """Like `compile`, but only parses the models selected by
+        `include_spec` and their ancestors. Tests, analyses and archives are
+        left out of the graph."""
+        def load_nodes(root_project, all_projects):
+            return self.load_selected_models(root_project, all_projects,
+                                             include_spec)
+
+        return self.compile_graph(load_nodes, subset=True)
+
+    def compile_graph(self, load_nodes, subset=False):
         linker = Linker()
 
         root_project = self.project.cfg
         all_projects = self.get_all_projects()
 
+        self.base_contexts = {}
+        self.wrapper_macro_context = None
+        self.expanded_ctes = {}
+        dbt.model.clear_project_config_tries()
+
+        parse_cache_path = dbt.parse_cache.get_parse_cache_path(self.project)
+        self.parse_cache = dbt.parse_cache.ParseCache.load(parse_cache_path)
+
         all_macros = self.load_all_macros(root_project, all_projects)
-        all_nodes = self.load_all_nodes(root_project, all_projects)
+        self.parse_cache.set_macros(all_macros)
+
+        parse_workers = self.get_parse_workers()
+
+        if parse_workers is not None and parse_workers > 1:
+            self.parse_pool = dbt.parser.get_parse_pool(parse_workers)
+
+        try:
+            all_nodes = load_nodes(root_project, all_projects)
+        finally:
+            if self.parse_pool is not None:
+                self.parse_pool.close()
+                self.parse_pool.join()
+                self.parse_pool = None
+
+        # the target directory is only created by `initialize`
+        if os.path.exists(self.project['target-path']):
+            if subset:
+                self.parse_cache.save(parse_cache_path, set(all_nodes))
+            else:
+                self.parse_cache.save(parse_cache_path)
 
         flat_graph = {
             'nodes': all_nodes,
@@ -499,6 +770,6 @@ class Compiler(object):
         for node_name, node in linked_graph.get('macros').items():
             stats[node.get('resource_type')] += 1
 
-        print_compile_stats(stats)
+        print_compile_stats(stats, subset)
 
         return linked_graph, linker
@@ -1,4 +1,4 @@
-from dbt.compat import basestring
+from dbt.compat import basestring, Mapping
 import dbt.utils
 
 
@@ -41,7 +41,7 @@ def raise_compiler_error(node, msg):
         name = '<None>'
     elif isinstance(node, basestring):
         name = node
-    elif isinstance(node, dict):
+    elif isinstance(node, Mapping):
         name = node.get('name')
         node_type = node.get('resource_type')
 
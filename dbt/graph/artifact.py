@@ -0,0 +1,488 @@
+import datetime
+import functools
+import mmap
+import numbers
+import pickle
+import struct
+
+import networkx as nx
+
+import dbt.exceptions
+
+from collections import OrderedDict
+from dbt.compat import basestring, text_type, MutableMapping
+
+# bump this whenever the layout of the graph file changes
+GRAPH_FILE_VERSION = 3
+
+GRAPH_FILE_MAGIC = b'DBTGRAPH'
+
+# magic, version, number of nodes, number of edges, and the offset and
+# length of the node index
+HEADER_FORMAT = '<8sIIIQQ'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+# these are stored apart from the rest of a node's data, and only read from
+# the file when they're used
+LAZY_KEYS = ['raw_sql', 'compiled_sql', 'injected_sql', 'wrapped_sql']
+
+# the node index is a tree of values, each written as one of these tags
+# followed by its contents. lists, tuples and sets are written as their
+# length followed by their items. strings are written as an index into a
+# table of every distinct string in the index, and dicts as an index into a
+# table of every distinct tuple of keys followed by the value for each key,
+# as the same keys and names come up in every node. values of any other
+# type, like decimals or dates with a timezone (both of which can come from
+# yaml), are pickled.
+TAG_NONE = b'N'
+TAG_TRUE = b'T'
+TAG_FALSE = b'F'
+TAG_INT = b'i'
+TAG_FLOAT = b'f'
+TAG_TEXT = b's'
+TAG_LIST = b'l'
+TAG_TUPLE = b't'
+TAG_SET = b'S'
+TAG_DICT = b'd'
+TAG_ORDERED_DICT = b'o'
+TAG_DATE = b'D'
+TAG_DATETIME = b'M'
+TAG_TIME = b'H'
+TAG_PICKLE = b'p'
+
+INT_FORMAT = struct.Struct('<q')
+FLOAT_FORMAT = struct.Struct('<d')
+LENGTH_FORMAT = struct.Struct('<I')
+
+# year, month, day, then hour, minute, second, microsecond
+DATE_FORMAT = struct.Struct('<HBB')
+DATETIME_FORMAT = struct.Struct('<HBBBBBI')
+TIME_FORMAT = struct.Struct('<BBBI')
+
+INT_MIN = -2 ** 63
+INT_MAX = 2 ** 63 - 1
+
+# readable by python 2 and 3
+PICKLE_PROTOCOL = 2
+
+CONSTANT_TAGS = {TAG_NONE: None, TAG_TRUE: True, TAG_FALSE: False}
+CONTAINER_TAGS = {list: TAG_LIST, tuple: TAG_TUPLE, set: TAG_SET,
+                  frozenset: TAG_SET}
+DATE_TAGS = {TAG_DATE: (datetime.date, DATE_FORMAT),
+             TAG_DATETIME: (datetime.datetime, DATETIME_FORMAT),
+             TAG_TIME: (datetime.time, TIME_FORMAT)}
+
+
+def encode_index(value):
+    """
+    Writes a tree of values (None, bools, numbers, strings, dates, lists,
+    tuples, sets and dicts, with anything else pickled) as bytes: the table
+    of strings, then the table of dict keys, then the value itself.
+    """
+    chunks = []
+    append = chunks.append
+    strings = {}
+    key_tuples = {}
+    pack_length = LENGTH_FORMAT.pack
+
+    def get_string_index(string):
+        if type(string) is not text_type:
+            string = string.decode('utf-8')
+
+        index = strings.get(string)
+
+        if index is None:
+            index = strings[string] = len(strings)
+
+        return index
+
+    def encode_pickled(value):
+        try:
+            data = pickle.dumps(value, PICKLE_PROTOCOL)
+        except Exception as e:
+            raise dbt.exceptions.InternalException(
+                "Can't write a value of type {} to the graph file: {}"
+                .format(type(value).__name__, e))
+
+        append(TAG_PICKLE + pack_length(len(data)) + data)
+
+    def encode(value):
+        value_type = type(value)
+
+        if value_type is text_type or isinstance(value, basestring):
+            append(TAG_TEXT + pack_length(get_string_index(value)))
+
+        elif value is None:
+            append(TAG_NONE)
+
+        elif value is True:
+            append(TAG_TRUE)
+
+        elif value is False:
+            append(TAG_FALSE)
+
+        elif value_type is dict or value_type is OrderedDict:
+            keys = tuple(value)
+            index = key_tuples.get(keys)
+
+            if index is None:
+                # the key table only holds strings
+                if not all(isinstance(key, basestring) for key in keys):
+                    return encode_pickled(value)
+
+                index = key_tuples[keys] = len(key_tuples)
+
+            append((TAG_ORDERED_DICT if value_type is OrderedDict
+                    else TAG_DICT) + pack_length(index))
+
+            for item in value.values():
+                encode(item)
+
+        elif value_type in CONTAINER_TAGS:
+            append(CONTAINER_TAGS[value_type] + pack_length(len(value)))
+
+            for item in value:
+                encode(item)
+
+        elif isinstance(value, numbers.Integral) and \
+                INT_MIN <= value <= INT_MAX:
+            append(TAG_INT + INT_FORMAT.pack(value))
+
+        elif isinstance(value, float):
+            append(TAG_FLOAT + FLOAT_FORMAT.pack(value))
+
+        elif value_type is datetime.date:
+            append(TAG_DATE + DATE_FORMAT.pack(
+                value.year, value.month, value.day))
+
+        elif value_type is datetime.datetime and value.tzinfo is None:
+            append(TAG_DATETIME + DATETIME_FORMAT.pack(
+                value.year, value.month, value.day, value.hour,
+                value.minute, value.second, value.microsecond))
+
+        elif value_type is datetime.time and value.tzinfo is None:
+            append(TAG_TIME + TIME_FORMAT.pack(
+                value.hour, value.minute, value.second, value.microsecond))
+
+        else:
+            encode_pickled(value)
+
+    encode(value)
+
+    # the keys of every dict are written once, as lists of strings
+    key_table = []
+
+    for keys in sorted(key_tuples, key=key_tuples.get):
+        key_table.append(pack_length(len(keys)))
+        key_table.extend(pack_length(get_string_index(key)) for key in keys)
+
+    string_table = [string.encode('utf-8') for string
+                    in sorted(strings, key=strings.get)]
+
+    return b''.join(
+        [pack_length(len(string_table)),
+         struct.pack('<{}I'.format(len(string_table)),
+                     *[len(string) for string in string_table])] +
+        string_table +
+        [pack_length(len(key_tuples))] +
+        key_table +
+        chunks)
+
+
+def decode_index(data):
+    """Reads a value written by `encode_index` from `data`"""
+    unpack_length = LENGTH_FORMAT.unpack_from
+    length_size = LENGTH_FORMAT.size
+
+    (num_strings,) = unpack_length(data, 0)
+    offset = length_size
+
+    lengths = struct.unpack_from('<{}I'.format(num_strings), data, offset)
+    offset += length_size * num_strings
+
+    strings = []
+
+    for length in lengths:
+        strings.append(data[offset:offset + length].decode('utf-8'))
+        offset += length
+
+    (num_key_tuples,) = unpack_length(data, offset)
+    offset += length_size
+
+    key_tuples = []
+
+    for _ in range(num_key_tuples):
+        (num_keys,) = unpack_length(data, offset)
+        offset += length_size
+
+        key_tuples.append(tuple(
+            strings[index] for index in
+            struct.unpack_from('<{}I'.format(num_keys), data, offset)))
+        offset += length_size * num_keys
+
+    def decode(offset):
+        """returns the value at `offset`, and the offset just past it"""
+        tag = data[offset:offset + 1]
+        offset += 1
+
+        if tag in CONSTANT_TAGS:
+            return CONSTANT_TAGS[tag], offset
+
+        if tag == TAG_INT:
+            return INT_FORMAT.unpack_from(data, offset)[0], offset + 8
+
+        if tag == TAG_FLOAT:
+            return FLOAT_FORMAT.unpack_from(data, offset)[0], offset + 8
+
+        if tag in DATE_TAGS:
+            date_type, date_format = DATE_TAGS[tag]
+            return (date_type(*date_format.unpack_from(data, offset)),
+                    offset + date_format.size)
+
+        # everything else is followed by an index into one of the tables,
+        # or a length
+        (index,) = unpack_length(data, offset)
+        offset += length_size
+
+        if tag == TAG_TEXT:
+            return strings[index], offset
+
+        if tag == TAG_PICKLE:
+            return (pickle.loads(data[offset:offset + index]),
+                    offset + index)
+
+        if tag == TAG_DICT or tag == TAG_ORDERED_DICT:
+            keys = key_tuples[index]
+            items = []
+
+            for _ in keys:
+                item, offset = decode(offset)
+                items.append(item)
+
+            if tag == TAG_ORDERED_DICT:
+                return OrderedDict(zip(keys, items)), offset
+
+            return dict(zip(keys, items)), offset
+
+        items = []
+
+        for _ in range(index):
+            item, offset = decode(offset)
+            items.append(item)
+
+        if tag == TAG_LIST:
+            return items, offset
+
+        if tag == TAG_TUPLE:
+            return tuple(items), offset
+
+        if tag == TAG_SET:
+            return set(items), offset
+
+        raise dbt.exceptions.InternalException(
+            "Unknown tag {!r} in the graph file".format(tag))
+
+    return decode(offset)[0]
+
+
+def write_graph(graph, path):
+    """
+    Writes `graph` to `path`. The file is laid out as:
+
+      - a fixed size header
+      - the edges, as integer-indexed adjacency arrays: the offset of each
+        node's successors in the list of successors (one more offset than
+        there are nodes), then the list of successors
+      - the lazily loaded part of each node's data, as utf-8 text
+      - the node index: each node's id, the rest of its data, and where each
+        of its lazily loaded values is, written by `encode_index`
+    """
+    nodes = list(graph.nodes())
+    node_indexes = {node: index for index, node in enumerate(nodes)}
+
+    offsets = [0]
+    successors = []
+
+    for node in nodes:
+        successors.extend(sorted(node_indexes[successor] for successor
+                                 in graph.successors(node)))
+        offsets.append(len(successors))
+
+    chunks = [
+        struct.pack('<{}I'.format(len(offsets)), *offsets),
+        struct.pack('<{}I'.format(len(successors)), *successors),
+    ]
+    offset = HEADER_SIZE + 4 * (len(offsets) + len(successors))
+    node_index = []
+
+    for node in nodes:
+        data = dict(graph.node[node])
+        lazy_data = {}
+
+        for key in LAZY_KEYS:
+            if isinstance(data.get(key), basestring):
+                encoded = data.pop(key).encode('utf-8')
+                lazy_data[key] = (offset, len(encoded))
+                chunks.append(encoded)
+                offset += len(encoded)
+
+        node_index.append((node, data, lazy_data))
+
+    index = encode_index({'graph': graph.graph, 'nodes': node_index})
+    chunks.append(index)
+
+    header = struct.pack(HEADER_FORMAT, GRAPH_FILE_MAGIC, GRAPH_FILE_VERSION,
+                         len(nodes), len(successors), offset, len(index))
+
+    with open(path, 'wb') as fh:
+        fh.write(header)
+
+        for chunk in chunks:
+            fh.write(chunk)
+
+
+def read_graph(path):
+    return GraphFile(path).to_graph()
+
+
+class GraphFile(object):
+    """
+    A graph file written by `write_graph`, mapped into memory. The edges and
+    the node index are read when the file is opened, but each node's sql is
+    only read once it's used.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as fh:
+            try:
+                self.mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # empty files can't be mapped
+                self.invalid_file(path)
+
+        if len(self.mmap) < HEADER_SIZE:
+            self.invalid_file(path)
+
+        (magic, version, num_nodes, num_edges, index_offset,
+         index_length) = struct.unpack_from(HEADER_FORMAT, self.mmap, 0)
+
+        if magic != GRAPH_FILE_MAGIC:
+            self.invalid_file(path)
+
+        if version != GRAPH_FILE_VERSION:
+            raise dbt.exceptions.RuntimeException(
+                "The graph file {} was written by a different version of dbt."
+                " Compile the project again to replace it.".format(path))
+
+        self.offsets = struct.unpack_from(
+            '<{}I'.format(num_nodes + 1), self.mmap, HEADER_SIZE)
+        self.successors = struct.unpack_from(
+            '<{}I'.format(num_edges), self.mmap,
+            HEADER_SIZE + 4 * (num_nodes + 1))
+
+        index = decode_index(
+            self.mmap[index_offset:index_offset + index_length])
+
+        self.graph_data = index['graph']
+        self.node_index = index['nodes']
+
+    def invalid_file(self, path):
+        raise dbt.exceptions.RuntimeException(
+            "{} is not a dbt graph file. Compile the project again to replace "
+            "it.".format(path))
+
+    def nodes(self):
+        return [node for (node, _, _) in self.node_index]
+
+    def get_successors(self, index):
+        return self.successors[self.offsets[index]:self.offsets[index + 1]]
+
+    def load_lazy_data(self, lazy_data):
+        return {key: self.mmap[offset:offset + length].decode('utf-8')
+                for key, (offset, length) in lazy_data.items()}
+
+    def to_graph(self):
+        graph = nx.DiGraph()
+        graph.graph.update(self.graph_data)
+
+        nodes = self.nodes()
+
+        for (node, data, lazy_data) in self.node_index:
+            graph.add_node(node)
+
+            if len(lazy_data) > 0:
+                data = LazyNodeData(
+                    data, functools.partial(self.load_lazy_data, lazy_data))
+
+            graph.node[node] = data
+
+        for index, node in enumerate(nodes):
+            for successor in self.get_successors(index):
+                graph.add_edge(node, nodes[successor])
+
+        return graph
+
+
+class LazyNodeData(MutableMapping):
+    """
+    A node's data, read from a graph file. The keys in LAZY_KEYS are loaded
+    from the file when they're first looked up, or when the data is used as
+    a whole (eg. iterated over or copied). Looking up any other key doesn't
+    load them.
+
+    This isn't a dict, as some ways of copying a dict (eg. `dict(data)` on
+    python 2) skip the methods that would load them.
+    """
+
+    def __init__(self, data, load):
+        self.data = dict(data)
+        self.load = load
+
+    def ensure_loaded(self):
+        if self.load is None:
+            return
+
+        load, self.load = self.load, None
+
+        # keys that were set before the data was loaded take precedence
+        for key, value in load().items():
+            self.data.setdefault(key, value)
+
+    def __getitem__(self, key):
+        if key in LAZY_KEYS:
+            self.ensure_loaded()
+
+        return self.data[key]
+
+    def __setitem__(self, key, value):
+        self.data[key] = value
+
+    def __delitem__(self, key):
+        self.ensure_loaded()
+        del self.data[key]
+
+    def __contains__(self, key):
+        if key in LAZY_KEYS:
+            self.ensure_loaded()
+
+        return key in self.data
+
+    def __iter__(self):
+        self.ensure_loaded()
+        return iter(self.data)
+
+    def __len__(self):
+        self.ensure_loaded()
+        return len(self.data)
+
+    def __repr__(self):
+        self.ensure_loaded()
+        return repr(self.data)
+
+    def copy(self):
+        # networkx copies node data with `copy`
+        self.ensure_loaded()
+        return self.data.copy()
+
+    def __reduce__(self):
+        return (dict, (self.copy(),))
@@ -0,0 +1,109 @@
+import heapq
+
+from collections import defaultdict
+
+DEFAULT_NODE_WEIGHT = 1.0
+
+
+class ReadyQueue(object):
+    """
+    Hands out the nodes of a dependency graph as soon as every one of their
+    blocking parents has been marked done. `blocking_parents` is a dict of
+    {node: set(parent_nodes)}, and `ordering` is a topological ordering of
+    all of the nodes.
+
+    When several nodes are ready at once, the node with the longest
+    remaining critical path is handed out first. The critical path of a
+    node is its own weight plus the heaviest critical path among the nodes
+    it blocks. `weights` is an optional dict of {node: weight} (eg. the
+    execution time of the node in a previous run). Nodes without a weight
+    are given the mean of the known weights. Ties are broken by `ordering`.
+
+    This class is not thread-safe: it is meant to be driven by a single
+    thread that dispatches work and collects results.
+    """
+
+    def __init__(self, blocking_parents, ordering, weights=None):
+        self.ordering = list(ordering)
+        self.num_remaining_parents = {}
+        self.children = defaultdict(set)
+        self.position = {}
+
+        for index, node in enumerate(self.ordering):
+            parents = blocking_parents.get(node, set())
+            self.position[node] = index
+            self.num_remaining_parents[node] = len(parents)
+
+            for parent in parents:
+                self.children[parent].add(node)
+
+        self.critical_path = self.get_critical_paths(weights)
+
+        self.ready = []
+
+        for node in self.ordering:
+            if self.num_remaining_parents[node] == 0:
+                self.push_ready(node)
+
+        self.in_progress = set()
+        self.num_done = 0
+
+    def get_critical_paths(self, weights):
+        if weights is None:
+            weights = {}
+
+        known = [weights[node] for node in self.ordering if node in weights]
+
+        if len(known) > 0:
+            default_weight = float(sum(known)) / len(known)
+        else:
+            default_weight = DEFAULT_NODE_WEIGHT
+
+        critical_path = {}
+
+        # children always come after their parents in `ordering`
+        for node in reversed(self.ordering):
+            downstream = [critical_path[child]
+                          for child in self.children.get(node, set())]
+
+            critical_path[node] = (weights.get(node, default_weight) +
+                                   max(downstream + [0]))
+
+        return critical_path
+
+    def push_ready(self, node):
+        heapq.heappush(self.ready, (-self.critical_path[node],
+                                    self.position[node],
+                                    node))
+
+    def __len__(self):
+        return len(self.num_remaining_parents)
+
+    def nodes(self):
+        return self.ordering
+
+    def has_ready(self):
+        return len(self.ready) > 0
+
+    def get(self):
+        _, _, node = heapq.heappop(self.ready)
+        self.in_progress.add(node)
+        return node
+
+    def mark_done(self, node):
+        self.in_progress.discard(node)
+        self.num_done += 1
+
+        newly_ready = []
+
+        for child in self.children.get(node, set()):
+            self.num_remaining_parents[child] -= 1
+
+            if self.num_remaining_parents[child] == 0:
+                newly_ready.append(child)
+                self.push_ready(child)
+
+        return newly_ready
+
+    def is_finished(self):
+        return self.num_done == len(self)
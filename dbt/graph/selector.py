@@ -1,5 +1,6 @@
 # import dbt.utils.compiler_error
-import networkx as nx
+from collections import defaultdict
+
 from dbt.logger import GLOBAL_LOGGER as logger
 
 from dbt.utils import NodeType
@@ -73,61 +74,186 @@ def is_selected_node(real_node, node_selector):
     return True
 
 
-def get_nodes_by_qualified_name(project, graph, qualified_name):
-    """ returns a node if matched, else throws a CompilerError. qualified_name
-    should be either 1) a node name or 2) a dot-notation qualified selector"""
+class GraphIndex(object):
+    """
+    Lookups for selecting nodes from `graph`: a trie of the nodes' fqns, the
+    nodes by name, the package names, and the graph's edges as lists of
+    node indexes. Build one per graph, and use it for every spec.
+
+    Each level of the fqn trie is a dict of:
+      - nodes: the nodes whose fqn ends at this level
+      - children: {fqn part: child level}
+      - subtree: every node at or below this level, once it's been needed
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.nodes = list(graph.nodes())
+        self.node_indexes = {node: index for index, node
+                             in enumerate(self.nodes)}
+
+        self.parents = [[self.node_indexes[parent] for parent
+                         in graph.predecessors(node)]
+                        for node in self.nodes]
+        self.children = [[self.node_indexes[child] for child
+                          in graph.successors(node)]
+                         for node in self.nodes]
+
+        self.package_names = get_package_names(graph)
+
+        self.fqns = {}
+        self.names = defaultdict(list)
+        self.trie = self.new_trie_level()
+
+        for node in self.nodes:
+            fqn = tuple(graph.node[node]['fqn'])
+            self.fqns[node] = fqn
+            self.names[fqn[-1]].append(node)
+
+            level = self.trie
+
+            for part in fqn:
+                if part not in level['children']:
+                    level['children'][part] = self.new_trie_level()
+
+                level = level['children'][part]
+
+            level['nodes'].append(node)
+
+    def new_trie_level(self):
+        return {'nodes': [], 'children': {}, 'subtree': None}
+
+    def get_subtree(self, level):
+        if level['subtree'] is None:
+            subtree = set(level['nodes'])
+
+            for child in level['children'].values():
+                subtree.update(self.get_subtree(child))
+
+            level['subtree'] = subtree
+
+        return level['subtree']
+
+    def get_nodes_by_prefix(self, prefix):
+        """returns the nodes whose fqn starts with `prefix`"""
+        level = self.trie
+
+        for part in prefix:
+            level = level['children'].get(part)
+
+            if level is None:
+                return set()
+
+        return set(self.get_subtree(level))
 
-    package_names = get_package_names(graph)
+    def get_selected_nodes(self, node_selector):
+        """returns the nodes that `is_selected_node` would select for
+        `node_selector`, without looking at every node"""
+        if SELECTOR_GLOB in node_selector:
+            glob_index = node_selector.index(SELECTOR_GLOB)
+            return self.get_nodes_by_prefix(node_selector[:glob_index])
 
-    for node in graph.nodes():
-        fqn_ish = graph.node[node]['fqn']
+        selected = self.get_nodes_by_prefix(node_selector)
 
-        if len(qualified_name) == 1 and fqn_ish[-1] == qualified_name[0]:
-            yield node
+        # the last part of the selector can also match the end of the fqn
+        prefix = tuple(node_selector[:-1])
 
-        elif qualified_name[0] in package_names:
-            if is_selected_node(fqn_ish, qualified_name):
-                yield node
+        for node in self.names.get(node_selector[-1], []):
+            if self.fqns[node][:len(prefix)] == prefix:
+                selected.add(node)
+
+        return selected
+
+    def get_nodes_by_qualified_name(self, qualified_name):
+        selected = set()
+
+        if len(qualified_name) == 1:
+            selected.update(self.names.get(qualified_name[0], []))
+
+        if qualified_name[0] in self.package_names:
+            selected.update(self.get_selected_nodes(qualified_name))
 
         else:
-            for package_name in package_names:
-                local_qualified_node_name = (package_name,) + qualified_name
-                if is_selected_node(fqn_ish, local_qualified_node_name):
-                    yield node
-                    break
+            for package_name in self.package_names:
+                selected.update(self.get_selected_nodes(
+                    (package_name,) + tuple(qualified_name)))
+
+        return selected
+
+    def get_closure(self, nodes, edges):
+        """returns the nodes reachable from `nodes` by following `edges`
+        (self.parents or self.children), not including `nodes` themselves
+        unless they're reachable from one another. All of the nodes are
+        walked at once, so each edge is followed at most once."""
+        visited = bytearray(len(self.nodes))
+        to_visit = [self.node_indexes[node] for node in nodes]
+        reachable = set()
+
+        while len(to_visit) > 0:
+            index = to_visit.pop()
+
+            for next_index in edges[index]:
+                if not visited[next_index]:
+                    visited[next_index] = 1
+                    reachable.add(self.nodes[next_index])
+                    to_visit.append(next_index)
+
+        return reachable
+
+    def get_ancestors(self, nodes):
+        return self.get_closure(nodes, self.parents)
 
+    def get_descendants(self, nodes):
+        return self.get_closure(nodes, self.children)
+
+    def get_child_tests(self, nodes):
+        child_tests = set()
+
+        for node in nodes:
+            for index in self.children[self.node_indexes[node]]:
+                child = self.nodes[index]
+
+                if (self.graph.node.get(child).get('resource_type') ==
+                        NodeType.Test):
+                    child_tests.add(child)
+
+        return child_tests
+
+
+def get_nodes_by_qualified_name(project, graph, qualified_name,
+                                graph_index=None):
+    """ returns the nodes matched by qualified_name, which should be either
+    1) a node name or 2) a dot-notation qualified selector"""
+    if graph_index is None:
+        graph_index = GraphIndex(graph)
+
+    return graph_index.get_nodes_by_qualified_name(qualified_name)
+
+
+def get_nodes_from_spec(project, graph, spec, graph_index=None):
+    if graph_index is None:
+        graph_index = GraphIndex(graph)
 
-def get_nodes_from_spec(project, graph, spec):
     select_parents = spec['select_parents']
     select_children = spec['select_children']
     qualified_node_name = spec['qualified_node_name']
 
-    selected_nodes = set(get_nodes_by_qualified_name(project,
-                                                     graph,
-                                                     qualified_node_name))
+    selected_nodes = graph_index.get_nodes_by_qualified_name(
+        qualified_node_name)
 
     additional_nodes = set()
-    test_nodes = set()
 
     if select_parents:
-        for node in selected_nodes:
-            parent_nodes = nx.ancestors(graph, node)
-            additional_nodes.update(parent_nodes)
+        additional_nodes.update(graph_index.get_ancestors(selected_nodes))
 
     if select_children:
-        for node in selected_nodes:
-            child_nodes = nx.descendants(graph, node)
-            additional_nodes.update(child_nodes)
+        additional_nodes.update(graph_index.get_descendants(selected_nodes))
 
     model_nodes = selected_nodes | additional_nodes
 
-    for node in model_nodes:
-        # include tests that depend on this node. if we aren't running tests,
-        # they'll be filtered out later.
-        child_tests = [n for n in graph.successors(node)
-                       if graph.node.get(n).get('resource_type') ==
-                       NodeType.Test]
-        test_nodes.update(child_tests)
+    # include tests that depend on these nodes. if we aren't running tests,
+    # they'll be filtered out later.
+    test_nodes = graph_index.get_child_tests(model_nodes)
 
     return model_nodes | test_nodes
 
@@ -151,13 +277,17 @@ def select_nodes(project, graph, raw_include_specs, raw_exclude_specs):
     include_specs = [parse_spec(spec) for spec in split_include_specs]
     exclude_specs = [parse_spec(spec) for spec in split_exclude_specs]
 
+    graph_index = GraphIndex(graph)
+
     for spec in include_specs:
-        included_nodes = get_nodes_from_spec(project, graph, spec)
+        included_nodes = get_nodes_from_spec(project, graph, spec,
+                                             graph_index)
         warn_if_useless_spec(spec, included_nodes)
         selected_nodes = selected_nodes | included_nodes
 
     for spec in exclude_specs:
-        excluded_nodes = get_nodes_from_spec(project, graph, spec)
+        excluded_nodes = get_nodes_from_spec(project, graph, spec,
+                                             graph_index)
         warn_if_useless_spec(spec, excluded_nodes)
         selected_nodes = selected_nodes - excluded_nodes
 
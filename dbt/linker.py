@@ -3,6 +3,9 @@ from collections import defaultdict
 
 import dbt.utils
 
+import dbt.graph.artifact
+from dbt.graph.ready_queue import ReadyQueue
+
 
 def from_file(graph_file):
     linker = Linker()
@@ -18,6 +21,10 @@ class Linker(object):
         self.graph = nx.DiGraph(**data)
         self.cte_map = defaultdict(set)
 
+        # tests that hold back the models downstream of the models they
+        # check. see `block_on_tests`
+        self.blocking_tests = set()
+
     def edges(self):
         return self.graph.edges()
 
@@ -60,6 +67,16 @@ class Linker(object):
                 "{}".format(cycle)
             )
 
+    def is_blocking_node(self, node, ephemeral_only=False):
+        node_data = self.get_node(node)
+
+        if not (dbt.utils.is_blocking_dependency(node_data) or
+                node in self.blocking_tests):
+            return False
+
+        return (ephemeral_only is False or
+                dbt.utils.get_materialization(node_data) == 'ephemeral')
+
     def as_dependency_list(self, limit_to=None, ephemeral_only=False):
         """returns a list of list of nodes, eg. [[0,1], [2], [4,5,6]]. Each
         element contains nodes whose dependenices are subsumed by the union of
@@ -67,8 +84,6 @@ class Linker(object):
         simultaneously assuming that all lists before list `i` have been
         completed"""
 
-        depth_nodes = defaultdict(list)
-
         if limit_to is None:
             graph_nodes = self.graph.nodes()
         else:
@@ -81,17 +96,12 @@ class Linker(object):
                     "it disabled?".format(node)
                 )
 
-            num_ancestors = len([
-                ancestor for ancestor in
-                nx.ancestors(self.graph, node)
-                if (dbt.utils.is_blocking_dependency(
-                        self.get_node(ancestor)) and
-                    (ephemeral_only is False or
-                     dbt.utils.get_materialization(
-                         self.get_node(ancestor)) == 'ephemeral'))
-            ])
+        depths = self.get_blocking_depths(ephemeral_only)
+
+        depth_nodes = defaultdict(list)
 
-            depth_nodes[num_ancestors].append(node)
+        for node in graph_nodes:
+            depth_nodes[depths[node]].append(node)
 
         dependency_list = []
         for depth in sorted(depth_nodes.keys()):
@@ -99,6 +109,125 @@ class Linker(object):
 
         return dependency_list
 
+    def get_blocking_depths(self, ephemeral_only=False):
+        """returns a dict of {node: depth}, where the depth of a node is the
+        number of blocking nodes on the longest path leading up to it. This
+        is computed in a single pass over a topological ordering of the
+        graph, so it runs in O(V + E)."""
+
+        depths = {}
+
+        for node in self.as_topological_ordering():
+            depth = 0
+
+            for parent in self.graph.predecessors(node):
+                parent_depth = depths[parent]
+
+                if self.is_blocking_node(parent, ephemeral_only):
+                    parent_depth += 1
+
+                depth = max(depth, parent_depth)
+
+            depths[node] = depth
+
+        return depths
+
+    def get_blocking_parents(self, limit_to=None, ephemeral_only=False):
+        """returns a dict of {node: set(parents)} for every node in
+        `limit_to`. The parents of a node are the nearest ancestors in
+        `limit_to` that must finish running before the node can start. Nodes
+        outside of `limit_to` are walked through, so a node still waits on a
+        selected grandparent even if its direct parent was not selected."""
+
+        if limit_to is None:
+            selected = set(self.graph.nodes())
+        else:
+            selected = set(limit_to)
+
+        for node in selected:
+            if node not in self.graph:
+                raise RuntimeError(
+                    "Couldn't find model '{}' -- does it exist or is "
+                    "it disabled?".format(node)
+                )
+
+        def is_blocking(node):
+            return (node in selected and
+                    self.is_blocking_node(node, ephemeral_only))
+
+        # nearest blocking ancestors of each node, computed in one
+        # topological pass over the graph
+        frontier = {}
+
+        for node in self.as_topological_ordering():
+            node_frontier = set()
+
+            for parent in self.graph.predecessors(node):
+                if is_blocking(parent):
+                    node_frontier.add(parent)
+                else:
+                    node_frontier.update(frontier[parent])
+
+            frontier[node] = node_frontier
+
+        return {node: frontier[node] for node in selected}
+
+    def as_ready_queue(self, limit_to=None, ephemeral_only=False,
+                       node_weights=None):
+        """returns a ReadyQueue which hands out the nodes in `limit_to` as
+        soon as all of their blocking parents have been marked done.
+        `node_weights` (eg. previous execution times) are used to start the
+        longest chains of nodes first."""
+        blocking_parents = self.get_blocking_parents(limit_to, ephemeral_only)
+
+        ordering = [node for node in self.as_topological_ordering()
+                    if node in blocking_parents]
+
+        return ReadyQueue(blocking_parents, ordering, node_weights)
+
+    def copy(self):
+        """returns a linker with a copy of this one's graph. Each node gets its
+        own dict in the copy, but the values in it are shared."""
+        linker = Linker()
+        linker.graph = nx.DiGraph(self.graph)
+        linker.cte_map = defaultdict(set, {
+            source: set(cte_models)
+            for source, cte_models in self.cte_map.items()})
+        linker.blocking_tests = set(self.blocking_tests)
+
+        return linker
+
+    def block_on_tests(self, tests, limit_to):
+        """returns a copy of this linker, where the models in `limit_to` that
+        select from a model checked by one of `tests` depend on that test
+        too, so that they don't start until the test has passed. Models that
+        the test itself depends on (eg. the parent in a relationships test)
+        are left alone. This linker's graph isn't changed."""
+        linker = self.copy()
+        graph = linker.graph
+        limit_to = set(limit_to)
+
+        for test in tests:
+            parents = graph.predecessors(test)
+
+            # with a single parent, none of the parent's children can be
+            # upstream of the test
+            if len(parents) > 1:
+                ancestors = nx.ancestors(graph, test)
+            else:
+                ancestors = set(parents)
+
+            for parent in parents:
+                for child in graph.successors(parent):
+                    if (child in limit_to and child not in ancestors and
+                            dbt.utils.is_type(linker.get_node(child),
+                                              dbt.utils.NodeType.Model)):
+                        graph.add_edge(test, child)
+
+            linker.blocking_tests.add(test)
+
+        return linker
+
     def inject_cte(self, source, cte_model):
         self.cte_map[source].add(cte_model)
 
@@ -120,10 +249,13 @@ class Linker(object):
         return children
 
     def update_node_data(self, node, data):
+        # the graph gets its own dict for the node, so that the runner's
+        # state (eg. `skip`) doesn't leak into the flat graph. the node's
+        # values, including its sql, are shared rather than copied.
         self.graph.add_node(node, data)
 
     def write_graph(self, outfile):
-        nx.write_gpickle(self.graph, outfile)
+        dbt.graph.artifact.write_graph(self.graph, outfile)
 
     def read_graph(self, infile):
-        self.graph = nx.read_gpickle(infile)
+        self.graph = dbt.graph.artifact.read_graph(infile)
@@ -8,6 +8,7 @@ import dbt.version
 import dbt.flags as flags
 import dbt.project as project
 import dbt.task.run as run_task
+import dbt.task.build as build_task
 import dbt.task.debug as debug_task
 import dbt.task.clean as clean_task
 import dbt.task.deps as deps_task
@@ -292,8 +293,9 @@ def parse_args(args):
     )
     sub.set_defaults(cls=archive_task.ArchiveTask, which='archive')
 
-    sub = subs.add_parser('run', parents=[base_subparser])
-    sub.add_argument(
+    # flags for selecting and building models, shared by `run` and `build`
+    model_subparser = argparse.ArgumentParser(add_help=False)
+    model_subparser.add_argument(
         '--models',
         required=False,
         nargs='+',
@@ -301,7 +303,7 @@ def parse_args(args):
         Specify the models to include.
         """
     )
-    sub.add_argument(
+    model_subparser.add_argument(
         '--exclude',
         required=False,
         nargs='+',
@@ -309,16 +311,7 @@ def parse_args(args):
         Specify the models to exclude.
         """
     )
-    sub.add_argument(
-        '--threads',
-        type=int,
-        required=False,
-        help="""
-        Specify number of threads to use while executing models. Overrides
-        settings in profiles.yml.
-        """
-    )
-    sub.add_argument(
+    model_subparser.add_argument(
         '--non-destructive',
         action='store_true',
         help="""
@@ -326,24 +319,95 @@ def parse_args(args):
         of dropped.
         """
     )
-    sub.add_argument(
+    model_subparser.add_argument(
         '--full-refresh',
         action='store_true',
         help="""
         If specified, DBT will drop incremental models and fully-recalculate
         the incremental table from the model definition.
         """)
+
+    # flags for compiling and running the project, shared by `run`, `build`
+    # and `test`
+    execution_subparser = argparse.ArgumentParser(add_help=False)
+    execution_subparser.add_argument(
+        '--parse-workers',
+        type=int,
+        required=False,
+        help="""
+        Specify number of processes to use while parsing the project. By
+        default, the project is parsed in a single process.
+        """
+    )
+    execution_subparser.add_argument(
+        '--low-memory',
+        action='store_true',
+        help="""
+        If specified, dbt will let go of the SQL compiled for each node once
+        it has run, instead of keeping it until the end of the run. The
+        compiled SQL is still written to the target directory.
+        """
+    )
+
+    # flags for running tests, shared by `build` and `test`
+    test_subparser = argparse.ArgumentParser(add_help=False)
+    test_subparser.add_argument(
+        '--batch-schema-tests',
+        action='store_true',
+        help="""
+        If specified, dbt will run all of the schema tests on a model in a
+        single query, instead of running one query per test. Tests are still
+        reported one by one.
+        """
+    )
+
+    sub = subs.add_parser('run', parents=[base_subparser, model_subparser,
+                                          execution_subparser])
+    sub.add_argument(
+        '--threads',
+        type=int,
+        required=False,
+        help="""
+        Specify number of threads to use while executing models. Overrides
+        settings in profiles.yml.
+        """
+    )
     sub.set_defaults(cls=run_task.RunTask, which='run')
 
+    sub = subs.add_parser('build', parents=[base_subparser, model_subparser,
+                                            execution_subparser,
+                                            test_subparser])
+    sub.add_argument(
+        '--threads',
+        type=int,
+        required=False,
+        help="""
+        Specify number of threads to use while executing models and tests.
+        Overrides settings in profiles.yml.
+        """
+    )
+    sub.set_defaults(cls=build_task.BuildTask, which='build')
+
     sub = subs.add_parser('seed', parents=[base_subparser])
     sub.add_argument(
         '--drop-existing',
         action='store_true',
         help="Drop existing seed tables and recreate them"
     )
+    sub.add_argument(
+        '--threads',
+        type=int,
+        required=False,
+        help="""
+        Specify number of threads to use while loading seed files. Overrides
+        settings in profiles.yml.
+        """
+    )
     sub.set_defaults(cls=seed_task.SeedTask, which='seed')
 
-    sub = subs.add_parser('test', parents=[base_subparser])
+    sub = subs.add_parser('test', parents=[base_subparser,
+                                           execution_subparser,
+                                           test_subparser])
     sub.add_argument(
         '--data',
         action='store_true',
@@ -379,7 +443,6 @@ def parse_args(args):
         Specify the models to exclude from testing.
         """
     )
-
     sub.set_defaults(cls=test_task.TestTask, which='test')
 
     if len(args) == 0:
@@ -1,3 +1,5 @@
+import copy
+import multiprocessing
 import os.path
 import jinja2.runtime
 
@@ -12,6 +14,47 @@ from dbt.utils import deep_merge, DBTConfigKeys, compiler_error
 
 import dbt.clients.jinja
 
+# {id(project): ProjectConfigTrie}, shared by every SourceConfig
+project_config_tries_lock = multiprocessing.Lock()
+project_config_tries = {}
+
+
+class ProjectConfigTrie(object):
+    """
+    The project-level model configs of one project, resolved for each fqn
+    prefix that has been looked up. Models in the same folder share the
+    config resolved for that folder, so the project's `models:` config tree
+    is walked once per folder instead of once per model.
+
+    Each level is a dict of:
+      - config: the resolved config for this prefix
+      - model_configs: the project's `models:` config at this prefix
+      - children: {fqn level: child level}
+    """
+
+    def __init__(self, project):
+        # keep a reference to the project, so that its id can't be reused by
+        # another project while this trie is alive
+        self.project = project
+        self.models = project.get('models')
+        self.root = None
+
+
+def get_project_config_trie(project):
+    with project_config_tries_lock:
+        trie = project_config_tries.get(id(project))
+
+        if trie is None or trie.models is not project.get('models'):
+            trie = ProjectConfigTrie(project)
+            project_config_tries[id(project)] = trie
+
+        return trie
+
+
+def clear_project_config_tries():
+    with project_config_tries_lock:
+        project_config_tries.clear()
+
 
 class SourceConfig(object):
     Materializations = ['view', 'table', 'incremental', 'ephemeral']
@@ -55,9 +98,9 @@ class SourceConfig(object):
             merged_config.update(intermediary_merged)
         return merged_config
 
-    # this is re-evaluated every time `config` is called.
-    # we can cache it, but that complicates things.
-    # TODO : see how this fares performance-wise
+    # this is cached until the in-model config changes. the project-level
+    # configs are cached for every model in the project, see
+    # ProjectConfigTrie
     @property
     def config(self):
         """
@@ -71,17 +114,12 @@ class SourceConfig(object):
            - active project config
            - in-model config
         """
-        defaults = {"enabled": True, "materialized": "view"}
-        active_config = self.load_config_from_active_project()
-
-        if self.active_project['name'] == self.own_project['name']:
-            cfg = self._merge(defaults, active_config, self.in_model_config)
-        else:
-            own_config = self.load_config_from_own_project()
+        if self._config is None:
+            self._config = self.resolve_config()
 
-            cfg = self._merge(
-                defaults, own_config, self.in_model_config, active_config
-            )
+        # the resolved config is kept for the next lookup, so callers get
+        # their own copy of anything they could change in place
+        cfg = self.copy_config(self._config)
 
         # mask this as a table if it's an incremental model with
         # --full-refresh provided
@@ -90,6 +128,19 @@ class SourceConfig(object):
 
         return cfg
 
+    def resolve_config(self):
+        defaults = {"enabled": True, "materialized": "view"}
+        active_config = self.load_config_from_active_project()
+
+        if self.active_project['name'] == self.own_project['name']:
+            return self._merge(defaults, active_config, self.in_model_config)
+
+        own_config = self.load_config_from_own_project()
+
+        return self._merge(
+            defaults, own_config, self.in_model_config, active_config
+        )
+
     def is_full_refresh(self):
         return dbt.flags.FULL_REFRESH
 
@@ -104,6 +155,7 @@ class SourceConfig(object):
                 config[hook_field] = self.__get_hooks(config, hook_field)
 
         self.in_model_config.update(config)
+        self._config = None
 
     def __get_hooks(self, relevant_configs, key):
         hooks = []
@@ -147,42 +199,87 @@ class SourceConfig(object):
 
         return relevant_configs
 
-    def get_project_config(self, project):
-        # most configs are overwritten by a more specific config, but pre/post
-        # hooks are appended!
+    def get_empty_project_config(self):
         config = {}
         for k in SourceConfig.AppendListFields:
             config[k] = []
         for k in SourceConfig.ExtendDictFields:
             config[k] = {}
 
+        return config
+
+    def copy_config(self, config):
+        # hooks and vars are extended in place, so they can't be shared.
+        # vars can be nested, so they're copied all the way down
+        copied = config.copy()
+        for k in SourceConfig.AppendListFields:
+            if k in config:
+                copied[k] = list(config[k])
+        for k in SourceConfig.ExtendDictFields:
+            if k in config:
+                copied[k] = copy.deepcopy(config[k])
+
+        return copied
+
+    def get_project_config(self, project):
+        # most configs are overwritten by a more specific config, but pre/post
+        # hooks are appended!
         model_configs = project.get('models')
 
         if model_configs is None:
-            return config
+            return self.get_empty_project_config()
 
-        # mutates config
-        self.smart_update(config, model_configs)
+        # threads racing to resolve the same prefix would resolve it to the
+        # same config, so the trie isn't locked
+        trie = get_project_config_trie(project)
 
-        fqn = self.fqn[:]
-        for level in fqn:
-            level_config = model_configs.get(level, None)
-            if level_config is None:
-                break
+        if trie.root is None:
+            config = self.get_empty_project_config()
 
             # mutates config
-            relevant_configs = self.smart_update(config, level_config)
+            self.smart_update(config, model_configs)
 
-            clobber_configs = {
-                k: v for (k, v) in relevant_configs.items()
-                if k not in SourceConfig.AppendListFields and
-                k not in SourceConfig.ExtendDictFields
+            trie.root = {
+                'config': config,
+                'model_configs': model_configs,
+                'children': {},
             }
 
-            config.update(clobber_configs)
-            model_configs = model_configs[level]
+        level_node = trie.root
 
-        return config
+        for level in self.fqn:
+            child = level_node['children'].get(level)
+
+            if child is None:
+                model_configs = level_node['model_configs']
+                level_config = model_configs.get(level, None)
+                if level_config is None:
+                    break
+
+                config = self.copy_config(level_node['config'])
+
+                # mutates config
+                relevant_configs = self.smart_update(config, level_config)
+
+                clobber_configs = {
+                    k: v for (k, v) in relevant_configs.items()
+                    if k not in SourceConfig.AppendListFields and
+                    k not in SourceConfig.ExtendDictFields
+                }
+
+                config.update(clobber_configs)
+
+                child = {
+                    'config': config,
+                    'model_configs': model_configs[level],
+                    'children': {},
+                }
+
+                level_node['children'][level] = child
+
+            level_node = child
+
+        return self.copy_config(level_node['config'])
 
     def load_config_from_own_project(self):
         return self.get_project_config(self.own_project)
@@ -0,0 +1,159 @@
+import copy
+import hashlib
+import json
+import os
+import pickle
+
+import dbt.flags
+import dbt.version
+
+from dbt.logger import GLOBAL_LOGGER as logger
+
+parse_cache_file_name = 'parse_cache.pickle'
+
+# bump this whenever the shape of a cache entry changes
+PARSE_CACHE_VERSION = 2
+
+
+def get_parse_cache_path(project):
+    return os.path.join(project['target-path'], parse_cache_file_name)
+
+
+class ParseCache(object):
+    """
+    Remembers the result of rendering a node's SQL at parse time (its refs,
+    config and macro dependencies) across invocations. Entries are keyed on
+    the node's path and contents, the project configs that feed into parsing
+    and the contents of every macro file, so an entry is only reused if
+    re-rendering the node would give the same result.
+
+    Entries are copied when they're added to the cache, and handed out
+    as-is: whoever applies an entry to a node must copy anything the node
+    might change.
+    """
+
+    def __init__(self, entries=None):
+        if entries is None:
+            entries = {}
+
+        self.entries = entries
+        self.used_entries = {}
+        self.project_hashes = {}
+        self.macros_hash = None
+
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return cls()
+
+        try:
+            with open(path, 'rb') as fh:
+                contents = pickle.load(fh)
+        except Exception as e:
+            logger.debug("Ignoring unreadable parse cache {}: {}"
+                         .format(path, str(e)))
+            return cls()
+
+        if (not isinstance(contents, dict) or
+                contents.get('version') != PARSE_CACHE_VERSION or
+                contents.get('dbt_version') != dbt.version.__version__):
+            logger.debug("Ignoring out of date parse cache {}".format(path))
+            return cls()
+
+        return cls(contents.get('entries', {}))
+
+    def save(self, path, parsed_nodes=None):
+        """writes the cache to `path`, keeping only the entries used by this
+        invocation, so that deleted or changed files don't accumulate in the
+        cache. If only part of the project was parsed, `parsed_nodes` is the
+        set of unique ids that were, and the entries for the rest of the
+        project are kept too."""
+        entries = dict(self.used_entries)
+
+        if parsed_nodes is not None:
+            for key, entry in self.entries.items():
+                if entry.get('unique_id') not in parsed_nodes:
+                    entries.setdefault(key, entry)
+
+        contents = {
+            'version': PARSE_CACHE_VERSION,
+            'dbt_version': dbt.version.__version__,
+            'entries': entries,
+        }
+
+        with open(path, 'wb') as fh:
+            pickle.dump(contents, fh, pickle.HIGHEST_PROTOCOL)
+
+        logger.debug("Parse cache: {} hits, {} misses"
+                     .format(self.hits, self.misses))
+
+    def get_project_hash(self, project):
+        # keep a reference to the project alongside its hash, so its id
+        # can't be reused by another project while this cache is alive
+        if id(project) not in self.project_hashes:
+            relevant_config = {
+                'name': project.get('name'),
+                'models': project.get('models'),
+            }
+
+            project_hash = hashlib.md5(json.dumps(
+                relevant_config, sort_keys=True, default=str
+            ).encode('utf-8')).hexdigest()
+
+            self.project_hashes[id(project)] = (project, project_hash)
+
+        _, project_hash = self.project_hashes[id(project)]
+        return project_hash
+
+    def set_macros(self, macros):
+        """records the macros that nodes are parsed with. A change to any
+        macro file misses every entry."""
+        macro_files = sorted(set(
+            (macro.get('package_name'), macro.get('path'),
+             macro.get('raw_sql'))
+            for macro in macros.values()))
+
+        self.macros_hash = hashlib.md5(json.dumps(
+            macro_files, default=str).encode('utf-8')).hexdigest()
+
+    def get_key(self, node, node_path, root_project_config,
+                package_project_config, tags, fqn_extra):
+        key_data = {
+            'unique_id': node_path,
+            'path': node.get('path'),
+            'config': node.get('config'),
+            'tags': sorted(tags),
+            'fqn_extra': fqn_extra,
+            'full_refresh': dbt.flags.FULL_REFRESH,
+            'root_project': self.get_project_hash(root_project_config),
+            'package_project': self.get_project_hash(package_project_config),
+            'macros': self.macros_hash,
+        }
+
+        hasher = hashlib.md5()
+        hasher.update(json.dumps(key_data, sort_keys=True, default=str)
+                      .encode('utf-8'))
+        hasher.update(node.get('raw_sql').encode('utf-8'))
+
+        return hasher.hexdigest()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.used_entries[key] = entry
+
+        return entry
+
+    def set(self, key, entry):
+        entry = copy.deepcopy(entry)
+
+        self.entries[key] = entry
+        self.used_entries[key] = entry
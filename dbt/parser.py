@@ -1,4 +1,4 @@
-import copy
+import multiprocessing
 import os
 import yaml
 import re
@@ -15,7 +15,7 @@ import dbt.contracts.graph.unparsed
 import dbt.contracts.project
 
 from dbt.utils import NodeType, get_materialization, Var
-from dbt.compat import basestring, to_string
+from dbt.compat import basestring, intern, to_string
 from dbt.logger import GLOBAL_LOGGER as logger
 
 
@@ -65,6 +65,8 @@ def __ref(model):
 
 
 def process_refs(flat_graph):
+    node_index = dbt.utils.NameIndex(flat_graph.get('nodes'))
+
     for _, node in flat_graph.get('nodes').items():
         target_model_name = None
         target_model_package = None
@@ -78,7 +80,8 @@ def process_refs(flat_graph):
             target_model = dbt.utils.find_model_by_name(
                 flat_graph,
                 target_model_name,
-                target_model_package)
+                target_model_package,
+                node_index)
 
             if target_model is None:
                 dbt.exceptions.ref_target_not_found(
@@ -106,7 +109,8 @@ def get_fqn(path, package_project_config, extra=[]):
            extra +
            [name])
 
-    return fqn
+    # every node in a folder has the same fqn prefix, so share the strings
+    return [intern(part) for part in fqn]
 
 
 def parse_macro_file(macro_file_path,
@@ -159,16 +163,13 @@ def parse_macro_file(macro_file_path,
     return to_return
 
 
-def parse_node(node, node_path, root_project_config, package_project_config,
-               all_projects, tags=None, fqn_extra=None):
-    logger.debug("Parsing {}".format(node_path))
-    node = copy.deepcopy(node)
+def prepare_node(node, node_path, package_project_config, tags, fqn_extra):
+    # the parsed node shares the unparsed node's fields (raw_sql, path, etc),
+    # and only gets its own copy of the ones that parsing changes in place
+    node = node.copy()
 
-    if tags is None:
-        tags = set()
-
-    if fqn_extra is None:
-        fqn_extra = []
+    if 'config' in node:
+        node['config'] = node['config'].copy()
 
     node.update({
         'refs': [],
@@ -180,14 +181,18 @@ def parse_node(node, node_path, root_project_config, package_project_config,
 
     fqn = get_fqn(node.get('path'), package_project_config, fqn_extra)
 
-    config = dbt.model.SourceConfig(
-        root_project_config, package_project_config, fqn)
-
     node['unique_id'] = node_path
     node['empty'] = (len(node.get('raw_sql').strip()) == 0)
     node['fqn'] = fqn
     node['tags'] = tags
 
+    return node
+
+
+def render_node(node, root_project_config, package_project_config):
+    config = dbt.model.SourceConfig(
+        root_project_config, package_project_config, node.get('fqn'))
+
     # Set this temporarily. Not the full config yet (as config() hasn't been
     # called from jinja yet). But the Var() call below needs info about project
     # level configs b/c they might contain refs. TODO: Restructure this?
@@ -215,7 +220,141 @@ def parse_node(node, node_path, root_project_config, package_project_config,
     return node
 
 
-def parse_sql_nodes(nodes, root_project, projects, tags=None):
+def get_parse_cache_entry(node):
+    return {
+        'unique_id': node['unique_id'],
+        'refs': node['refs'],
+        'macros': node['depends_on']['macros'],
+        'config': node['config'],
+    }
+
+
+def apply_parse_cache_entry(node, entry):
+    # the node hasn't changed since it was last rendered, so restore the
+    # results of rendering it instead of rendering it again. the entry is
+    # shared with the cache, so the node gets its own copy of the lists and
+    # dicts that parsing adds to.
+    node['refs'] = list(entry['refs'])
+    node['depends_on']['macros'] = list(entry['macros'])
+    node['config'] = entry['config'].copy()
+
+    return node
+
+
+def parse_node(node, node_path, root_project_config, package_project_config,
+               all_projects, tags=None, fqn_extra=None, parse_cache=None):
+    logger.debug("Parsing {}".format(node_path))
+
+    if tags is None:
+        tags = set()
+
+    if fqn_extra is None:
+        fqn_extra = []
+
+    cache_key = None
+
+    if parse_cache is not None:
+        cache_key = parse_cache.get_key(node, node_path, root_project_config,
+                                        package_project_config, tags,
+                                        fqn_extra)
+
+    node = prepare_node(node, node_path, package_project_config, tags,
+                        fqn_extra)
+
+    if cache_key is not None:
+        cached = parse_cache.get(cache_key)
+
+        if cached is not None:
+            return apply_parse_cache_entry(node, cached)
+
+    render_node(node, root_project_config, package_project_config)
+
+    if cache_key is not None:
+        parse_cache.set(cache_key, get_parse_cache_entry(node))
+
+    return node
+
+
+def init_parse_worker(strict_mode, non_destructive, full_refresh):
+    # workers aren't guaranteed to be forked from this process (eg. on
+    # windows), so set the flags that parsing depends on explicitly
+    dbt.flags.STRICT_MODE = strict_mode
+    dbt.flags.NON_DESTRUCTIVE = non_destructive
+    dbt.flags.FULL_REFRESH = full_refresh
+
+
+def get_parse_pool(num_workers):
+    return multiprocessing.Pool(
+        num_workers,
+        init_parse_worker,
+        (dbt.flags.STRICT_MODE,
+         dbt.flags.NON_DESTRUCTIVE,
+         dbt.flags.FULL_REFRESH))
+
+
+def parse_node_job(job):
+    return parse_node(*job)
+
+
+def parse_nodes(jobs, parse_cache=None, parse_pool=None):
+    """parses a list of jobs, where each job is a tuple of the positional
+    arguments to `parse_node`, and returns the parsed nodes in the same order.
+    If a `parse_pool` is given, the nodes that can't be restored from the
+    parse cache are rendered in the pool's worker processes."""
+
+    if parse_pool is None:
+        return [parse_node(*job, parse_cache=parse_cache) for job in jobs]
+
+    parsed = [None] * len(jobs)
+    cache_keys = {}
+    to_render = []
+
+    # the parse cache lives in this process, so look nodes up here and only
+    # send the misses to the workers
+    for index, job in enumerate(jobs):
+        (node, node_path, root_project_config, package_project_config,
+         _, tags, fqn_extra) = job
+
+        if tags is None:
+            tags = set()
+
+        if fqn_extra is None:
+            fqn_extra = []
+
+        if parse_cache is not None:
+            cache_key = parse_cache.get_key(node, node_path,
+                                            root_project_config,
+                                            package_project_config, tags,
+                                            fqn_extra)
+            cached = parse_cache.get(cache_key)
+
+            if cached is not None:
+                parsed[index] = apply_parse_cache_entry(
+                    prepare_node(node, node_path, package_project_config,
+                                 tags, fqn_extra),
+                    cached)
+                continue
+
+            cache_keys[index] = cache_key
+
+        to_render.append(index)
+
+    # map returns results in the order of its input, regardless of which
+    # worker finishes first, so the merged output is deterministic
+    rendered = parse_pool.map(parse_node_job,
+                              [jobs[index] for index in to_render])
+
+    for index, node in zip(to_render, rendered):
+        parsed[index] = node
+
+        if index in cache_keys:
+            parse_cache.set(cache_keys[index], get_parse_cache_entry(node))
+
+    return parsed
+
+
+def parse_sql_nodes(nodes, root_project, projects, tags=None,
+                    parse_cache=None, parse_pool=None):
     if tags is None:
         tags = set()
 
@@ -223,6 +362,8 @@ def parse_sql_nodes(nodes, root_project, projects, tags=None):
 
     dbt.contracts.graph.unparsed.validate_nodes(nodes)
 
+    jobs = []
+
     for node in nodes:
         package_name = node.get('package_name')
 
@@ -230,13 +371,17 @@ def parse_sql_nodes(nodes, root_project, projects, tags=None):
                              package_name,
                              node.get('name'))
 
+        jobs.append((node,
+                     node_path,
+                     root_project,
+                     projects.get(package_name),
+                     projects,
+                     tags,
+                     None))
+
+    for parsed in parse_nodes(jobs, parse_cache, parse_pool):
         # TODO if this is set, raise a compiler error
-        to_return[node_path] = parse_node(node,
-                                          node_path,
-                                          root_project,
-                                          projects.get(package_name),
-                                          projects,
-                                          tags=tags)
+        to_return[parsed.get('unique_id')] = parsed
 
     dbt.contracts.graph.parsed.validate_nodes(to_return)
 
@@ -244,15 +389,25 @@ def parse_sql_nodes(nodes, root_project, projects, tags=None):
 
 
 def load_and_parse_sql(package_name, root_project, all_projects, root_dir,
-                       relative_dirs, resource_type, tags=None):
-    extension = "[!.#~]*.sql"
-
+                       relative_dirs, resource_type, tags=None,
+                       parse_cache=None, parse_pool=None):
     if tags is None:
         tags = set()
 
     if dbt.flags.STRICT_MODE:
         dbt.contracts.project.validate_list(all_projects)
 
+    result = load_sql_nodes(package_name, root_dir, relative_dirs,
+                            resource_type)
+
+    return parse_sql_nodes(result, root_project, all_projects, tags,
+                           parse_cache=parse_cache, parse_pool=parse_pool)
+
+
+def load_sql_nodes(package_name, root_dir, relative_dirs, resource_type):
+    """returns the unparsed nodes for the sql files in `relative_dirs`"""
+    extension = "[!.#~]*.sql"
+
     file_matches = dbt.clients.system.find_matching(
         root_dir,
         relative_dirs,
@@ -282,7 +437,7 @@ def load_and_parse_sql(package_name, root_project, all_projects, root_dir,
             'raw_sql': file_contents
         })
 
-    return parse_sql_nodes(result, root_project, all_projects, tags)
+    return result
 
 
 def load_and_parse_macros(package_name, root_project, all_projects, root_dir,
@@ -318,8 +473,10 @@ def load_and_parse_macros(package_name, root_project, all_projects, root_dir,
     return result
 
 
-def parse_schema_tests(tests, root_project, projects):
+def parse_schema_tests(tests, root_project, projects, parse_cache=None,
+                       parse_pool=None):
     to_return = {}
+    jobs = []
 
     for test in tests:
         test_yml = yaml.safe_load(test.get('raw_yml'))
@@ -345,14 +502,19 @@ def parse_schema_tests(tests, root_project, projects):
                     continue
 
                 for config in configs:
-                    to_add = parse_schema_test(
-                        test, model_name, config, test_type,
-                        root_project,
-                        projects.get(test.get('package_name')),
-                        all_projects=projects)
+                    to_add, node_path = build_schema_test(
+                        test, model_name, config, test_type)
+
+                    jobs.append((to_add,
+                                 node_path,
+                                 root_project,
+                                 projects.get(test.get('package_name')),
+                                 projects,
+                                 {'schema'},
+                                 None))
 
-                    if to_add is not None:
-                        to_return[to_add.get('unique_id')] = to_add
+    for parsed in parse_nodes(jobs, parse_cache, parse_pool):
+        to_return[parsed.get('unique_id')] = parsed
 
     return to_return
 
@@ -390,10 +552,7 @@ def as_kwarg(key, value):
     return "{key}={value}".format(key=key, value=formatted_value)
 
 
-def parse_schema_test(test_base, model_name, test_config, test_type,
-                      root_project_config, package_project_config,
-                      all_projects):
-
+def build_schema_test(test_base, model_name, test_config, test_type):
     if isinstance(test_config, (basestring, int, float, bool)):
         test_args = {'arg': test_config}
     else:
@@ -421,18 +580,27 @@ def parse_schema_test(test_base, model_name, test_config, test_type,
         'raw_sql': raw_sql
     }
 
-    return parse_node(to_return,
-                      get_test_path(test_base.get('package_name'),
-                                    name),
+    return to_return, get_test_path(test_base.get('package_name'), name)
+
+
+def parse_schema_test(test_base, model_name, test_config, test_type,
+                      root_project_config, package_project_config,
+                      all_projects, parse_cache=None):
+    to_parse, node_path = build_schema_test(test_base, model_name,
+                                            test_config, test_type)
+
+    return parse_node(to_parse,
+                      node_path,
                       root_project_config,
                       package_project_config,
                       all_projects,
                       tags={'schema'},
-                      fqn_extra=None)
+                      fqn_extra=None,
+                      parse_cache=parse_cache)
 
 
 def load_and_parse_yml(package_name, root_project, all_projects, root_dir,
-                       relative_dirs):
+                       relative_dirs, parse_cache=None, parse_pool=None):
     extension = "[!.#~]*.yml"
 
     if dbt.flags.STRICT_MODE:
@@ -461,10 +629,12 @@ def load_and_parse_yml(package_name, root_project, all_projects, root_dir,
             'raw_yml': file_contents
         })
 
-    return parse_schema_tests(result, root_project, all_projects)
+    return parse_schema_tests(result, root_project, all_projects,
+                              parse_cache=parse_cache, parse_pool=parse_pool)
 
 
-def parse_archives_from_projects(root_project, all_projects):
+def parse_archives_from_projects(root_project, all_projects,
+                                 parse_cache=None):
     archives = []
     to_return = {}
 
@@ -481,7 +651,8 @@ def parse_archives_from_projects(root_project, all_projects):
             node_path,
             root_project,
             all_projects.get(archive.get('package_name')),
-            all_projects)
+            all_projects,
+            parse_cache=parse_cache)
 
     return to_return
 
@@ -1,18 +1,20 @@
 from __future__ import print_function
 
 import hashlib
+import json
 import psycopg2
 import os
 import time
-import itertools
 from datetime import datetime
 
 from dbt.adapters.factory import get_adapter
 from dbt.logger import GLOBAL_LOGGER as logger
 
-from dbt.utils import get_materialization, NodeType, is_type
+from dbt.utils import get_materialization, NodeType, is_type, \
+    share_equal_string
 
 import dbt.clients.jinja
+import dbt.compat
 import dbt.compilation
 import dbt.exceptions
 import dbt.linker
@@ -26,6 +28,8 @@ from multiprocessing.dummy import Pool as ThreadPool
 ABORTED_TRANSACTION_STRING = ("current transaction is aborted, commands "
                               "ignored until end of transaction block")
 
+timings_file_name = 'run_timings.json'
+
 
 def get_timestamp():
     return time.strftime("%H:%M:%S")
@@ -200,6 +204,59 @@ def execute_test(profile, test):
     return row[0]
 
 
+def get_schema_test_batch_key(node):
+    """returns the model checked by a schema test, or None if `node` isn't a
+    schema test that can be batched. Tests that ref more than one model, like
+    relationships tests, aren't batched, as there's no telling which of the
+    models they're attached to."""
+    if not is_type(node, NodeType.Test) or \
+       'schema' not in node.get('tags', set()):
+        return None
+
+    depends_on = set(node.get('depends_on', {}).get('nodes', []))
+
+    if len(depends_on) != 1:
+        return None
+
+    return depends_on.pop()
+
+
+def get_batched_test_sql(tests):
+    """returns a query that runs every test in `tests`, as a single row with
+    one failure count per test"""
+    columns = [
+        "(\n{test_sql}\n) as test_{index}".format(
+            test_sql=test.get('wrapped_sql').strip().rstrip(';'),
+            index=index)
+        for index, test in enumerate(tests)]
+
+    return "select\n{}".format(",\n".join(columns))
+
+
+def execute_test_batch(profile, tests, connection_name):
+    adapter = get_adapter(profile)
+    handle, cursor = adapter.execute_one(
+        profile,
+        get_batched_test_sql(tests),
+        connection_name)
+
+    rows = cursor.fetchall()
+
+    if len(rows) != 1:
+        raise RuntimeError(
+            "Bad test batch {name}: Returned {num_rows} rows instead of 1"
+            .format(name=connection_name, num_rows=len(rows)))
+
+    row = rows[0]
+    if len(row) != len(tests):
+        raise RuntimeError(
+            "Bad test batch {name}: Returned {num_cols} cols instead of "
+            "{num_tests}".format(name=connection_name, num_cols=len(row),
+                                 num_tests=len(tests)))
+
+    return list(row)
+
+
 def print_model_result_line(result, schema_name, index, total):
     model = result.node
     info = 'OK created'
@@ -239,6 +296,13 @@ def print_results_line(results, execution_time):
         .format(stat_line=stat_line, execution_time=execution_time))
 
 
+def has_hooks(model):
+    cfg = model.get('config', {})
+
+    return (len(cfg.get('pre-hook', [])) > 0 or
+            len(cfg.get('post-hook', [])) > 0)
+
+
 def execute_model(profile, model, existing):
     adapter = get_adapter(profile)
     schema = adapter.get_default_schema(profile)
@@ -275,7 +339,7 @@ def execute_model(profile, model, existing):
             model_name=model.get('name'))
 
         # and update the list of what exists
-        existing = adapter.query_for_existing(
+        existing = adapter.list_relations(
             profile,
             schema,
             model_name=model.get('name'))
@@ -290,6 +354,25 @@ def execute_model(profile, model, existing):
     elif is_enabled(model) and get_materialization(model) != 'ephemeral':
         result = adapter.execute_model(profile, model)
 
+        # incremental models are built in place, everything else is built in
+        # the tmp relation and renamed below
+        if get_materialization(model) == 'incremental':
+            identifier = model.get('name')
+        else:
+            identifier = tmp_name
+
+        if get_materialization(model) == 'view':
+            relation_type = 'view'
+        else:
+            relation_type = 'table'
+
+        if has_hooks(model):
+            # the model's hooks ran arbitrary sql alongside it, so anything
+            # we know about the schema might be out of date now
+            adapter.clear_relation_cache()
+        else:
+            adapter.cache_created_relation(schema, identifier, relation_type)
+
     # DROP OLD RELATION AND RENAME
     if dbt.flags.NON_DESTRUCTIVE:
         # in non-destructive mode, we truncate and repopulate tables, and
@@ -367,6 +450,11 @@ def execute_archive(profile, node, context):
         profile=profile,
         model=node)
 
+    # the archive may have added columns to the target table
+    adapter.cache_created_relation(node_cfg.get('target_schema'),
+                                   node_cfg.get('target_table'),
+                                   'table')
+
     return result
 
 
@@ -387,7 +475,62 @@ def run_hooks(profile, hooks, context, source):
 
     adapter = get_adapter(profile)
 
-    return adapter.execute_all(profile=profile, sqls=compiled_hooks)
+    connection = adapter.execute_all(profile=profile, sqls=compiled_hooks)
+
+    # hooks can run arbitrary sql, so anything we know about the schema might
+    # be out of date now
+    adapter.clear_relation_cache()
+
+    return connection
+
+
+def free_compiled_sql(node):
+    # the sql can only be recovered from the node's build_path, so nodes
+    # that weren't written there (eg. ephemeral models) keep theirs
+    if node.get('build_path') is None:
+        return
+
+    for key in ['compiled_sql', 'injected_sql', 'wrapped_sql']:
+        if node.get(key) is not None:
+            node[key] = None
+
+
+def load_node_timings(target_path):
+    """Returns a dict of {unique_id: execution_time} recorded by previous
+    runs, or an empty dict if no timings have been recorded yet."""
+    timings_path = os.path.join(target_path, timings_file_name)
+
+    if not os.path.exists(timings_path):
+        return {}
+
+    try:
+        with open(timings_path) as fh:
+            timings = json.load(fh)
+    except ValueError as e:
+        logger.debug("Ignoring invalid timings file {}: {}"
+                     .format(timings_path, str(e)))
+        return {}
+
+    if not isinstance(timings, dict):
+        return {}
+
+    return timings
+
+
+def write_node_timings(target_path, results):
+    """Merges the execution times of the nodes that ran successfully into the
+    timings file, so the next run can start the slowest chains first."""
+    timings = load_node_timings(target_path)
+
+    for result in results:
+        if result.skipped or result.errored:
+            continue
+
+        timings[result.node.get('unique_id')] = result.execution_time
+
+    timings_path = os.path.join(target_path, timings_file_name)
+    dbt.compat.write_file(timings_path,
+                          json.dumps(timings, sort_keys=True, indent=2))
 
 
 def track_model_run(index, num_nodes, run_model_result):
@@ -476,7 +619,11 @@ class RunManager(object):
         sql = dbt.clients.jinja.get_rendered(node.get('wrapped_sql'),
                                              self.node_context(node))
 
-        node['wrapped_sql'] = sql
+        # tests and analyses aren't wrapped, so their sql is often the same
+        # as the injected (or compiled) sql the node already has
+        node['wrapped_sql'] = share_equal_string(
+            sql, node.get('wrapped_sql'), node.get('injected_sql'),
+            node.get('compiled_sql'))
 
         return node
 
@@ -532,8 +679,7 @@ class RunManager(object):
             profile = self.project.run_environment()
             adapter = get_adapter(profile)
 
-            compiler = dbt.compilation.Compiler(self.project)
-            node = compiler.compile_node(node, flat_graph)
+            node = self.compiler.compile_node(node, flat_graph)
 
             if not is_ephemeral:
                 node, status = self.execute_node(node, flat_graph, existing,
@@ -592,27 +738,77 @@ class RunManager(object):
 
         return result
 
-    def as_flat_dep_list(self, linker, nodes_to_run):
-        dependency_list = linker.as_dependency_list(
-            nodes_to_run,
-            ephemeral_only=True)
+    def safe_execute_test_batch(self, data):
+        """runs the schema tests of one model in a single query. If the query
+        fails, the tests are run one at a time instead, so that each one's
+        error is reported."""
+        (batch_key, nodes, flat_graph, existing, schema_name, node_indexes,
+         num_nodes) = data
+
+        start_time = time.time()
+
+        profile = self.project.run_environment()
+        adapter = get_adapter(profile)
+        connection_name = 'test_batch.{}'.format(batch_key)
+
+        for node, node_index in zip(nodes, node_indexes):
+            print_start_line(node, schema_name, node_index, num_nodes)
+
+        try:
+            compiled_nodes = [
+                self.inject_runtime_config(
+                    self.compiler.compile_node(node, flat_graph))
+                for node in nodes]
+
+            statuses = execute_test_batch(profile, compiled_nodes,
+                                          connection_name)
+
+        except (dbt.exceptions.Exception, Exception) as e:
+            # safe_execute_node handles (or re-raises) each test's error the
+            # same way it would if the tests hadn't been batched. dbt's own
+            # exceptions aren't builtin Exceptions, so they're caught too.
+            logger.debug("Error running the schema tests on {} in one "
+                         "query, running them one at a time: {}"
+                         .format(batch_key, str(e).strip()))
+
+            return [self.safe_execute_node(
+                        (node, flat_graph, existing, schema_name, node_index,
+                         num_nodes))
+                    for node, node_index in zip(nodes, node_indexes)]
+
+        finally:
+            adapter.release_connection(profile, connection_name)
+
+        # the tests ran together, so they share the execution time
+        execution_time = (time.time() - start_time) / len(nodes)
+        results = []
+
+        for node, status, node_index in zip(compiled_nodes, statuses,
+                                            node_indexes):
+            result = RunModelResult(node,
+                                    status=status,
+                                    execution_time=execution_time)
+
+            print_result_line(result, schema_name, node_index, num_nodes)
+            results.append(result)
+
+        return results
 
-        concurrent_dependency_list = []
-        for level in dependency_list:
-            node_level = [linker.get_node(node) for node in level]
-            concurrent_dependency_list.append(node_level)
+    def get_schema_test_batches(self, linker, nodes):
+        """returns {model: number of schema tests on it} for the schema
+        tests in `nodes`"""
+        batch_sizes = {}
 
-        return concurrent_dependency_list
+        for node in nodes:
+            batch_key = get_schema_test_batch_key(linker.get_node(node))
 
-    def as_concurrent_dep_list(self, linker, nodes_to_run):
-        dependency_list = linker.as_dependency_list(nodes_to_run)
+            if batch_key is not None:
+                batch_sizes[batch_key] = batch_sizes.get(batch_key, 0) + 1
 
-        concurrent_dependency_list = []
-        for level in dependency_list:
-            node_level = [linker.get_node(node) for node in level]
-            concurrent_dependency_list.append(node_level)
+        return batch_sizes
 
-        return concurrent_dependency_list
+    def is_batching_schema_tests(self):
+        return getattr(self.args, 'batch_schema_tests', False) is True
 
     def on_model_failure(self, linker, selected_nodes):
         def skip_dependent(node):
@@ -625,15 +821,74 @@ class RunManager(object):
 
         return skip_dependent
 
-    def execute_nodes(self, flat_graph, node_dependency_list, on_failure,
+    def is_low_memory(self):
+        return getattr(self.args, 'low_memory', False) is True
+
+    def get_ephemeral_consumers(self, linker, selected_nodes):
+        """returns {ephemeral node: number of selected nodes that refer to
+        it}. An ephemeral node's expanded CTEs are needed until all of these
+        have been compiled."""
+        selected_nodes = set(selected_nodes)
+        consumers = {}
+
+        for node in selected_nodes:
+            if get_materialization(linker.get_node(node)) == 'ephemeral':
+                consumers[node] = len([
+                    child for child in linker.graph.successors(node)
+                    if child in selected_nodes])
+
+        return consumers
+
+    def free_finished_node(self, linker, flat_graph, unique_id,
+                           ephemeral_consumers):
+        """frees the compiled sql of `unique_id` once it has finished, and
+        the expanded CTEs of the ephemeral nodes that nothing still needs to
+        compile. Ephemeral nodes keep their own compiled sql, as it isn't
+        written anywhere it could be read back from, so their CTEs can still
+        be expanded again if they're needed after all."""
+        to_free = []
+
+        if ephemeral_consumers.get(unique_id, 0) == 0:
+            to_free.append(unique_id)
+
+        for parent in linker.graph.predecessors(unique_id):
+            if parent in ephemeral_consumers:
+                ephemeral_consumers[parent] -= 1
+
+                if ephemeral_consumers[parent] == 0:
+                    to_free.append(parent)
+
+        for node_id in to_free:
+            node = flat_graph['nodes'].get(node_id)
+
+            if node is not None:
+                free_compiled_sql(node)
+
+            self.compiler.expanded_ctes.pop(node_id, None)
+
+    def safe_execute_node_and_notify(self, data, completed):
+        # runs in a worker thread. exceptions are handed back to the thread
+        # that dispatched the node so that it can re-raise them. if one
+        # wasn't, that thread would wait for the node forever.
+        try:
+            completed.put(([self.safe_execute_node(data)], None))
+        except (dbt.exceptions.Exception, Exception) as e:
+            completed.put((None, e))
+
+    def safe_execute_test_batch_and_notify(self, data, completed):
+        try:
+            completed.put((self.safe_execute_test_batch(data), None))
+        except (dbt.exceptions.Exception, Exception) as e:
+            completed.put((None, e))
+
+    def execute_nodes(self, linker, flat_graph, node_queue, on_failure,
                       should_run_hooks=False):
         profile = self.project.run_environment()
         adapter = get_adapter(profile)
         master_connection = adapter.get_connection(profile)
         schema_name = adapter.get_default_schema(profile)
 
-        flat_nodes = list(itertools.chain.from_iterable(
-            node_dependency_list))
+        flat_nodes = [linker.get_node(node) for node in node_queue.nodes()]
 
         if len(flat_nodes) == 0:
             logger.info("WARNING: Nothing to do. Try checking your model "
@@ -646,7 +901,7 @@ class RunManager(object):
         )
 
         master_connection = adapter.begin(profile)
-        existing = adapter.query_for_existing(profile, schema_name)
+        existing = adapter.list_relations(profile, schema_name)
         master_connection = adapter.commit(master_connection)
 
         node_id_to_index_map = {}
@@ -678,38 +933,126 @@ class RunManager(object):
 
         node_results = []
 
-        for node_list in node_dependency_list:
-            for i, node in enumerate([node for node in node_list
-                                      if node.get('skip')]):
-                print_skip_line(node, schema_name, node.get('name'),
-                                get_idx(node), num_nodes)
+        # in low memory mode, sql is only kept while it might still be used
+        low_memory = self.is_low_memory()
+
+        if low_memory:
+            ephemeral_consumers = self.get_ephemeral_consumers(
+                linker, node_queue.nodes())
+
+        # when batching, the schema tests on a model are held back until all
+        # of them are ready, and then run together
+        if self.is_batching_schema_tests():
+            batch_sizes = self.get_schema_test_batches(linker,
+                                                       node_queue.nodes())
+        else:
+            batch_sizes = {}
+
+        pending_batches = {}
+
+        def dispatch_batch(batch_key):
+            nodes = pending_batches.pop(batch_key)
+
+            data = (batch_key, nodes, flat_graph, existing, schema_name,
+                    [get_idx(node) for node in nodes], num_nodes)
+
+            pool.apply_async(self.safe_execute_test_batch_and_notify,
+                             (data, completed))
+
+        # results are passed back from the worker threads through this
+        # queue. nodes are dispatched as soon as all of their blocking
+        # parents have finished, rather than one dependency level at a time.
+        completed = dbt.compat.Queue()
+        num_in_flight = 0
+
+        try:
+            while not node_queue.is_finished():
+                while node_queue.has_ready() and num_in_flight < num_threads:
+                    node_id = node_queue.get()
+                    node = linker.get_node(node_id)
+                    batch_key = get_schema_test_batch_key(node)
+
+                    if batch_key in batch_sizes:
+                        batch_sizes[batch_key] -= 1
+
+                    if node.get('skip'):
+                        print_skip_line(node, schema_name, node.get('name'),
+                                        get_idx(node), num_nodes)
+
+                        node_results.append(RunModelResult(node, skip=True))
+                        node_queue.mark_done(node_id)
+
+                        if low_memory:
+                            self.free_finished_node(linker, flat_graph,
+                                                    node_id,
+                                                    ephemeral_consumers)
 
-                node_result = RunModelResult(node, skip=True)
-                node_results.append(node_result)
+                    elif batch_key in batch_sizes:
+                        pending_batches.setdefault(batch_key, []).append(node)
 
-            nodes_to_execute = [node for node in node_list
-                                if not node.get('skip')]
+                    else:
+                        data = (node, flat_graph, existing, schema_name,
+                                get_idx(node), num_nodes,)
 
-            for result in pool.imap_unordered(
-                    self.safe_execute_node,
-                    [(node, flat_graph, existing, schema_name,
-                      get_idx(node), num_nodes,)
-                     for node in nodes_to_execute]):
+                        pool.apply_async(self.safe_execute_node_and_notify,
+                                         (data, completed))
+                        num_in_flight += 1
+                        continue
 
-                node_results.append(result)
+                    if batch_key in pending_batches and \
+                       batch_sizes[batch_key] == 0:
+                        dispatch_batch(batch_key)
+                        num_in_flight += 1
 
-                # propagate so that CTEs get injected properly
-                flat_graph['nodes'][result.node.get('unique_id')] = result.node
+                if num_in_flight == 0 and len(pending_batches) > 0:
+                    # nothing else can run until these tests have, so run
+                    # the ones that are ready
+                    for batch_key in list(pending_batches.keys()):
+                        dispatch_batch(batch_key)
+                        num_in_flight += 1
 
-                index = get_idx(result.node)
-                # track_model_run(index, num_nodes, result)
+                if num_in_flight == 0:
+                    if node_queue.is_finished():
+                        break
 
-                if result.errored:
-                    on_failure(result.node)
-                    logger.info(result.error)
+                    raise dbt.exceptions.InternalException(
+                        "No nodes are running or ready to run, but {} nodes "
+                        "have not finished".format(
+                            len(node_queue) - node_queue.num_done))
 
-        pool.close()
-        pool.join()
+                results, error = completed.get()
+                num_in_flight -= 1
+
+                if error is not None:
+                    raise error
+
+                for result in results:
+                    node_results.append(result)
+
+                    # propagate so that CTEs get injected properly
+                    flat_graph['nodes'][result.node.get('unique_id')] = \
+                        result.node
+
+                    index = get_idx(result.node)
+                    # track_model_run(index, num_nodes, result)
+
+                    if result.errored:
+                        on_failure(result.node)
+                        logger.info(result.error)
+
+                    elif result.failed:
+                        on_failure(result.node)
+
+                    node_queue.mark_done(result.node.get('unique_id'))
+
+                    if low_memory:
+                        self.free_finished_node(linker, flat_graph,
+                                                result.node.get('unique_id'),
+                                                ephemeral_consumers)
+
+        finally:
+            pool.close()
+            pool.join()
 
         if should_run_hooks:
             adapter.begin(profile)
@@ -727,18 +1070,31 @@ class RunManager(object):
 
     def get_ancestor_ephemeral_nodes(self, flat_graph, linked_graph,
                                      selected_nodes):
-        all_ancestors = dbt.graph.selector.select_nodes(
-            self.project,
-            linked_graph,
-            ['+{}'.format(flat_graph.get('nodes').get(node).get('name'))
-             for node in selected_nodes],
-            [])
-
-        return set([ancestor for ancestor in all_ancestors
-                    if(flat_graph['nodes'][ancestor].get(
-                            'resource_type') == NodeType.Model and
-                       get_materialization(
-                           flat_graph['nodes'][ancestor]) == 'ephemeral')])
+        """returns the ephemeral models that the selected nodes need to
+        compile: their ephemeral parents, those models' ephemeral parents,
+        and so on. The walk stops at other nodes, since anything they select
+        from has already been built. Every selected node is walked from at
+        once, so each node is visited at most once."""
+        def is_ephemeral_model(node):
+            node = flat_graph['nodes'][node]
+
+            return (node.get('resource_type') == NodeType.Model and
+                    get_materialization(node) == 'ephemeral')
+
+        ephemeral_nodes = set(node for node in selected_nodes
+                              if is_ephemeral_model(node))
+        to_visit = list(selected_nodes)
+
+        while len(to_visit) > 0:
+            node = to_visit.pop()
+
+            for parent in linked_graph.predecessors(node):
+                if parent not in ephemeral_nodes and \
+                   is_ephemeral_model(parent):
+                    ephemeral_nodes.add(parent)
+                    to_visit.append(parent)
+
+        return ephemeral_nodes
 
     def get_nodes_to_run(self, graph, include_spec, exclude_spec,
                          resource_types, tags):
@@ -771,6 +1127,33 @@ class RunManager(object):
 
         return set(post_filter)
 
+    def can_compile_subgraph(self, include_spec, exclude_spec,
+                             resource_types):
+        """Models selected by name (or by name and their parents) can be run
+        from a graph of just the selected models and their ancestors. Any
+        other selection needs the whole graph, eg. to find the children of a
+        model."""
+        if include_spec is None or resource_types != [NodeType.Model]:
+            return False
+
+        if exclude_spec is None:
+            exclude_spec = []
+
+        include_specs = [dbt.graph.selector.parse_spec(spec) for spec in
+                         dbt.graph.selector.split_specs(include_spec)]
+        exclude_specs = [dbt.graph.selector.parse_spec(spec) for spec in
+                         dbt.graph.selector.split_specs(exclude_spec)]
+
+        for spec in include_specs + exclude_specs:
+            if spec['select_children']:
+                return False
+
+        for spec in exclude_specs:
+            if spec['select_parents']:
+                return False
+
+        return True
+
     def try_create_schema(self):
         profile = self.project.run_environment()
         adapter = get_adapter(profile)
@@ -791,10 +1174,18 @@ class RunManager(object):
 
     def run_types_from_graph(self, include_spec, exclude_spec,
                              resource_types, tags, should_run_hooks=False,
-                             flatten_graph=False):
-        compiler = dbt.compilation.Compiler(self.project)
-        compiler.initialize()
-        (flat_graph, linker) = compiler.compile()
+                             flatten_graph=False, tests_block_models=False):
+        # the compiler is shared by every node in the run, so that the
+        # compiler contexts are only built once per package
+        self.compiler = dbt.compilation.Compiler(self.project)
+        self.compiler.initialize()
+
+        if self.can_compile_subgraph(include_spec, exclude_spec,
+                                     resource_types):
+            (flat_graph, linker) = self.compiler.compile_subgraph(
+                include_spec)
+        else:
+            (flat_graph, linker) = self.compiler.compile()
 
         selected_nodes = self.get_nodes_to_run(
             linker.graph,
@@ -811,14 +1202,21 @@ class RunManager(object):
 
         selected_nodes = selected_nodes | ephemeral_models
 
-        dependency_list = []
-
-        if flatten_graph is False:
-            dependency_list = self.as_concurrent_dep_list(linker,
-                                                          selected_nodes)
-        else:
-            dependency_list = self.as_flat_dep_list(linker,
-                                                    selected_nodes)
+        # tests run as soon as the models they check have been built, and a
+        # failing test skips the models downstream of them. this is done on
+        # a copy of the graph, and the copy is used for the rest of the run
+        if tests_block_models:
+            linker = linker.block_on_tests(
+                [node for node in selected_nodes
+                 if is_type(linker.get_node(node), NodeType.Test)],
+                selected_nodes)
+
+        # when the graph is flattened, only ephemeral models block the
+        # nodes that depend on them
+        node_queue = linker.as_ready_queue(
+            selected_nodes,
+            ephemeral_only=flatten_graph,
+            node_weights=load_node_timings(self.target_path))
 
         profile = self.project.run_environment()
         adapter = get_adapter(profile)
@@ -828,9 +1226,11 @@ class RunManager(object):
 
             on_failure = self.on_model_failure(linker, selected_nodes)
 
-            results = self.execute_nodes(flat_graph, dependency_list,
+            results = self.execute_nodes(linker, flat_graph, node_queue,
                                          on_failure, should_run_hooks)
 
+            write_node_timings(self.target_path, results)
+
         finally:
             adapter.cleanup_connections()
 
@@ -845,6 +1245,15 @@ class RunManager(object):
                                          tags=set(),
                                          should_run_hooks=True)
 
+    def run_models_and_tests(self, include_spec, exclude_spec):
+        return self.run_types_from_graph(include_spec,
+                                         exclude_spec,
+                                         resource_types=[NodeType.Model,
+                                                         NodeType.Test],
+                                         tags=set(),
+                                         should_run_hooks=True,
+                                         tests_block_models=True)
+
     def run_tests(self, include_spec, exclude_spec, tags):
         return self.run_types_from_graph(include_spec,
                                          exclude_spec,
@@ -1,13 +1,258 @@
+import datetime
+import hashlib
+import io
 import os
 import fnmatch
-from csvkit import table as csv_table, sql as csv_sql
+import csvkit
+from csvkit import sniffer, typeinference, sql as csv_sql
+import sqlalchemy
 from sqlalchemy.dialects import postgresql as postgresql_dialect
 import psycopg2
+from collections import OrderedDict
+from multiprocessing.dummy import Pool as ThreadPool
 
 from dbt.source import Source
 from dbt.logger import GLOBAL_LOGGER as logger
 from dbt.adapters.factory import get_adapter
+from dbt.compat import text_type, to_string
 import dbt.exceptions
+import dbt.version
+
+NoneType = type(None)
+
+# seed files are read, and sent to the database, this many rows at a time,
+# so that a large seed file is never held in memory all at once
+CHUNK_SIZE = 10000
+INSERT_BATCH_SIZE = 1000
+
+# the csv dialect is sniffed from this many characters at the start of a
+# seed file
+SNIFF_SIZE = 65536
+
+DATE_TYPES = [datetime.datetime, datetime.date, datetime.time]
+
+# seed tables are commented with a hash of the file they were loaded from,
+# so unchanged files aren't loaded again
+SEED_HASH_PREFIX = 'dbt seed: '
+
+SQL_TYPES = {
+    bool: sqlalchemy.Boolean,
+    float: sqlalchemy.Float,
+    datetime.datetime: sqlalchemy.DateTime,
+    datetime.date: sqlalchemy.Date,
+    datetime.time: sqlalchemy.Time,
+}
+
+
+def get_seed_hash(path):
+    # the table created for a file can change between versions of dbt
+    hasher = hashlib.md5(dbt.version.__version__.encode('utf-8'))
+
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(65536), b''):
+            hasher.update(block)
+
+    return hasher.hexdigest()
+
+
+def get_chunks(rows, chunk_size):
+    for start in range(0, len(rows), chunk_size):
+        yield rows[start:start + chunk_size]
+
+
+def format_csv_value(value):
+    # unquoted empty values are loaded as nulls, and everything else is
+    # quoted so that it's loaded as-is
+    if value is None:
+        return ''
+
+    return '"' + to_string(value).replace('"', '""') + '"'
+
+
+def format_csv_row(row):
+    return ','.join([format_csv_value(value) for value in row]) + '\n'
+
+
+def combine_types(first, second):
+    """returns the type csvkit would infer for a column made up of values of
+    types `first` and `second`"""
+    if first is None or first is NoneType:
+        return second
+    elif second is NoneType or first is second:
+        return first
+
+    types = set([first, second])
+
+    if types == set([int, float]):
+        return float
+    elif types == set([datetime.date, datetime.datetime]):
+        return datetime.datetime
+
+    return text_type
+
+
+class SeedColumn(object):
+    """
+    A column of a seed file. Its type is inferred the same way csvkit infers
+    it for a whole column, but one chunk of values at a time: each chunk's
+    type is inferred, and combined with the types of the chunks before it.
+    """
+
+    def __init__(self, name):
+        # empty column names don't make sense
+        self.name = name or '_unnamed'
+
+        self.type = None
+        self.has_nulls = False
+        self.max_length = 0
+        self.min_value = None
+        self.max_value = None
+
+    def update(self, values):
+        chunk_type, normal_values = typeinference.normalize_column_type(
+            values)
+
+        if chunk_type in DATE_TYPES:
+            # csvkit picks any one of the types when a column mixes dates,
+            # times and datetimes, so find a type that fits all of them
+            chunk_type = None
+
+            for value in normal_values:
+                if value is not None:
+                    chunk_type = combine_types(chunk_type, type(value))
+
+        self.type = combine_types(self.type, chunk_type)
+        self.has_nulls = self.has_nulls or None in normal_values
+
+        # normalize_column_type replaces null-like values with ''
+        self.max_length = max([self.max_length] +
+                              [len(value) for value in values if value])
+
+        if chunk_type is int:
+            int_values = [value for value in normal_values
+                          if value is not None]
+
+            if self.min_value is not None:
+                int_values.extend([self.min_value, self.max_value])
+
+            self.min_value = min(int_values)
+            self.max_value = max(int_values)
+
+    def normalize(self, values):
+        _, normal_values = typeinference.normalize_column_type(
+            values, normal_type=self.type)
+
+        return normal_values
+
+    def get_sql_column(self):
+        if self.type is int:
+            if self.max_value > csv_sql.SQL_INTEGER_MAX or \
+               self.min_value < csv_sql.SQL_INTEGER_MIN:
+                sql_type = sqlalchemy.BigInteger()
+            else:
+                sql_type = sqlalchemy.Integer()
+
+        elif self.type is text_type:
+            if self.has_nulls:
+                length = max(self.max_length, 4)
+            else:
+                length = self.max_length
+
+            sql_type = sqlalchemy.String(length=length)
+
+        elif self.type in SQL_TYPES:
+            sql_type = SQL_TYPES[self.type]()
+
+        else:
+            # every value is null, or there aren't any rows
+            sql_type = sqlalchemy.String(
+                length=csv_sql.NULL_COLUMN_MAX_LENGTH)
+
+        return sqlalchemy.Column(self.name, sql_type,
+                                 nullable=self.has_nulls)
+
+
+class SeedFile(object):
+    """
+    A seed csv file, read CHUNK_SIZE rows at a time. `infer_columns` reads
+    the whole file to find the type of each column, and `get_rows` reads it
+    again, normalized to those types, so only a chunk of the file is ever
+    held in memory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.num_rows = 0
+
+    def open(self):
+        fh = open(self.path)
+        sample = fh.read(SNIFF_SIZE)
+        fh.seek(0)
+
+        if len(sample) == SNIFF_SIZE and '\n' in sample:
+            # don't sniff a partial line
+            sample = sample[:sample.rindex('\n')]
+
+        reader = csvkit.CSVKitReader(
+            fh, dialect=sniffer.sniff_dialect(sample))
+
+        return fh, reader
+
+    def get_headers(self):
+        fh, reader = self.open()
+
+        with fh:
+            return next(reader, [])
+
+    def get_chunks(self):
+        """yields each chunk of the file, as a list of each column's values
+        in the chunk"""
+        fh, reader = self.open()
+
+        with fh:
+            headers = next(reader, [])
+            chunk = [[] for header in headers]
+            chunk_size = 0
+
+            for row in reader:
+                for index, values in enumerate(chunk):
+                    if index < len(row):
+                        values.append(row[index].strip())
+                    else:
+                        # non-rectangular rows are padded with nulls
+                        values.append(None)
+
+                chunk_size += 1
+
+                if chunk_size == CHUNK_SIZE:
+                    yield chunk
+                    chunk = [[] for header in headers]
+                    chunk_size = 0
+
+            if chunk_size > 0:
+                yield chunk
+
+    def infer_columns(self):
+        columns = [SeedColumn(header) for header in self.get_headers()]
+        self.num_rows = 0
+
+        for chunk in self.get_chunks():
+            for column, values in zip(columns, chunk):
+                column.update(values)
+
+            if len(chunk) > 0:
+                self.num_rows += len(chunk[0])
+
+        return columns
+
+    def get_rows(self, columns):
+        """yields the file's rows, normalized to the types of `columns`, a
+        chunk at a time"""
+        for chunk in self.get_chunks():
+            normal_chunk = [column.normalize(values) for column, values
+                            in zip(columns, chunk)]
+
+            yield list(zip(*normal_chunk))
 
 
 class Seeder:
@@ -32,103 +277,202 @@ class Seeder:
         logger.info("Truncating table {}.{}".format(schema, table))
         cursor.execute(sql)
 
-    def create_table(self, cursor, schema, table, virtual_table):
-        sql_table = csv_sql.make_table(virtual_table, db_schema=schema)
+    def create_table(self, cursor, schema, table, columns):
+        sql_table = sqlalchemy.Table(table, sqlalchemy.MetaData(),
+                                     schema=schema)
+
+        for column in columns:
+            sql_table.append_column(column.get_sql_column())
+
         create_table_sql = csv_sql.make_create_table_statement(
             sql_table, dialect='postgresql'
         )
         logger.info("Creating table {}.{}".format(schema, table))
         cursor.execute(create_table_sql)
 
-    def insert_into_table(self, cursor, schema, table, virtual_table):
-        headers = virtual_table.headers()
+    def insert_into_table(self, cursor, schema, table, seed_file, columns,
+                          use_copy=False):
+        headers = [column.name for column in columns]
 
+        logger.info("Inserting {} records into table {}.{}"
+                    .format(seed_file.num_rows, schema, table))
+
+        for rows in seed_file.get_rows(columns):
+            if use_copy:
+                self.copy_rows(cursor, schema, table, headers, rows)
+            else:
+                self.insert_rows(cursor, schema, table, headers, rows)
+
+    def copy_rows(self, cursor, schema, table, headers, rows):
         header_csv = ", ".join(['"{}"'.format(h) for h in headers])
+        copy_sql = ('COPY "{schema}"."{table}" ({header_csv}) FROM STDIN '
+                    'WITH CSV'.format(
+                        schema=schema,
+                        table=table,
+                        header_csv=header_csv
+                    ))
+
+        csv_data = ''.join([format_csv_row(row) for row in rows])
+        cursor.copy_expert(copy_sql, io.BytesIO(csv_data.encode('utf-8')))
+
+    def insert_rows(self, cursor, schema, table, headers, rows):
+        # values are passed as query parameters, so any % in names must be
+        # escaped
+        header_csv = ", ".join(['"{}"'.format(h.replace('%', '%%'))
+                                for h in headers])
         base_insert = ('INSERT INTO "{schema}"."{table}" ({header_csv}) '
                        'VALUES '.format(
-                           schema=schema,
-                           table=table,
+                           schema=schema.replace('%', '%%'),
+                           table=table.replace('%', '%%'),
                            header_csv=header_csv
                        ))
-        records = []
+        placeholders = "({})".format(", ".join(['%s'] * len(headers)))
 
-        def quote_or_null(s):
-            if s is None:
-                return 'null'
-            else:
-                return "'{}'".format(s)
+        for chunk in get_chunks(rows, INSERT_BATCH_SIZE):
+            insert_sql = "{} {}".format(
+                base_insert, ",\n".join([placeholders] * len(chunk)))
+            values = [value for row in chunk for value in row]
 
-        for row in virtual_table.to_rows():
-            record_csv = ', '.join([quote_or_null(val) for val in row])
-            record_csv_wrapped = "({})".format(record_csv)
-            records.append(record_csv_wrapped)
-        insert_sql = "{} {}".format(base_insert, ",\n".join(records))
-        logger.info("Inserting {} records into table {}.{}"
-                    .format(len(virtual_table.to_rows()), schema, table))
-        cursor.execute(insert_sql)
+            cursor.execute(insert_sql, values)
+
+    def supports_copy(self, profile):
+        # redshift can only COPY from S3 and friends, not from the client
+        return profile.get('type') == 'postgres'
 
     def existing_tables(self, cursor, schema):
-        sql = ("select tablename as name from pg_tables where "
-               "schemaname = '{schema}'".format(schema=schema))
+        """returns {table name: seed hash} for the tables in `schema`. The
+        hash is None for tables that weren't loaded by this version of
+        `dbt seed`."""
+        sql = ("select c.relname as name, d.description "
+               "from pg_class c "
+               "join pg_namespace n on n.oid = c.relnamespace "
+               "left join pg_description d "
+               "on d.objoid = c.oid and d.objsubid = 0 "
+               "where n.nspname = '{schema}' and c.relkind = 'r'"
+               .format(schema=schema))
 
         cursor.execute(sql)
-        existing = set([row[0] for row in cursor.fetchall()])
-        return existing
+        existing = {}
 
-    def do_seed(self, schema, cursor, drop_existing):
-        existing_tables = self.existing_tables(cursor, schema)
-
-        csvs = self.find_csvs()
-        for csv in csvs:
-
-            table_name = csv.name
-            fh = open(csv.filepath)
-            virtual_table = csv_table.Table.from_csv(fh, table_name)
-
-            if table_name in existing_tables:
-                if drop_existing:
-                    self.drop_table(cursor, schema, table_name)
-                    self.create_table(
-                        cursor,
-                        schema,
-                        table_name,
-                        virtual_table
-                    )
-                else:
-                    self.truncate_table(cursor, schema, table_name)
+        for name, description in cursor.fetchall():
+            if description is not None and \
+               description.startswith(SEED_HASH_PREFIX):
+                existing[name] = description[len(SEED_HASH_PREFIX):]
             else:
-                self.create_table(cursor, schema, table_name, virtual_table)
+                existing[name] = None
 
-            try:
-                self.insert_into_table(
-                    cursor, schema, table_name, virtual_table
-                )
-            except psycopg2.ProgrammingError as e:
-                logger.info(
-                    'Encountered an error while inserting into table "{}"."{}"'
-                    .format(schema, table_name)
-                )
-                logger.info(
-                    'Check for formatting errors in {}'.format(csv.filepath)
-                )
-                logger.info(
-                    'Try --drop-existing to delete and recreate the table '
-                    'instead'
+        return existing
+
+    def set_seed_hash(self, cursor, schema, table, seed_hash):
+        sql = ('comment on table "{schema}"."{table}" is \'{comment}\''
+               .format(schema=schema, table=table,
+                       comment=SEED_HASH_PREFIX + seed_hash))
+        cursor.execute(sql)
+
+    def do_seed(self, schema, cursor, csv, seed_hash, existing_tables,
+                drop_existing, use_copy=False):
+        table_name = csv.name
+        seed_file = SeedFile(csv.filepath)
+        columns = seed_file.infer_columns()
+
+        if table_name in existing_tables:
+            if drop_existing:
+                self.drop_table(cursor, schema, table_name)
+                self.create_table(
+                    cursor,
+                    schema,
+                    table_name,
+                    columns
                 )
-                logger.info(str(e))
+            else:
+                self.truncate_table(cursor, schema, table_name)
+        else:
+            self.create_table(cursor, schema, table_name, columns)
+
+        try:
+            self.insert_into_table(
+                cursor, schema, table_name, seed_file, columns, use_copy
+            )
+            self.set_seed_hash(cursor, schema, table_name, seed_hash)
+        except psycopg2.ProgrammingError as e:
+            logger.info(
+                'Encountered an error while inserting into table "{}"."{}"'
+                .format(schema, table_name)
+            )
+            logger.info(
+                'Check for formatting errors in {}'.format(csv.filepath)
+            )
+            logger.info(
+                'Try --drop-existing to delete and recreate the table '
+                'instead'
+            )
+            logger.info(str(e))
+
+    def seed_csv(self, profile, schema, csv, existing_tables, drop_existing):
+        """seeds `csv` on a connection of its own, in its own transaction"""
+        seed_hash = get_seed_hash(csv.filepath)
+
+        if not drop_existing and \
+           existing_tables.get(csv.name) == seed_hash:
+            logger.info("Skipping table {}.{}, {} hasn't changed"
+                        .format(schema, csv.name, csv.filepath))
+            return
+
+        adapter = get_adapter(profile)
+        connection_name = 'seed.{}'.format(csv.name)
+        connection = adapter.get_connection(profile, connection_name)
 
-    def seed(self, drop_existing=False):
+        try:
+            with connection.get('handle') as handle:
+                with handle.cursor() as cursor:
+                    self.do_seed(schema, cursor, csv, seed_hash,
+                                 existing_tables, drop_existing,
+                                 self.supports_copy(profile))
+        finally:
+            adapter.release_connection(profile, connection_name)
+
+    def seed(self, drop_existing=False, threads=None):
         profile = self.project.run_environment()
 
         if profile.get('type') == 'snowflake':
             raise dbt.exceptions.NotImplementedException(
                 "`seed` operation is not supported for snowflake.")
 
+        if threads is not None:
+            # the connection pool is sized by the profile's threads
+            profile = profile.copy()
+            profile['threads'] = threads
+
+        num_threads = profile.get('threads', 1)
+
         adapter = get_adapter(profile)
+        schema = adapter.get_default_schema(profile)
         connection = adapter.get_connection(profile)
 
-        schema = connection.get('credentials', {}).get('schema')
+        try:
+            with connection.get('handle') as handle:
+                with handle.cursor() as cursor:
+                    existing_tables = self.existing_tables(cursor, schema)
+        finally:
+            adapter.release_connection(profile, 'master')
+
+        # files with the same name are loaded into the same table, and the
+        # last one found wins
+        csvs = list(OrderedDict(
+            (csv.name, csv) for csv in self.find_csvs()).values())
+
+        logger.info("Seeding {} files with {} threads".format(
+            len(csvs), num_threads))
+
+        # every seed file is loaded into a different table, so they can all
+        # be loaded at once
+        pool = ThreadPool(num_threads)
 
-        with connection.get('handle') as handle:
-            with handle.cursor() as cursor:
-                self.do_seed(schema, cursor, drop_existing)
+        try:
+            pool.map(lambda csv: self.seed_csv(profile, schema, csv,
+                                               existing_tables,
+                                               drop_existing),
+                     csvs)
+        finally:
+            pool.close()
+            pool.join()
@@ -0,0 +1,26 @@
+from dbt.logger import GLOBAL_LOGGER as logger
+from dbt.runner import RunManager
+import dbt.utils
+
+
+class BuildTask:
+    """
+    Runs models and their tests together. Each model's tests start as soon
+    as the model has been built, and a failing test skips the models
+    downstream of the model it checks.
+    """
+    def __init__(self, args, project):
+        self.args = args
+        self.project = project
+
+    def run(self):
+        runner = RunManager(
+            self.project, self.project['target-path'], self.args
+        )
+
+        results = runner.run_models_and_tests(self.args.models,
+                                              self.args.exclude)
+
+        logger.info(dbt.utils.get_run_status_line(results))
+
+        return results
@@ -9,4 +9,4 @@ class SeedTask:
 
     def run(self):
         seeder = Seeder(self.project)
-        seeder.seed(self.args.drop_existing)
+        seeder.seed(self.args.drop_existing, self.args.threads)
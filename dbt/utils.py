@@ -4,7 +4,7 @@ import json
 import dbt.project
 from dbt.include import GLOBAL_DBT_MODULES_PATH
 
-from dbt.compat import basestring
+from dbt.compat import basestring, Mapping
 from dbt.logger import GLOBAL_LOGGER as logger
 
 DBTConfigKeys = [
@@ -49,7 +49,7 @@ def get_model_name_or_none(model):
 
     elif isinstance(model, basestring):
         name = model
-    elif isinstance(model, dict):
+    elif isinstance(model, Mapping):
         name = model.get('name')
     else:
         name = model.nice_name
@@ -82,7 +82,7 @@ class Var(object):
         self.model = model
         self.context = context
 
-        if isinstance(model, dict) and model.get('unique_id'):
+        if isinstance(model, Mapping) and model.get('unique_id'):
             self.local_vars = model.get('config', {}).get('vars')
             self.model_name = model.get('name')
         else:
@@ -134,18 +134,102 @@ def model_immediate_name(model, non_destructive):
         return "{}__dbt_tmp".format(model_name)
 
 
-def find_model_by_name(flat_graph, target_name, target_package):
+class NameIndex(object):
+    """
+    Index of the unique ids in a subgraph of the flat graph (eg.
+    `flat_graph['nodes']`), keyed by (resource_type, package_name, name) and
+    by (resource_type, name). Looking up a node by name is then a dict lookup
+    instead of a scan over every node in the graph.
+
+    The index stores unique ids rather than nodes, so nodes can be replaced
+    in the subgraph without invalidating it. Call `sync` to pick up nodes
+    which were added or removed since the index was built.
+    """
+
+    def __init__(self, subgraph=None):
+        if subgraph is None:
+            subgraph = {}
+
+        self.rebuild(subgraph)
+
+    def rebuild(self, subgraph):
+        self.by_qualified_name = {}
+        self.by_name = {}
+        self.unique_ids = set()
+
+        self.sync(subgraph)
+
+    def add(self, unique_id):
+        if unique_id in self.unique_ids:
+            return
+
+        resource_type, package_name, node_name = unique_id.split('.')
+
+        self.unique_ids.add(unique_id)
+        self.by_qualified_name[(resource_type, package_name, node_name)] = \
+            unique_id
+        self.by_name.setdefault((resource_type, node_name), []) \
+                    .append(unique_id)
+
+    def sync(self, subgraph, check_keys=False):
+        """brings the index up to date with `subgraph`. If the subgraph has as
+        many nodes as the index, it's assumed to be unchanged unless
+        `check_keys` is set, as comparing the keys means going through every
+        node."""
+        if len(subgraph) == len(self.unique_ids) and not check_keys:
+            return
+
+        if any(unique_id not in subgraph for unique_id in self.unique_ids):
+            # nodes were removed, and a node can't be taken out of by_name
+            # without disturbing the order of its other entries
+            self.rebuild(subgraph)
+            return
+
+        for unique_id in subgraph:
+            self.add(unique_id)
+
+    def find(self, nodetype, target_name, target_package=None):
+        if target_package is None:
+            unique_ids = self.by_name.get((nodetype, target_name), [])
+
+            if len(unique_ids) == 0:
+                return None
+
+            return unique_ids[0]
+
+        return self.by_qualified_name.get(
+            (nodetype, target_package, target_name))
+
+
+def find_model_by_name(flat_graph, target_name, target_package, index=None):
     return find_by_name(flat_graph, target_name, target_package,
-                        'nodes', NodeType.Model)
+                        'nodes', NodeType.Model, index)
 
 
-def find_macro_by_name(flat_graph, target_name, target_package):
+def find_macro_by_name(flat_graph, target_name, target_package, index=None):
     return find_by_name(flat_graph, target_name, target_package,
-                        'macros', NodeType.Macro)
+                        'macros', NodeType.Macro, index)
 
 
 def find_by_name(flat_graph, target_name, target_package, subgraph,
-                 nodetype):
+                 nodetype, index=None):
+    if index is not None:
+        nodes = flat_graph.get(subgraph)
+        index.sync(nodes)
+
+        unique_id = index.find(nodetype, target_name, target_package)
+
+        if unique_id is None or unique_id not in nodes:
+            # the index may be stale if a node was swapped for another since
+            # it was synced, so check every key before giving up
+            index.sync(nodes, check_keys=True)
+            unique_id = index.find(nodetype, target_name, target_package)
+
+        if unique_id is None:
+            return None
+
+        return nodes[unique_id]
+
     for name, model in flat_graph.get(subgraph).items():
         resource_type, package_name, node_name = name.split('.')
 
@@ -238,6 +322,17 @@ def to_string(s):
         return s
 
 
+def share_equal_string(s, *candidates):
+    """returns the first of `candidates` that is equal to `s`, or `s` if none
+    are. Rendering sql gives back a new string even when nothing in it was
+    rendered, so this lets a node keep a single copy of it."""
+    for candidate in candidates:
+        if candidate is not None and candidate == s:
+            return candidate
+
+    return s
+
+
 def is_blocking_dependency(node):
     return (is_type(node, NodeType.Model))
 
@@ -110,7 +110,7 @@ def get_macro_context(package, macros):
     return global_context
 
 
-def do_wrap(model, opts, flat_graph, context, package):
+def do_wrap(model, opts, flat_graph, context, package, macro_context=None):
     macros = flat_graph['macros']
 
     macro = get_wrapping_macro(model, macros)
@@ -131,7 +131,8 @@ def do_wrap(model, opts, flat_graph, context, package):
 
     wrapped = wrapper_macro(rendered, opts['pre_hooks'], opts['post_hooks'])
 
-    macro_context = get_macro_context(package, flat_graph['macros'])
+    if macro_context is None:
+        macro_context = get_macro_context(package, flat_graph['macros'])
 
     context = context.copy()
     context.update(macro_context)
@@ -177,7 +178,7 @@ class DatabaseWrapper(object):
             to_schema, to_table, self.model.get('name'))
 
 
-def wrap(model, project, context, injected_graph):
+def wrap(model, project, context, injected_graph, macro_context=None):
     adapter = get_adapter(project.run_environment())
 
     schema = context['env'].get('schema', 'public')
@@ -210,4 +211,5 @@ def wrap(model, project, context, injected_graph):
 
     opts.update(db_wrapper.get_context_functions())
 
-    return do_wrap(model, opts, injected_graph, context, project)
+    return do_wrap(model, opts, injected_graph, context, project,
+                   macro_context)
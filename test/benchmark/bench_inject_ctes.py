@@ -0,0 +1,57 @@
+"""
+Times inject_ctes_into_sql on large synthetic models, against the
+sqlparse-based implementation it replaced. Run with:
+
+    python -m test.benchmark.bench_inject_ctes
+"""
+from __future__ import print_function
+
+import time
+
+from collections import OrderedDict
+
+import dbt.flags  # noqa
+import dbt.compilation
+
+from test.unit.test_compiler import inject_ctes_with_sqlparse
+
+SQL_SIZES = [100, 500, 1000]
+NUM_CTES = 10
+
+
+def make_sql(num_ctes):
+    ctes = ',\n'.join(
+        "cte_{i} as (\n"
+        "    -- comment {i}\n"
+        "    select id, 'value; {i}' as name, amount * {i} as amount\n"
+        "    from source_{i}\n"
+        "    where created_at > '2017-01-01'\n"
+        ")".format(i=i)
+        for i in range(num_ctes))
+
+    return "-- a large model\nwith {}\nselect * from cte_0".format(ctes)
+
+
+def make_injected_ctes():
+    return OrderedDict(
+        ('model.bench.ephemeral_{}'.format(i),
+         ' __dbt__CTE__ephemeral_{} as (\nselect 1\n)'.format(i))
+        for i in range(NUM_CTES))
+
+
+def bench(num_ctes):
+    sql = make_sql(num_ctes)
+    ctes = make_injected_ctes()
+
+    for name, inject in [('sqlparse', inject_ctes_with_sqlparse),
+                         ('tokenizer', dbt.compilation.inject_ctes_into_sql)]:
+        start = time.time()
+        inject(sql, ctes)
+        elapsed = time.time() - start
+
+        print("{:>8} chars, {:<9}: {:0.4f}s".format(len(sql), name, elapsed))
+
+
+if __name__ == '__main__':
+    for size in SQL_SIZES:
+        bench(size)
@@ -0,0 +1,61 @@
+"""
+Times Linker.as_dependency_list on synthetic graphs. Run with:
+
+    python -m test.benchmark.bench_linker
+"""
+from __future__ import print_function
+
+import random
+import time
+
+import dbt.flags  # noqa
+import dbt.linker
+
+from dbt.utils import NodeType
+
+GRAPH_SIZES = [10000, 50000]
+MAX_PARENTS = 4
+
+
+def make_linker(num_nodes, seed=0):
+    rng = random.Random(seed)
+    linker = dbt.linker.Linker()
+
+    for i in range(num_nodes):
+        unique_id = 'model.bench.node_{}'.format(i)
+        materialized = 'ephemeral' if rng.random() < 0.1 else 'view'
+
+        linker.add_node(unique_id)
+        linker.update_node_data(unique_id, {
+            'unique_id': unique_id,
+            'resource_type': NodeType.Model,
+            'config': {'materialized': materialized},
+        })
+
+        # only depend on earlier nodes, so the graph is always a DAG
+        if i > 0:
+            for _ in range(rng.randint(0, MAX_PARENTS)):
+                parent = rng.randint(max(0, i - 500), i - 1)
+                linker.dependency(unique_id,
+                                  'model.bench.node_{}'.format(parent))
+
+    return linker
+
+
+def bench(num_nodes):
+    linker = make_linker(num_nodes)
+
+    for ephemeral_only in [False, True]:
+        start = time.time()
+        levels = linker.as_dependency_list(ephemeral_only=ephemeral_only)
+        elapsed = time.time() - start
+
+        print("{:>6} nodes, {:>6} edges, ephemeral_only={!s:<5}: "
+              "{:>4} levels in {:0.3f}s".format(
+                  num_nodes, len(linker.edges()), ephemeral_only,
+                  len(levels), elapsed))
+
+
+if __name__ == '__main__':
+    for size in GRAPH_SIZES:
+        bench(size)
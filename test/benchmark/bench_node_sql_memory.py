@@ -0,0 +1,131 @@
+"""
+Measures the memory held by the sql of compiled nodes, after they've been
+compiled and had their runtime config injected, as they would be at the end
+of a run. Nodes are a mix of schema tests, data tests and models, with and
+without jinja in them. Each distinct sql string is counted once, however
+many of a node's fields refer to it. Run with:
+
+    python -m test.benchmark.bench_node_sql_memory
+"""
+from __future__ import print_function
+
+import shutil
+import sys
+import tempfile
+
+from mock import patch
+
+import dbt.flags  # noqa
+import dbt.compilation
+import dbt.runner
+
+NUM_NODES = 2000
+SQL_LINES = 50
+
+SQL_KEYS = ['raw_sql', 'compiled_sql', 'injected_sql', 'wrapped_sql']
+
+BODY = '\n'.join("    column_{} as column_{},".format(i, i)
+                 for i in range(SQL_LINES))
+
+
+def make_node(i, resource_type, raw_sql, tags=None):
+    name = '{}_{}'.format(resource_type, i)
+
+    return {
+        'name': name,
+        'unique_id': '{}.bench.{}'.format(resource_type, name),
+        'resource_type': resource_type,
+        'package_name': 'bench',
+        'root_path': '.',
+        'path': '{}.sql'.format(name),
+        'original_file_path': '{}.sql'.format(name),
+        'tags': set(tags or []),
+        'config': {'materialized': 'view'},
+        'raw_sql': raw_sql,
+    }
+
+
+def make_nodes():
+    nodes = []
+
+    for i in range(NUM_NODES):
+        if i % 4 == 0:
+            nodes.append(make_node(
+                i, 'model', "select\n{}\n    1 as id\nfrom {{{{ ref('x') }}}}"
+                            .format(BODY)))
+        elif i % 4 == 1:
+            nodes.append(make_node(
+                i, 'model', "select\n{}\n    1 as id\nfrom raw.events_{}"
+                            .format(BODY, i)))
+        elif i % 4 == 2:
+            nodes.append(make_node(
+                i, 'test', "select * from (\nselect\n{}\n    1 as id\n"
+                           "from {{{{ ref('x') }}}}\n) where id is null"
+                           .format(BODY), tags=['schema']))
+        else:
+            nodes.append(make_node(
+                i, 'test', "select\n{}\n    1 as id\nfrom raw.events_{}\n"
+                           "where id < 0".format(BODY, i), tags=['data']))
+
+    return nodes
+
+
+def wrap(model, *args, **kwargs):
+    return "create view {} as (\n{}\n);".format(
+        model.get('name'), model['injected_sql'])
+
+
+def compile_nodes(nodes, target_path):
+    compiler = dbt.compilation.Compiler({'target-path': target_path})
+    compiler.expanded_ctes = {}
+
+    run_manager = dbt.runner.RunManager.__new__(dbt.runner.RunManager)
+    run_manager.compiler = compiler
+
+    flat_graph = {'nodes': {}, 'macros': {}}
+
+    context = {'ref': lambda name: 'analytics.{}'.format(name)}
+
+    with patch.object(dbt.compilation.Compiler, 'get_compiler_context',
+                      return_value=context), \
+            patch.object(dbt.compilation.Compiler,
+                         'get_wrapper_macro_context'), \
+            patch('dbt.wrapper.wrap', wrap), \
+            patch.object(dbt.runner.RunManager, 'node_context',
+                         return_value={}):
+        for node in nodes:
+            run_manager.inject_runtime_config(
+                compiler.compile_node(node, flat_graph))
+
+    return flat_graph
+
+
+def get_sql_sizes(flat_graph):
+    sizes = {}
+
+    for node in flat_graph['nodes'].values():
+        for key in SQL_KEYS:
+            sql = node.get(key)
+
+            if sql is not None:
+                sizes[id(sql)] = sys.getsizeof(sql)
+
+    return sizes
+
+
+def bench():
+    target_path = tempfile.mkdtemp()
+
+    try:
+        flat_graph = compile_nodes(make_nodes(), target_path)
+    finally:
+        shutil.rmtree(target_path)
+
+    sizes = get_sql_sizes(flat_graph)
+
+    print("{} nodes compiled: {} sql strings, {:0.1f}MB".format(
+        len(flat_graph['nodes']), len(sizes), sum(sizes.values()) / 1e6))
+
+
+if __name__ == '__main__':
+    bench()
@@ -0,0 +1,113 @@
+"""
+Measures the time and memory it takes to parse a synthetic project, with
+and without deep-copying each unparsed node first (as parsing used to).
+Memory is measured for preparing the nodes only, since tracing the whole
+parse takes too long.
+Run with:
+
+    python -m test.benchmark.bench_parse_memory
+"""
+from __future__ import print_function
+
+import copy
+import gc
+import time
+import tracemalloc
+
+import dbt.flags  # noqa
+import dbt.parser
+
+NUM_MODELS = 5000
+SQL_LINES = 50
+
+
+def make_project():
+    return {
+        'name': 'bench',
+        'version': '0.1',
+        'profile': 'bench',
+        'project-root': '.',
+    }
+
+
+def make_models(num_models):
+    body = '\n'.join("    column_{} as column_{},".format(i, i)
+                     for i in range(SQL_LINES))
+
+    return [{
+        'name': 'model_{}'.format(i),
+        'resource_type': 'model',
+        'package_name': 'bench',
+        'root_path': '.',
+        'path': 'folder_{}/model_{}.sql'.format(i % 10, i),
+        'raw_sql': "select\n{}\n    1 as id\nfrom {{{{ ref('model_{}') }}}}"
+                   .format(body, max(i - 1, 0)),
+    } for i in range(num_models)]
+
+
+def prepare_nodes(models, project, deep_copy):
+    prepared = []
+
+    for model in models:
+        if deep_copy:
+            model = copy.deepcopy(model)
+
+        prepared.append(dbt.parser.prepare_node(
+            model, 'model.bench.{}'.format(model['name']), project, set(),
+            []))
+
+    return prepared
+
+
+def bench_prepare(deep_copy):
+    project = make_project()
+    models = make_models(NUM_MODELS)
+
+    start = time.time()
+    prepare_nodes(models, project, deep_copy)
+    elapsed = time.time() - start
+
+    gc.collect()
+    tracemalloc.start()
+
+    try:
+        prepared = prepare_nodes(models, project, deep_copy)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    print("{} nodes prepared, deep_copy={!s:<5}: {:0.3f}s, {:0.1f}MB "
+          "retained".format(len(prepared), deep_copy, elapsed,
+                            current / 1e6))
+
+
+def bench_parse(deep_copy):
+    project = make_project()
+    models = make_models(NUM_MODELS)
+
+    prepare_node = dbt.parser.prepare_node
+
+    def deep_copying_prepare_node(node, *args):
+        return prepare_node(copy.deepcopy(node), *args)
+
+    if deep_copy:
+        dbt.parser.prepare_node = deep_copying_prepare_node
+
+    try:
+        start = time.time()
+        parsed = dbt.parser.parse_sql_nodes(models, project,
+                                            {'bench': project})
+        elapsed = time.time() - start
+    finally:
+        dbt.parser.prepare_node = prepare_node
+
+    print("{} nodes parsed, deep_copy={!s:<5}: {:0.3f}s".format(
+        len(parsed), deep_copy, elapsed))
+
+
+if __name__ == '__main__':
+    for deep_copy in [True, False]:
+        bench_prepare(deep_copy)
+
+    for deep_copy in [True, False]:
+        bench_parse(deep_copy)
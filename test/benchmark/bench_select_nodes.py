@@ -0,0 +1,99 @@
+"""
+Times node selection on large synthetic graphs, against checking every node
+against every spec (the selection GraphIndex replaced). Run with:
+
+    python -m test.benchmark.bench_select_nodes
+"""
+from __future__ import print_function
+
+import time
+
+import networkx as nx
+
+import dbt.graph.selector as graph_selector
+
+from test.unit.test_graph_selection import GraphSelectionTest
+
+GRAPH_SIZES = [1000, 5000, 20000]
+NUM_SPECS = 50
+FOLDERS_PER_LEVEL = 10
+
+
+def make_graph(num_nodes):
+    graph = nx.DiGraph()
+
+    for i in range(num_nodes):
+        folder = 'folder_{}'.format(i % FOLDERS_PER_LEVEL)
+        subfolder = 'subfolder_{}'.format((i // FOLDERS_PER_LEVEL) %
+                                          FOLDERS_PER_LEVEL)
+        name = 'model_{}'.format(i)
+
+        graph.add_node('model.root.' + name,
+                       fqn=['root', folder, subfolder, name])
+
+        # each model selects from a couple of earlier ones
+        for parent in [i // 2, i // 3]:
+            if parent < i:
+                graph.add_edge('model.root.model_{}'.format(parent),
+                               'model.root.' + name)
+
+    return graph
+
+
+def make_specs(num_nodes):
+    specs = []
+
+    for i in range(NUM_SPECS):
+        if i % 3 == 0:
+            specs.append('+model_{}'.format((i * 7919) % num_nodes))
+        elif i % 3 == 1:
+            specs.append('model_{}+'.format((i * 7919) % num_nodes))
+        else:
+            specs.append('root.folder_{}.*'.format(i % FOLDERS_PER_LEVEL))
+
+    return specs
+
+
+def select_by_scan(graph, specs):
+    scan = GraphSelectionTest('get_scanned_nodes').get_scanned_nodes
+    selected = set()
+
+    for spec in specs:
+        parsed = graph_selector.parse_spec(spec)
+        nodes = scan(graph, parsed['qualified_node_name'])
+        additional_nodes = set()
+
+        for node in nodes:
+            if parsed['select_parents']:
+                additional_nodes.update(nx.ancestors(graph, node))
+            if parsed['select_children']:
+                additional_nodes.update(nx.descendants(graph, node))
+
+        selected.update(nodes | additional_nodes)
+
+    return selected
+
+
+def bench(num_nodes):
+    graph = make_graph(num_nodes)
+    specs = make_specs(num_nodes)
+
+    timings = []
+
+    for name, select in [
+            ('scan', lambda: select_by_scan(graph, specs)),
+            ('index', lambda: graph_selector.select_nodes(
+                None, graph, specs, []))]:
+        start = time.time()
+        selected = select()
+        elapsed = time.time() - start
+
+        timings.append(selected)
+        print("{:>6} nodes, {:<5}: {:0.4f}s".format(num_nodes, name, elapsed))
+
+    assert timings[0] == timings[1]
+
+
+if __name__ == '__main__':
+    for size in GRAPH_SIZES:
+        bench(size)
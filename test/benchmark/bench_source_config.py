@@ -0,0 +1,116 @@
+"""
+Times resolving model configs, and parsing, for projects with deep
+folder-level config. Run with:
+
+    python -m test.benchmark.bench_source_config
+"""
+from __future__ import print_function
+
+import time
+
+import dbt.flags  # noqa
+import dbt.model
+import dbt.parser
+
+NUM_MODELS = [1000, 5000]
+FOLDER_DEPTH = 6
+FOLDERS_PER_LEVEL = 3
+
+
+def make_models_config(depth):
+    config = {
+        'materialized': 'view',
+        'post-hook': ['grant select on {{{{ this }}}} to level_{}'.format(
+            depth)],
+        'vars': {'level_{}'.format(depth): depth},
+    }
+
+    if depth < FOLDER_DEPTH:
+        for i in range(FOLDERS_PER_LEVEL):
+            config['folder_{}'.format(i)] = make_models_config(depth + 1)
+
+    return config
+
+
+def make_project():
+    return {
+        'name': 'bench',
+        'version': '0.1',
+        'profile': 'bench',
+        'project-root': '.',
+        'models': {'bench': make_models_config(0)},
+    }
+
+
+def get_folders(index):
+    return ['folder_{}'.format((index // FOLDERS_PER_LEVEL ** level) %
+                               FOLDERS_PER_LEVEL)
+            for level in range(FOLDER_DEPTH)]
+
+
+def make_models(num_models):
+    return [{
+        'name': 'model_{}'.format(i),
+        'resource_type': 'model',
+        'package_name': 'bench',
+        'root_path': '.',
+        'path': '/'.join(get_folders(i) + ['model_{}.sql'.format(i)]),
+        'raw_sql': ("{{ config(materialized='table') }}"
+                    "select '{{ var('level_0') }}' as a"),
+    } for i in range(num_models)]
+
+
+def bench_config(num_models, share_tries):
+    project = make_project()
+    dbt.model.clear_project_config_tries()
+
+    start = time.time()
+
+    for i in range(num_models):
+        if not share_tries:
+            dbt.model.clear_project_config_tries()
+
+        fqn = ['bench'] + get_folders(i) + ['model_{}'.format(i)]
+        source_config = dbt.model.SourceConfig(project, project, fqn)
+
+        # once before the in-model config is applied, and twice after
+        source_config.config
+        source_config.update_in_model_config({'materialized': 'table'})
+        source_config.config
+        source_config.config
+
+    return time.time() - start
+
+
+def bench_parse(num_models, share_tries):
+    project = make_project()
+    models = make_models(num_models)
+    dbt.model.clear_project_config_tries()
+
+    resolve_config = dbt.model.SourceConfig.resolve_config
+
+    def resolve_config_without_trie(self):
+        dbt.model.clear_project_config_tries()
+        return resolve_config(self)
+
+    if not share_tries:
+        dbt.model.SourceConfig.resolve_config = resolve_config_without_trie
+
+    try:
+        start = time.time()
+        dbt.parser.parse_sql_nodes(models, project, {'bench': project})
+        return time.time() - start
+    finally:
+        dbt.model.SourceConfig.resolve_config = resolve_config
+
+
+if __name__ == '__main__':
+    for num_models in NUM_MODELS:
+        for name, bench in [('config', bench_config),
+                            ('parse', bench_parse)]:
+            uncached = bench(num_models, share_tries=False)
+            cached = bench(num_models, share_tries=True)
+
+            print("{:>5} models, {:<6}: {:0.3f}s without the trie, "
+                  "{:0.3f}s with it".format(num_models, name, uncached,
+                                            cached))
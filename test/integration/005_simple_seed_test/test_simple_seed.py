@@ -1,13 +1,29 @@
 from nose.plugins.attrib import attr
 from test.integration.base import DBTIntegrationTest
 
+import os
+import shutil
+import tempfile
+
 class TestSimpleSeed(DBTIntegrationTest):
 
     def setUp(self):
+        # the seed file is changed by some of these tests, so they load a
+        # copy of it
+        self.data_path = tempfile.mkdtemp()
+        self.seed_path = os.path.join(self.data_path, 'seed_actual.csv')
+        shutil.copy(
+            "test/integration/005_simple_seed_test/data/seed_actual.csv",
+            self.seed_path)
+
         DBTIntegrationTest.setUp(self)
 
         self.run_sql_file("test/integration/005_simple_seed_test/seed.sql")
 
+    def tearDown(self):
+        DBTIntegrationTest.tearDown(self)
+        shutil.rmtree(self.data_path)
+
     @property
     def schema(self):
         return "simple_seed_005"
@@ -19,24 +35,60 @@ class TestSimpleSeed(DBTIntegrationTest):
     @property
     def project_config(self):
         return {
-            "data-paths": ['test/integration/005_simple_seed_test/data']
+            "data-paths": [self.data_path]
         }
 
+    def clear_seed_table(self):
+        self.run_sql('delete from "{}"."seed_actual"'.format(self.schema))
+
+    def count_seed_rows(self):
+        result = self.run_sql(
+            'select count(*) from "{}"."seed_actual"'.format(self.schema),
+            fetch='one')
+
+        return result[0]
+
+    def change_seed_file(self):
+        # the same rows with different line endings, so the table should be
+        # the same, but the file's hash isn't
+        with open(self.seed_path) as fh:
+            lines = fh.read().splitlines()
+
+        with open(self.seed_path, 'w') as fh:
+            fh.write('\r\n'.join(lines) + '\r\n')
+
     @attr(type='postgres')
     def test_simple_seed(self):
         self.run_dbt(["seed"])
         self.assertTablesEqual("seed_actual","seed_expected")
 
-        # this should truncate the seed_actual table, the re-insert
+        # the seed file has changed, so this should truncate the seed_actual
+        # table, then re-insert
+        self.clear_seed_table()
+        self.change_seed_file()
+
+        self.run_dbt(["seed"])
+        self.assertTablesEqual("seed_actual","seed_expected")
+
+    @attr(type='postgres')
+    def test_simple_seed_skips_unchanged_files(self):
         self.run_dbt(["seed"])
         self.assertTablesEqual("seed_actual","seed_expected")
 
+        # the seed file hasn't changed, so this should leave seed_actual alone
+        self.clear_seed_table()
+
+        self.run_dbt(["seed"])
+        self.assertEqual(self.count_seed_rows(), 0)
 
     @attr(type='postgres')
     def test_simple_seed_with_drop(self):
         self.run_dbt(["seed"])
         self.assertTablesEqual("seed_actual","seed_expected")
 
-        # this should drop the seed table, then re-create
+        # this should drop the seed table, then re-create, even though the
+        # seed file hasn't changed
+        self.clear_seed_table()
+
         self.run_dbt(["seed", "--drop-existing"])
         self.assertTablesEqual("seed_actual","seed_expected")
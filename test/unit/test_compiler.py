@@ -1,9 +1,16 @@
+from mock import patch
 import unittest
 
 import os
+import shutil
+import tempfile
 
 import dbt.flags
 import dbt.compilation
+import dbt.parse_cache
+import dbt.clients.jinja
+import dbt.project
+import sqlparse
 from collections import OrderedDict
 
 
@@ -396,3 +403,329 @@ class CompilerTest(unittest.TestCase):
                          .get('model.root.ephemeral_level_two')
                          .get('extra_ctes_injected')),
             True)
+
+    def get_compiled_model(self, name, materialized, refs):
+        config = self.model_config.copy()
+        config['materialized'] = materialized
+        unique_id = 'model.root.{}'.format(name)
+
+        return {
+            'name': name,
+            'resource_type': 'model',
+            'unique_id': unique_id,
+            'fqn': ['root_project', name],
+            'empty': False,
+            'package_name': 'root',
+            'root_path': '/usr/src/app',
+            'refs': [],
+            'depends_on': {
+                'nodes': ['model.root.{}'.format(ref) for ref in refs],
+                'macros': []
+            },
+            'config': config,
+            'tags': set(),
+            'path': '{}.sql'.format(name),
+            'raw_sql': '',
+            'compiled': True,
+            'compiled_sql': ' union all '.join(
+                ['select * from __dbt__CTE__{}'.format(ref) for ref in refs] or
+                ['select * from source_table']),
+            'extra_ctes_injected': False,
+            'extra_ctes': OrderedDict(
+                ('model.root.{}'.format(ref), None) for ref in refs),
+            'injected_sql': ''
+        }
+
+    def test__prepend_ctes__expands_each_ephemeral_once(self):
+        # every level refers to both models on the level below it, so
+        # expanding the ctes without a memo takes 2^levels steps
+        levels = 20
+        nodes = [self.get_compiled_model('left_0', 'ephemeral', []),
+                 self.get_compiled_model('right_0', 'ephemeral', [])]
+
+        for level in range(1, levels):
+            refs = ['left_{}'.format(level - 1), 'right_{}'.format(level - 1)]
+            nodes.append(self.get_compiled_model(
+                'left_{}'.format(level), 'ephemeral', refs))
+            nodes.append(self.get_compiled_model(
+                'right_{}'.format(level), 'ephemeral', refs))
+
+        view = self.get_compiled_model(
+            'view', 'view',
+            ['left_{}'.format(levels - 1), 'right_{}'.format(levels - 1)])
+        nodes.append(view)
+
+        input_graph = {
+            'macros': {},
+            'nodes': {node['unique_id']: node for node in nodes},
+        }
+
+        with patch('dbt.compilation.recursively_prepend_ctes',
+                   wraps=dbt.compilation.recursively_prepend_ctes) as mock:
+            result, _ = dbt.compilation.prepend_ctes(view, input_graph)
+
+        self.assertEqual(mock.call_count, len(nodes))
+        self.assertEqual(len(result['extra_ctes']), len(nodes) - 1)
+        self.assertEqual(list(result['extra_ctes'].keys())[:2],
+                         ['model.root.left_0', 'model.root.right_0'])
+        self.assertTrue(result['injected_sql'].startswith(
+            'with __dbt__CTE__left_0 as (\nselect * from source_table\n),  '
+            '__dbt__CTE__right_0 as (\nselect * from source_table\n),  '))
+
+    def get_project(self):
+        profiles = {
+            'test': {
+                'outputs': {
+                    'test': {
+                        'type': 'postgres',
+                        'threads': 4,
+                        'host': 'database',
+                        'port': 5432,
+                        'user': 'root',
+                        'pass': 'password',
+                        'dbname': 'dbt',
+                        'schema': 'dbt_test'
+                    }
+                },
+                'target': 'test'
+            }
+        }
+
+        return dbt.project.Project(
+            cfg=self.root_project_config,
+            profiles=profiles,
+            profiles_dir=None)
+
+    def get_macro(self, package_name, name):
+        return {
+            'name': name,
+            'package_name': package_name,
+            'parsed_macro': '{}.{}'.format(package_name, name),
+        }
+
+    def get_model(self, name):
+        return {
+            'name': name,
+            'unique_id': 'model.root_project.{}'.format(name),
+            'package_name': 'root_project',
+            'config': self.model_config,
+        }
+
+    def test__get_compiler_context__shares_base_context(self):
+        flat_graph = {
+            'nodes': {},
+            'macros': {
+                'macro.root_project.local': self.get_macro(
+                    'root_project', 'local'),
+                'macro.dbt.builtin': self.get_macro('dbt', 'builtin'),
+                'macro.snowplow.other': self.get_macro('snowplow', 'other'),
+            }
+        }
+
+        compiler = dbt.compilation.Compiler(self.get_project())
+
+        model_one = self.get_model('model_one')
+        model_two = self.get_model('model_two')
+
+        context_one = compiler.get_compiler_context(model_one, flat_graph)
+        context_two = compiler.get_compiler_context(model_two, flat_graph)
+
+        self.assertEqual(list(compiler.base_contexts.keys()),
+                         ['root_project'])
+
+        # macros from the node's own package and the global project are in
+        # the root of the context, other packages are namespaced
+        self.assertEqual(context_one['local'], 'root_project.local')
+        self.assertEqual(context_one['builtin'], 'dbt.builtin')
+        self.assertNotIn('other', context_one)
+        self.assertEqual(context_one['snowplow']['other'], 'snowplow.other')
+
+        # node-specific built-ins are not shared
+        self.assertEqual(context_one['this'].name, 'model_one')
+        self.assertEqual(context_two['this'].name, 'model_two')
+        self.assertIsNot(context_one['ref'], context_two['ref'])
+
+    def get_unparsed_model(self, name, raw_sql):
+        return {
+            'name': name,
+            'resource_type': 'model',
+            'package_name': 'root_project',
+            'root_path': '/usr/src/app',
+            'path': '{}.sql'.format(name),
+            'raw_sql': raw_sql,
+        }
+
+    def test__load_selected_models__parses_ancestors_only(self):
+        unparsed_models = [
+            self.get_unparsed_model('base', 'select 1'),
+            self.get_unparsed_model('ephemeral',
+                                    "{{ config(materialized='ephemeral') }}"
+                                    "select * from {{ ref('base') }}"),
+            self.get_unparsed_model('selected',
+                                    "select * from {{ ref('ephemeral') }}"),
+            self.get_unparsed_model('child',
+                                    "select * from {{ ref('selected') }}"),
+            self.get_unparsed_model('unrelated', 'select 2'),
+        ]
+
+        compiler = dbt.compilation.Compiler(self.get_project())
+        all_projects = {'root_project': self.root_project_config}
+
+        with patch.object(compiler, 'get_unparsed_models',
+                          return_value=unparsed_models), \
+                patch('dbt.clients.jinja.get_rendered',
+                      wraps=dbt.clients.jinja.get_rendered) as get_rendered:
+            nodes = compiler.load_selected_models(
+                self.root_project_config, all_projects, ['selected'])
+
+        self.assertEqual(sorted(nodes.keys()),
+                         ['model.root_project.base',
+                          'model.root_project.ephemeral',
+                          'model.root_project.selected'])
+        self.assertEqual(get_rendered.call_count, 3)
+        self.assertEqual(
+            nodes['model.root_project.ephemeral']['config']['materialized'],
+            'ephemeral')
+
+    def test__compile_subgraph__leaves_out_tests(self):
+        target_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, target_path)
+
+        self.root_project_config['target-path'] = target_path
+        self.root_project_config['modules-path'] = target_path
+
+        unparsed_models = [
+            self.get_unparsed_model('base', 'select 1'),
+            self.get_unparsed_model('selected',
+                                    "select * from {{ ref('base') }}"),
+        ]
+
+        # a schema test's entry from an earlier, full parse. nothing was
+        # parsed to fill this cache, so save it without pruning anything
+        parse_cache_path = os.path.join(
+            target_path, dbt.parse_cache.parse_cache_file_name)
+        dbt.parse_cache.ParseCache({
+            'test_key': {'unique_id': 'test.root_project.not_null_base_id'},
+        }).save(parse_cache_path, set())
+
+        compiler = dbt.compilation.Compiler(self.get_project())
+        all_projects = {'root_project': self.root_project_config}
+
+        with patch.object(compiler, 'get_all_projects',
+                          return_value=all_projects), \
+                patch.object(compiler, 'load_all_macros', return_value={}), \
+                patch.object(compiler, 'get_unparsed_models',
+                             return_value=unparsed_models), \
+                patch.object(compiler, 'get_parsed_schema_tests') as tests, \
+                patch('dbt.compilation.logger') as logger:
+            flat_graph, linker = compiler.compile_subgraph(['selected'])
+
+        tests.assert_not_called()
+        self.assertEqual(sorted(flat_graph['nodes'].keys()),
+                         ['model.root_project.base',
+                          'model.root_project.selected'])
+
+        stat_line = logger.info.call_args[0][0]
+        self.assertIn('2 models', stat_line)
+        self.assertIn('selected models and their ancestors', stat_line)
+        self.assertNotIn('tests,', stat_line)
+
+        entries = dbt.parse_cache.ParseCache.load(parse_cache_path).entries
+        self.assertIn('test_key', entries)
+        self.assertEqual(len(entries), 3)
+
+
+def inject_ctes_with_sqlparse(sql, ctes):
+    # the sqlparse-based implementation that inject_ctes_into_sql replaced,
+    # kept as a reference for single-statement sql
+    parsed = sqlparse.parse(sql)[0]
+
+    with_stmt = None
+    for token in parsed.tokens:
+        if token.is_keyword and token.normalized == 'WITH':
+            with_stmt = token
+            break
+
+    if with_stmt is None:
+        first_token = parsed.token_first()
+        with_stmt = sqlparse.sql.Token(sqlparse.tokens.Keyword, 'with')
+        parsed.insert_before(first_token, with_stmt)
+    else:
+        trailing_comma = sqlparse.sql.Token(sqlparse.tokens.Punctuation, ',')
+        parsed.insert_after(with_stmt, trailing_comma)
+
+    parsed.insert_after(
+        with_stmt,
+        sqlparse.sql.Token(sqlparse.tokens.Keyword, ", ".join(ctes.values())))
+
+    return dbt.compat.to_string(parsed)
+
+
+class InjectCtesTest(unittest.TestCase):
+
+    prefixes = [
+        '',
+        '  ',
+        '\n\n',
+        '\r\n\t',
+        '-- a comment\n',
+        '-- with a comment\n',
+        '/* a\nblock comment */ ',
+        '/* with */\n',
+        '  -- one\n  /* two */\n',
+        '# a comment\n',
+    ]
+
+    statements = [
+        'select 1',
+        'select * from events',
+        "select 'with' as a, \"with\" as b from events",
+        'select * from (with x as (select 1) select * from x) y',
+        'with x as (select 1) select * from x',
+        'WITH x as (select 1) select * from x',
+        'With\n  x as (select 1),\n  y as (select 2)\nselect * from x, y',
+        'with/* no space */x as (select 1) select * from x',
+        "with x as (select 'a;b' as c) select * from x",
+        'with x as (select 1) select * from x -- trailing comment',
+        'select 1\n\n',
+        'with x as (select 1) select * from x\n',
+        '(select 1) union all (select 2)',
+        'select * from events where name = \'it\'\'s\'',
+        'select withdrawals from accounts',
+        'select * from with_table',
+    ]
+
+    def setUp(self):
+        self.ctes = OrderedDict([
+            ('model.root.a', ' __dbt__CTE__a as (\nselect 1\n)'),
+            ('model.root.b', ' __dbt__CTE__b as (\nselect 2\n)'),
+        ])
+
+    def test__inject_ctes__matches_sqlparse(self):
+        for prefix in self.prefixes:
+            for statement in self.statements:
+                sql = prefix + statement
+
+                self.assertEqual(
+                    dbt.compilation.inject_ctes_into_sql(sql, self.ctes),
+                    inject_ctes_with_sqlparse(sql, self.ctes),
+                    repr(sql))
+
+    def test__inject_ctes__no_ctes(self):
+        self.assertEqual(
+            dbt.compilation.inject_ctes_into_sql('select 1;', {}),
+            'select 1;')
+
+    def test__inject_ctes__ignores_with_after_first_token(self):
+        sql = 'select x::timestamp with time zone as y from events'
+
+        self.assertEqual(
+            dbt.compilation.inject_ctes_into_sql(sql, self.ctes),
+            'with' + ', '.join(self.ctes.values()) + sql)
+
+    def test__inject_ctes__keeps_trailing_statements(self):
+        sql = 'with x as (select 1) select * from x;\nselect 2'
+
+        self.assertEqual(
+            dbt.compilation.inject_ctes_into_sql(sql, self.ctes),
+            'with ' + ', '.join(self.ctes.values()) + ',' + sql[5:])
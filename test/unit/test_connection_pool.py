@@ -0,0 +1,163 @@
+from mock import MagicMock
+import threading
+import time
+import unittest
+
+import dbt.flags  # noqa
+import dbt.parser  # noqa
+import dbt.exceptions
+import dbt.adapters.connection_pool
+
+from dbt.adapters.connection_pool import ConnectionPool
+
+
+class FakeAdapter(object):
+    alive = True
+
+    @classmethod
+    def type(cls):
+        return 'postgres'
+
+    @classmethod
+    def open_new_connection(cls, profile, name):
+        return {
+            'name': name,
+            'state': 'open',
+            'transaction_open': False,
+            'handle': MagicMock(),
+        }
+
+    @classmethod
+    def is_connection_alive(cls, connection):
+        return cls.alive
+
+
+class ConnectionPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        FakeAdapter.alive = True
+
+    def get_pool(self, max_connections=2, **kwargs):
+        return ConnectionPool(FakeAdapter, {}, max_connections, **kwargs)
+
+    def test__released_connections_are_reused(self):
+        pool = self.get_pool()
+
+        first = pool.acquire('model_one')
+        self.assertIs(pool.get_in_use('model_one'), first)
+
+        pool.release('model_one')
+        self.assertIsNone(pool.get_in_use('model_one'))
+
+        second = pool.acquire('model_two')
+
+        self.assertIs(first, second)
+        self.assertEqual(second['name'], 'model_two')
+        self.assertEqual(pool.get_stats()['opened'], 1)
+
+    def test__acquire_waits_for_a_release(self):
+        pool = self.get_pool(max_connections=1)
+        first = pool.acquire('model_one')
+
+        def release_later():
+            time.sleep(0.1)
+            pool.release('model_one')
+
+        thread = threading.Thread(target=release_later)
+        thread.start()
+
+        second = pool.acquire('model_two')
+        thread.join()
+
+        self.assertIs(first, second)
+
+        stats = pool.get_stats()
+        self.assertEqual(stats['waits'], 1)
+        self.assertGreater(stats['max_wait_time'], 0)
+
+    def test__acquire_times_out(self):
+        pool = self.get_pool(max_connections=1, acquire_timeout=0.05)
+        pool.acquire('model_one')
+
+        with self.assertRaises(dbt.exceptions.InternalException):
+            pool.acquire('model_two')
+
+    def test__dead_connections_are_replaced(self):
+        pool = self.get_pool(max_connections=1, check_after=0)
+
+        first = pool.acquire('model_one')
+        pool.release('model_one')
+
+        FakeAdapter.alive = False
+        second = pool.acquire('model_two')
+
+        self.assertIsNot(first, second)
+        self.assertEqual(first['state'], 'closed')
+        first['handle'].close.assert_called_once_with()
+        self.assertEqual(pool.get_stats()['dead'], 1)
+
+    def test__idle_connections_are_evicted(self):
+        pool = self.get_pool(max_idle_time=0)
+
+        first = pool.acquire('model_one')
+        pool.release('model_one')
+        second = pool.acquire('model_two')
+
+        self.assertIsNot(first, second)
+        self.assertEqual(first['state'], 'closed')
+        self.assertEqual(pool.num_allocated, 1)
+        self.assertEqual(pool.get_stats()['evicted'], 1)
+
+    def test__evicted_connections_are_closed_outside_the_lock(self):
+        pool = self.get_pool(max_idle_time=0)
+
+        first = pool.acquire('model_one')
+        pool.release('model_one')
+
+        lock_was_free = []
+
+        def close():
+            acquired = pool.condition.acquire(False)
+            lock_was_free.append(acquired)
+
+            if acquired:
+                pool.condition.release()
+
+        first['handle'].close.side_effect = close
+        pool.acquire('model_two')
+
+        self.assertEqual(lock_was_free, [True])
+
+
+class FindPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        dbt.adapters.connection_pool.remove_pools()
+
+        self.profile = {'type': 'postgres', 'threads': 4, 'host': 'db'}
+
+    def tearDown(self):
+        dbt.adapters.connection_pool.remove_pools()
+
+    def test__find_pool_matches_credentials(self):
+        pool = dbt.adapters.connection_pool.get_pool(FakeAdapter,
+                                                     self.profile)
+        credentials = dbt.adapters.connection_pool.get_credentials(
+            self.profile)
+
+        self.assertIs(
+            dbt.adapters.connection_pool.find_pool(FakeAdapter, credentials),
+            pool)
+
+        # looking the pool up by credentials leaves its size alone
+        self.assertEqual(pool.max_connections, 6)
+
+    def test__find_pool_never_creates_a_pool(self):
+        dbt.adapters.connection_pool.get_pool(FakeAdapter, self.profile)
+        dbt.adapters.connection_pool.remove_pools()
+
+        with self.assertRaises(dbt.exceptions.InternalException):
+            dbt.adapters.connection_pool.find_pool(FakeAdapter,
+                                                   {'host': 'db'})
+
+        self.assertEqual(dbt.adapters.connection_pool.pools, {})
@@ -0,0 +1,235 @@
+from mock import patch
+import copy
+import datetime
+import decimal
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+import dbt.flags  # noqa
+import dbt.parser  # noqa
+import dbt.exceptions
+import dbt.graph.artifact
+import dbt.linker
+import dbt.utils
+
+from collections import OrderedDict
+import networkx as nx
+
+
+class GraphArtifactTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'graph.bin')
+
+        self.linker = dbt.linker.Linker()
+
+        for name in ['a', 'b', 'c', 'd']:
+            unique_id = 'model.root.{}'.format(name)
+
+            self.linker.add_node(unique_id)
+            self.linker.update_node_data(unique_id, {
+                'unique_id': unique_id,
+                'fqn': ['root', name],
+                'tags': set(['tag']),
+                'refs': [('a',)],
+                'extra_ctes': OrderedDict([('model.root.a', None)]),
+                'raw_sql': 'select * from {}'.format(name),
+                'wrapped_sql': 'create view {} as (select 1)'.format(name),
+            })
+
+        self.linker.dependency('model.root.b', 'model.root.a')
+        self.linker.dependency('model.root.c', 'model.root.a')
+        self.linker.dependency('model.root.d', 'model.root.b')
+        self.linker.dependency('model.root.d', 'model.root.c')
+
+        # nodes without any lazily loaded data are stored as-is
+        self.linker.add_node('model.root.e')
+        self.linker.graph.graph['dbt_run_type'] = 'run'
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test__round_trip(self):
+        self.linker.write_graph(self.path)
+        loaded = dbt.linker.from_file(self.path)
+
+        self.assertEqual(sorted(loaded.nodes()), sorted(self.linker.nodes()))
+        self.assertEqual(sorted(loaded.edges()), sorted(self.linker.edges()))
+        self.assertEqual(loaded.run_type(), 'run')
+
+        for node in self.linker.nodes():
+            self.assertEqual(loaded.get_node(node),
+                             self.linker.get_node(node))
+
+        self.assertEqual(sorted(loaded.graph.predecessors('model.root.d')),
+                         ['model.root.b', 'model.root.c'])
+
+    def test__index_is_not_pickled(self):
+        with patch('pickle.dumps') as dumps, patch('pickle.loads') as loads:
+            self.linker.write_graph(self.path)
+            loaded = dbt.linker.from_file(self.path)
+
+        dumps.assert_not_called()
+        loads.assert_not_called()
+        self.assertEqual(loaded.get_node('model.root.a'),
+                         self.linker.get_node('model.root.a'))
+
+    def test__encode_index__round_trip(self):
+        value = {
+            'none': None,
+            'bools': [True, False],
+            'numbers': (0, -1, 2 ** 40, 1.5),
+            'text': u'caf\xe9',
+            'tags': set(['a', 'b']),
+            'ctes': OrderedDict([('z', None), ('a', {'nested': []})]),
+        }
+
+        decoded = dbt.graph.artifact.decode_index(
+            dbt.graph.artifact.encode_index([value, value]))
+
+        self.assertEqual(decoded, [value, value])
+        decoded = decoded[0]
+        self.assertIsInstance(decoded['numbers'], tuple)
+        self.assertEqual(list(decoded['ctes'].keys()), ['z', 'a'])
+
+    def test__encode_index__dates(self):
+        value = {
+            'date': datetime.date(2017, 1, 1),
+            'datetime': datetime.datetime(2017, 1, 2, 3, 4, 5, 678),
+            'time': datetime.time(23, 59, 58, 999999),
+        }
+
+        with patch('pickle.dumps') as dumps:
+            encoded = dbt.graph.artifact.encode_index(value)
+
+        dumps.assert_not_called()
+
+        decoded = dbt.graph.artifact.decode_index(encoded)
+        self.assertEqual(decoded, value)
+        self.assertIs(type(decoded['date']), datetime.date)
+
+    def test__encode_index__other_types_are_pickled(self):
+        value = {
+            'decimal': decimal.Decimal('1.25'),
+            'int_keys': {1: 'value'},
+            'big_int': 2 ** 70,
+            'list': [frozenset(['a']), u'text'],
+        }
+
+        decoded = dbt.graph.artifact.decode_index(
+            dbt.graph.artifact.encode_index(value))
+
+        self.assertEqual(decoded, value)
+
+    def test__encode_index__unpicklable_value(self):
+        with self.assertRaises(dbt.exceptions.InternalException):
+            dbt.graph.artifact.encode_index({'value': lambda: None})
+
+    def test__round_trip__date_vars(self):
+        # unquoted dates in yaml vars are loaded as dates
+        node = self.linker.get_node('model.root.a')
+        node['config'] = {
+            'vars': {'start_date': datetime.date(2017, 1, 1),
+                     'loaded_at': datetime.datetime(2017, 1, 1, 12, 30)},
+        }
+
+        self.linker.write_graph(self.path)
+        loaded = dbt.linker.from_file(self.path)
+
+        self.assertEqual(loaded.get_node('model.root.a'), node)
+
+    def test__sql_is_loaded_lazily(self):
+        self.linker.write_graph(self.path)
+
+        with patch.object(dbt.graph.artifact.GraphFile, 'load_lazy_data',
+                          wraps=dbt.graph.artifact.GraphFile.load_lazy_data,
+                          autospec=True) as load_lazy_data:
+            loaded = dbt.linker.from_file(self.path)
+            node = loaded.get_node('model.root.b')
+
+            self.assertEqual(node['fqn'], ['root', 'b'])
+            self.assertEqual(node.get('tags'), set(['tag']))
+            load_lazy_data.assert_not_called()
+
+            self.assertEqual(node['raw_sql'], 'select * from b')
+            self.assertEqual(node.get('wrapped_sql'),
+                             'create view b as (select 1)')
+            self.assertEqual(load_lazy_data.call_count, 1)
+
+            self.assertEqual(sorted(loaded.get_node('model.root.c').keys()),
+                             ['extra_ctes', 'fqn', 'raw_sql', 'refs', 'tags',
+                              'unique_id', 'wrapped_sql'])
+            self.assertEqual(load_lazy_data.call_count, 2)
+
+    def test__values_set_before_loading_are_kept(self):
+        self.linker.write_graph(self.path)
+        node = dbt.linker.from_file(self.path).get_node('model.root.b')
+
+        node['wrapped_sql'] = 'select 2'
+        self.assertEqual(node['raw_sql'], 'select * from b')
+        self.assertEqual(node['wrapped_sql'], 'select 2')
+
+    def test__loaded_node_copies_include_sql(self):
+        self.linker.write_graph(self.path)
+        expected = self.linker.get_node('model.root.b')
+
+        def load_node():
+            loaded = dbt.linker.from_file(self.path)
+            return loaded, loaded.get_node('model.root.b')
+
+        copies = [
+            lambda node: dict(node),
+            lambda node: node.copy(),
+            lambda node: copy.copy(node),
+            lambda node: copy.deepcopy(node),
+            lambda node: dict(node.items()),
+        ]
+
+        for make_copy in copies:
+            _, node = load_node()
+            self.assertEqual(make_copy(node), expected)
+
+        loaded, node = load_node()
+        graph_copy = nx.DiGraph(loaded.graph)
+        self.assertEqual(graph_copy.node['model.root.b'], expected)
+
+    def test__loaded_node_is_a_node(self):
+        self.linker.write_graph(self.path)
+        node = dbt.linker.from_file(self.path).get_node('model.root.b')
+
+        node['name'] = 'b'
+        self.assertEqual(dbt.utils.get_model_name_or_none(node), 'b')
+
+        self.assertEqual(node.pop('raw_sql'), 'select * from b')
+        self.assertNotIn('raw_sql', node)
+
+    def test__loaded_node_pickles_as_dict(self):
+        self.linker.write_graph(self.path)
+        node = dbt.linker.from_file(self.path).get_node('model.root.b')
+
+        unpickled = pickle.loads(pickle.dumps(node))
+        self.assertIs(type(unpickled), dict)
+        self.assertEqual(unpickled, self.linker.get_node('model.root.b'))
+
+    def test__invalid_file(self):
+        with open(self.path, 'wb') as fh:
+            pickle.dump(self.linker.graph, fh)
+
+        with self.assertRaises(dbt.exceptions.RuntimeException):
+            dbt.linker.from_file(self.path)
+
+        open(self.path, 'wb').close()
+
+        with self.assertRaises(dbt.exceptions.RuntimeException):
+            dbt.linker.from_file(self.path)
+
+    def test__other_version(self):
+        with patch('dbt.graph.artifact.GRAPH_FILE_VERSION', 0):
+            self.linker.write_graph(self.path)
+
+        with self.assertRaises(dbt.exceptions.RuntimeException):
+            dbt.linker.from_file(self.path)
@@ -158,3 +158,70 @@ class GraphSelectionTest(unittest.TestCase):
         test(('X', 'a'), ('X', 'b'), False)
         test(('X', 'a'), ('X', 'a', 'b'), False)
         test(('X', 'a'), ('Y', '*'), False)
+
+    def get_scanned_nodes(self, graph, qualified_name):
+        # the original selection: check every node against the name
+        package_names = graph_selector.get_package_names(graph)
+        selected = set()
+
+        for node in graph.nodes():
+            fqn = graph.node[node]['fqn']
+
+            if len(qualified_name) == 1 and fqn[-1] == qualified_name[0]:
+                selected.add(node)
+            elif qualified_name[0] in package_names:
+                if graph_selector.is_selected_node(fqn, qualified_name):
+                    selected.add(node)
+            else:
+                for package_name in package_names:
+                    if graph_selector.is_selected_node(
+                            fqn, (package_name,) + qualified_name):
+                        selected.add(node)
+
+        return selected
+
+    def test__graph_index__matches_scan(self):
+        graph = nx.DiGraph()
+        fqns = [
+            ('X', 'a'),
+            ('X', 'staging', 'a'),
+            ('X', 'staging', 'b'),
+            ('X', 'staging', 'events', 'c'),
+            ('X', 'marts', 'staging'),
+            ('Y', 'a'),
+            ('Y', 'staging', 'd'),
+            ('Y', 'X'),
+        ]
+
+        for fqn in fqns:
+            graph.add_node('model.' + '.'.join(fqn), fqn=list(fqn))
+
+        index = graph_selector.GraphIndex(graph)
+
+        names = ['X', 'Y', 'a', 'b', 'c', 'd', 'staging', 'events', 'marts',
+                 '*', 'Z']
+        qualified_names = [(name,) for name in names]
+        qualified_names += [(first, second) for first in names
+                            for second in names]
+        qualified_names += [('X', 'staging', name) for name in names]
+        qualified_names += [('staging', 'events', name) for name in names]
+
+        for qualified_name in qualified_names:
+            self.assertEqual(
+                index.get_nodes_by_qualified_name(qualified_name),
+                self.get_scanned_nodes(graph, qualified_name),
+                qualified_name)
+
+    def test__graph_index__closures(self):
+        index = graph_selector.GraphIndex(self.package_graph)
+
+        for node in self.package_graph.nodes():
+            self.assertEqual(index.get_ancestors([node]),
+                             nx.ancestors(self.package_graph, node))
+            self.assertEqual(index.get_descendants([node]),
+                             nx.descendants(self.package_graph, node))
+
+        self.assertEqual(index.get_descendants(['m.Y.b', 'm.X.c']),
+                         set(['m.Y.d', 'm.X.e', 'm.Y.f', 'm.X.g']))
+        self.assertEqual(index.get_ancestors(['m.Y.d', 'm.Y.f']),
+                         set(['m.X.a', 'm.Y.b', 'm.X.c']))
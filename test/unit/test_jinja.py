@@ -0,0 +1,63 @@
+import unittest
+
+import dbt.flags  # noqa
+import dbt.parser  # noqa
+import dbt.clients.jinja
+
+
+class TemplateCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        dbt.clients.jinja.template_cache.clear()
+
+    def test__cached_template_renders_with_new_context(self):
+        template = "select {{ column }} from table"
+        cache = dbt.clients.jinja.template_cache
+
+        self.assertEqual(
+            dbt.clients.jinja.get_rendered(template, {'column': 'a'}),
+            'select a from table')
+        self.assertEqual(
+            dbt.clients.jinja.get_rendered(template, {'column': 'b'}),
+            'select b from table')
+
+        self.assertEqual(cache.misses, 1)
+        self.assertEqual(cache.hits, 1)
+
+    def test__cached_template_captures_macros_per_node(self):
+        template = "select {{ my_macro() }}"
+
+        nodes = [{'package_name': 'root',
+                  'depends_on': {'macros': []}} for i in range(2)]
+
+        for node in nodes:
+            dbt.clients.jinja.get_rendered(template, {}, node,
+                                           capture_macros=True)
+
+        # the second render was compiled by the first node's environment,
+        # but must still record its macros on the second node
+        self.assertNotEqual(nodes[1]['depends_on']['macros'], [])
+        self.assertEqual(nodes[0]['depends_on']['macros'],
+                         nodes[1]['depends_on']['macros'])
+        self.assertEqual(dbt.clients.jinja.template_cache.hits, 1)
+
+    def test__environment_kinds_are_cached_separately(self):
+        template = "select 1"
+        node = {'package_name': 'root', 'depends_on': {'macros': []}}
+
+        dbt.clients.jinja.get_rendered(template, {}, node)
+        dbt.clients.jinja.get_rendered(template, {}, node,
+                                       capture_macros=True)
+
+        self.assertEqual(dbt.clients.jinja.template_cache.misses, 2)
+
+    def test__least_recently_used_entry_is_evicted(self):
+        cache = dbt.clients.jinja.TemplateCache(max_size=2)
+
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(list(cache.entries.keys()), ['a', 'c'])
+        self.assertIsNone(cache.get('b'))
@@ -28,6 +28,18 @@ class LinkerTest(unittest.TestCase):
 
         self.assertEqual(len(actual_nodes), len(expected_nodes))
 
+    def test_linker_update_node_data_copies_node(self):
+        node = {'unique_id': 'A', 'raw_sql': 'select 1'}
+
+        self.linker.dependency('A', 'B')
+        self.linker.update_node_data('A', node)
+        self.assertIsNot(self.linker.get_node('A'), node)
+        self.assertIs(self.linker.get_node('A')['raw_sql'], node['raw_sql'])
+
+        self.linker.update_node_data('A', {'skip': True})
+        self.assertEqual(self.linker.get_node('A')['skip'], True)
+        self.assertNotIn('skip', node)
+
     def test_linker_add_dependency(self):
         actual_deps = [('A', 'B'), ('A', 'C'), ('B', 'C')]
 
@@ -73,6 +85,16 @@ class LinkerTest(unittest.TestCase):
         expected_limit_2 = [['B'], ['A']]
         self.assertEqual(expected_limit_2, actual_limit_2)
 
+    def test_linker_dependency_list_uses_longest_path(self):
+        actual_deps = [('X', 'P1'), ('X', 'P2'), ('Y', 'Q'), ('Z', 'Y')]
+
+        for (l, r) in actual_deps:
+            self.linker.dependency(l, r)
+
+        actual = [set(level) for level in self.linker.as_dependency_list()]
+        expected = [{'P1', 'P2', 'Q'}, {'X', 'Y'}, {'Z'}]
+        self.assertEqual(expected, actual)
+
     def test_linker_bad_limit_throws_runtime_error(self):
         actual_deps = [('A', 'B'), ('B', 'C'), ('C', 'D')]
 
@@ -97,3 +119,150 @@ class LinkerTest(unittest.TestCase):
             self.linker.dependency(l, r)
 
         self.assertIsNone(self.linker.find_cycles())
+
+    def test_linker_blocking_parents(self):
+        actual_deps = [('A', 'B'), ('A', 'C'), ('B', 'C'), ('D', 'C')]
+
+        for (l, r) in actual_deps:
+            self.linker.dependency(l, r)
+
+        actual = self.linker.get_blocking_parents()
+        expected = {
+            'A': {'B', 'C'},
+            'B': {'C'},
+            'C': set(),
+            'D': {'C'},
+        }
+        self.assertEqual(expected, actual)
+
+    def test_linker_blocking_parents_skips_unselected_nodes(self):
+        actual_deps = [('A', 'B'), ('B', 'C')]
+
+        for (l, r) in actual_deps:
+            self.linker.dependency(l, r)
+
+        actual = self.linker.get_blocking_parents(['A', 'C'])
+        self.assertEqual({'A': {'C'}, 'C': set()}, actual)
+
+    def test_linker_ready_queue(self):
+        actual_deps = [('A', 'B'), ('B', 'C'), ('D', 'C'), ('E', 'D')]
+
+        for (l, r) in actual_deps:
+            self.linker.dependency(l, r)
+
+        queue = self.linker.as_ready_queue()
+        self.assertEqual(len(queue), 5)
+
+        self.assertEqual(queue.get(), 'C')
+        self.assertFalse(queue.has_ready())
+
+        queue.mark_done('C')
+        ready = set()
+        while queue.has_ready():
+            ready.add(queue.get())
+        self.assertEqual(ready, {'B', 'D'})
+
+        # E is released as soon as D finishes, even though B is still running
+        queue.mark_done('D')
+        self.assertEqual(queue.get(), 'E')
+        self.assertFalse(queue.has_ready())
+
+        queue.mark_done('E')
+        queue.mark_done('B')
+        self.assertEqual(queue.get(), 'A')
+        queue.mark_done('A')
+
+        self.assertTrue(queue.is_finished())
+
+    def test_linker_ready_queue_bad_limit_throws_runtime_error(self):
+        self.linker.dependency('A', 'B')
+
+        self.assertRaises(RuntimeError, self.linker.as_ready_queue, ['ZZZ'])
+
+    def test_linker_ready_queue_starts_critical_path_first(self):
+        # A -> B -> C is the long chain, Z is a single short node
+        actual_deps = [('B', 'A'), ('C', 'B')]
+
+        for (l, r) in actual_deps:
+            self.linker.dependency(l, r)
+        self.linker.add_node('Z')
+
+        weights = {'A': 1.0, 'B': 5.0, 'C': 5.0, 'Z': 3.0}
+        queue = self.linker.as_ready_queue(node_weights=weights)
+
+        self.assertEqual(queue.get(), 'A')
+        self.assertEqual(queue.get(), 'Z')
+
+    def test_linker_ready_queue_unknown_weights_use_mean(self):
+        actual_deps = [('B', 'A')]
+
+        for (l, r) in actual_deps:
+            self.linker.dependency(l, r)
+        self.linker.add_node('Z')
+
+        # A has no history, so it gets the mean weight (2.0), and A -> B
+        # outweighs Z
+        weights = {'B': 2.0, 'Z': 2.0}
+        queue = self.linker.as_ready_queue(node_weights=weights)
+
+        self.assertEqual(queue.critical_path['A'], 4.0)
+        self.assertEqual(queue.get(), 'A')
+
+    def test_linker_block_on_tests(self):
+        # only models block, apart from the tests passed to block_on_tests
+        dbt.utils.is_blocking_dependency = self.real_is_blocking_dependency
+
+        # orders selects from customers, and each has a test. the
+        # relationships test between them depends on both
+        for node, resource_type in [('customers', 'model'),
+                                    ('orders', 'model'),
+                                    ('unselected', 'model'),
+                                    ('not_null_customers', 'test'),
+                                    ('not_null_orders', 'test'),
+                                    ('relationships_orders', 'test')]:
+            self.linker.add_node(node)
+            self.linker.update_node_data(node,
+                                         {'resource_type': resource_type})
+
+        actual_deps = [('orders', 'customers'),
+                       ('unselected', 'customers'),
+                       ('not_null_customers', 'customers'),
+                       ('not_null_orders', 'orders'),
+                       ('relationships_orders', 'orders'),
+                       ('relationships_orders', 'customers')]
+
+        for (l, r) in actual_deps:
+            self.linker.dependency(l, r)
+
+        tests = ['not_null_customers', 'not_null_orders',
+                 'relationships_orders']
+        selected = tests + ['customers', 'orders']
+
+        linker = self.linker.block_on_tests(tests, selected)
+
+        self.assertEqual(
+            sorted(linker.graph.predecessors('orders')),
+            ['customers', 'not_null_customers'])
+        self.assertEqual(linker.graph.predecessors('unselected'),
+                         ['customers'])
+        self.assertEqual(linker.graph.successors('relationships_orders'), [])
+
+        # the linker's own graph is left alone, and its tests don't block
+        self.assertEqual(self.linker.graph.predecessors('orders'),
+                         ['customers'])
+        self.assertFalse(self.linker.is_blocking_node('not_null_customers'))
+        self.assertTrue(linker.is_blocking_node('not_null_customers'))
+
+        linker.get_node('orders')['skip'] = True
+        self.assertNotIn('skip', self.linker.get_node('orders'))
+
+        queue = linker.as_ready_queue(selected)
+        self.assertEqual(queue.get(), 'customers')
+        self.assertFalse(queue.has_ready())
+
+        queue.mark_done('customers')
+        self.assertEqual(queue.get(), 'not_null_customers')
+        self.assertFalse(queue.has_ready())
+
+        queue.mark_done('not_null_customers')
+        self.assertEqual(queue.get(), 'orders')
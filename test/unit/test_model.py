@@ -0,0 +1,127 @@
+from mock import patch
+import unittest
+
+import dbt.flags
+import dbt.model
+
+
+class SourceConfigTest(unittest.TestCase):
+
+    def setUp(self):
+        dbt.flags.STRICT_MODE = True
+        dbt.flags.FULL_REFRESH = False
+        dbt.model.clear_project_config_tries()
+
+        self.root_project_config = {
+            'name': 'root',
+            'models': {
+                'post-hook': 'grant select on {{ this }} to reporter',
+                'vars': {'a': 1},
+                'root': {
+                    'materialized': 'table',
+                    'marts': {
+                        'post-hook': ['analyze {{ this }}'],
+                        'vars': {'b': 2},
+                        'finance': {
+                            'materialized': 'incremental',
+                            'sql_where': 'true',
+                        },
+                    },
+                },
+            },
+        }
+
+    def get_config(self, fqn):
+        return dbt.model.SourceConfig(self.root_project_config,
+                                      self.root_project_config,
+                                      fqn)
+
+    def test__config__nested_folders(self):
+        config = self.get_config(['root', 'marts', 'finance', 'revenue'])
+
+        self.assertEqual(config.config, {
+            'enabled': True,
+            'materialized': 'incremental',
+            'sql_where': 'true',
+            'post-hook': ['grant select on {{ this }} to reporter',
+                          'analyze {{ this }}'],
+            'pre-hook': [],
+            'vars': {'a': 1, 'b': 2},
+        })
+
+        sibling = self.get_config(['root', 'marts', 'orders'])
+        self.assertEqual(sibling.config['materialized'], 'table')
+        self.assertEqual(sibling.config['vars'], {'a': 1, 'b': 2})
+
+        other = self.get_config(['root', 'staging', 'events'])
+        self.assertEqual(other.config['materialized'], 'table')
+        self.assertEqual(other.config['post-hook'],
+                         ['grant select on {{ this }} to reporter'])
+
+    def test__config__shares_resolved_folders(self):
+        first = self.get_config(['root', 'marts', 'finance', 'revenue'])
+        first.config
+
+        with patch.object(dbt.model.SourceConfig,
+                          'smart_update') as smart_update:
+            second = self.get_config(['root', 'marts', 'finance', 'costs'])
+            self.assertEqual(second.config, first.config)
+            smart_update.assert_not_called()
+
+    def test__config__does_not_share_mutable_values(self):
+        first = self.get_config(['root', 'marts', 'orders'])
+        first.config['post-hook'].append('vacuum')
+        first.config['vars']['c'] = 3
+
+        second = self.get_config(['root', 'marts', 'orders'])
+        self.assertEqual(second.config['post-hook'],
+                         ['grant select on {{ this }} to reporter',
+                          'analyze {{ this }}'])
+        self.assertEqual(second.config['vars'], {'a': 1, 'b': 2})
+
+    def test__config__update_in_model_config(self):
+        config = self.get_config(['root', 'marts', 'orders'])
+        self.assertEqual(config.config['materialized'], 'table')
+
+        config.update_in_model_config({'materialized': 'view'})
+        self.assertEqual(config.config['materialized'], 'view')
+
+    def test__config__full_refresh(self):
+        config = self.get_config(['root', 'marts', 'finance', 'revenue'])
+        self.assertEqual(config.config['materialized'], 'incremental')
+
+        dbt.flags.FULL_REFRESH = True
+        try:
+            self.assertEqual(config.config['materialized'], 'table')
+        finally:
+            dbt.flags.FULL_REFRESH = False
+
+    def test__config__replaced_project_models(self):
+        self.assertEqual(
+            self.get_config(['root', 'marts', 'orders']).config['enabled'],
+            True)
+
+        self.root_project_config['models'] = {'enabled': False}
+
+        self.assertEqual(
+            self.get_config(['root', 'marts', 'orders']).config['enabled'],
+            False)
+
+    def test__config__callers_can_not_change_cached_config(self):
+        self.root_project_config['models']['vars'] = {'a': {'nested': 1}}
+        config = self.get_config(['root', 'marts', 'orders'])
+
+        first = config.config
+        first['post-hook'].append('vacuum')
+        first['vars']['a']['nested'] = 2
+        first['vars']['c'] = 3
+
+        second = config.config
+        self.assertEqual(second['post-hook'],
+                         ['grant select on {{ this }} to reporter',
+                          'analyze {{ this }}'])
+        self.assertEqual(second['vars'], {'a': {'nested': 1}, 'b': 2})
+
+        # nor the config resolved for the folder, shared with other models
+        other = self.get_config(['root', 'marts', 'customers'])
+        self.assertEqual(other.config['vars'], {'a': {'nested': 1}, 'b': 2})
@@ -0,0 +1,166 @@
+from mock import patch
+import os
+import shutil
+import tempfile
+import unittest
+
+import dbt.flags
+import dbt.parser
+import dbt.parse_cache
+
+
+class ParseCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        dbt.flags.STRICT_MODE = True
+
+        self.root_project_config = {
+            'name': 'root',
+            'version': '0.1',
+            'profile': 'test',
+            'project-root': os.path.abspath('.'),
+        }
+
+        self.all_projects = {'root': self.root_project_config}
+
+        self.models = [{
+            'name': 'model_one',
+            'resource_type': 'model',
+            'package_name': 'root',
+            'root_path': '/usr/src/app',
+            'path': 'model_one.sql',
+            'raw_sql': ("{{ config(materialized='table') }}"
+                        "select * from {{ ref('events') }} "
+                        "where {{ some_macro() }}"),
+        }]
+
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def parse(self, parse_cache, root_project_config=None):
+        if root_project_config is None:
+            root_project_config = self.root_project_config
+
+        return dbt.parser.parse_sql_nodes(
+            self.models,
+            root_project_config,
+            {'root': root_project_config},
+            parse_cache=parse_cache)
+
+    def test__cached_parse_matches_uncached_parse(self):
+        expected = self.parse(None)
+
+        parse_cache = dbt.parse_cache.ParseCache()
+        self.assertEqual(self.parse(parse_cache), expected)
+        self.assertEqual(parse_cache.misses, 1)
+
+        self.assertEqual(self.parse(parse_cache), expected)
+        self.assertEqual(parse_cache.hits, 1)
+
+        node = expected['model.root.model_one']
+        self.assertEqual(node['refs'], [('events',)])
+        self.assertEqual(node['config']['materialized'], 'table')
+
+    def test__cache_hit_skips_rendering(self):
+        parse_cache = dbt.parse_cache.ParseCache()
+        self.parse(parse_cache)
+
+        with patch('dbt.clients.jinja.get_rendered') as mock_get_rendered:
+            self.parse(parse_cache)
+            mock_get_rendered.assert_not_called()
+
+    def test__changed_contents_or_config_miss(self):
+        parse_cache = dbt.parse_cache.ParseCache()
+        self.parse(parse_cache)
+
+        self.models[0]['raw_sql'] = 'select 1'
+        self.parse(parse_cache)
+        self.assertEqual(parse_cache.misses, 2)
+
+        root_project_config = self.root_project_config.copy()
+        root_project_config['models'] = {'enabled': False}
+        self.parse(parse_cache, root_project_config)
+        self.assertEqual(parse_cache.misses, 3)
+        self.assertEqual(parse_cache.hits, 0)
+
+    def test__save_and_load(self):
+        path = os.path.join(self.tmp_dir, 'parse_cache.pickle')
+
+        parse_cache = dbt.parse_cache.ParseCache()
+        expected = self.parse(parse_cache)
+        parse_cache.save(path)
+
+        loaded = dbt.parse_cache.ParseCache.load(path)
+        self.assertEqual(self.parse(loaded), expected)
+        self.assertEqual(loaded.hits, 1)
+        self.assertEqual(loaded.misses, 0)
+
+    def test__load_missing_file(self):
+        path = os.path.join(self.tmp_dir, 'does_not_exist.pickle')
+
+        parse_cache = dbt.parse_cache.ParseCache.load(path)
+        self.assertEqual(parse_cache.entries, {})
+
+    def test__changed_macros_miss(self):
+        macros = {
+            'macro.root.some_macro': {
+                'package_name': 'root',
+                'path': 'macros.sql',
+                'raw_sql': '{% macro some_macro() %}true{% endmacro %}',
+            },
+        }
+
+        parse_cache = dbt.parse_cache.ParseCache()
+        parse_cache.set_macros(macros)
+        self.parse(parse_cache)
+
+        parse_cache.set_macros(macros)
+        self.parse(parse_cache)
+        self.assertEqual(parse_cache.hits, 1)
+
+        macros['macro.root.some_macro']['raw_sql'] = (
+            '{% macro some_macro() %}false{% endmacro %}')
+        parse_cache.set_macros(macros)
+        self.parse(parse_cache)
+        self.assertEqual(parse_cache.hits, 1)
+        self.assertEqual(parse_cache.misses, 2)
+
+    def test__hits_are_not_copied(self):
+        parse_cache = dbt.parse_cache.ParseCache()
+        self.parse(parse_cache)
+
+        with patch('copy.deepcopy') as mock_deepcopy:
+            node = self.parse(parse_cache)['model.root.model_one']
+            mock_deepcopy.assert_not_called()
+
+        # changing the parsed node doesn't change the cached entry
+        node['refs'].append(('other',))
+        node['config']['materialized'] = 'view'
+
+        node = self.parse(parse_cache)['model.root.model_one']
+        self.assertEqual(node['refs'], [('events',)])
+        self.assertEqual(node['config']['materialized'], 'table')
+
+    def test__partial_save_keeps_unparsed_entries(self):
+        path = os.path.join(self.tmp_dir, 'parse_cache.pickle')
+
+        parse_cache = dbt.parse_cache.ParseCache({
+            'test_key': {'unique_id': 'test.root.not_null_model_one_id'},
+            'stale_key': {'unique_id': 'model.root.model_one'},
+        })
+        self.parse(parse_cache)
+        parse_cache.save(path, set(['model.root.model_one']))
+
+        entries = dbt.parse_cache.ParseCache.load(path).entries
+
+        # the test wasn't parsed, so its entry is kept, but the model's old
+        # entry was replaced by the one used in this invocation
+        self.assertIn('test_key', entries)
+        self.assertNotIn('stale_key', entries)
+        self.assertEqual(len(entries), 2)
+
+        parse_cache.save(path)
+        self.assertEqual(
+            len(dbt.parse_cache.ParseCache.load(path).entries), 1)
@@ -5,6 +5,7 @@ import os
 
 import dbt.flags
 import dbt.parser
+import dbt.parse_cache
 
 
 def get_os_path(unix_path):
@@ -1300,3 +1301,99 @@ another_model:
                 }
             }
         )
+
+    def test__parse_node__shares_unchanged_fields(self):
+        node = {
+            'name': 'model_one',
+            'resource_type': 'model',
+            'package_name': 'root',
+            'root_path': get_os_path('/usr/src/app'),
+            'path': 'model_one.sql',
+            'raw_sql': ("{{ config(materialized='table') }}"
+                        "select * from events"),
+            'config': {'enabled': True},
+        }
+
+        parsed = dbt.parser.parse_node(
+            node,
+            'model.root.model_one',
+            self.root_project_config,
+            self.root_project_config,
+            {'root': self.root_project_config})
+
+        self.assertIs(parsed['raw_sql'], node['raw_sql'])
+        self.assertIs(parsed['path'], node['path'])
+        self.assertEqual(parsed['config']['materialized'], 'table')
+
+        # parsing doesn't change the unparsed node
+        self.assertEqual(node['config'], {'enabled': True})
+        self.assertNotIn('refs', node)
+
+    def test__get_fqn__interns_parts(self):
+        first = dbt.parser.get_fqn('marts/finance/revenue.sql',
+                                   self.root_project_config)
+        second = dbt.parser.get_fqn('marts/finance/costs.sql',
+                                    self.root_project_config)
+
+        self.assertEqual(first, ['root', 'marts', 'finance', 'revenue'])
+        self.assertIs(first[1], second[1])
+        self.assertIs(first[2], second[2])
+
+    def test__parse_pool_matches_serial_parse(self):
+        models = [{
+            'name': 'model_{}'.format(i),
+            'resource_type': 'model',
+            'package_name': 'root',
+            'root_path': get_os_path('/usr/src/app'),
+            'path': 'model_{}.sql'.format(i),
+            'raw_sql': ("{{{{ config(materialized='table') }}}}"
+                        "select * from {{{{ ref('model_{}') }}}}"
+                        .format(i - 1)),
+        } for i in range(1, 20)]
+
+        tests = [{
+            'name': 'schema',
+            'resource_type': 'test',
+            'package_name': 'root',
+            'root_path': get_os_path('/usr/src/app'),
+            'path': 'schema.yml',
+            'raw_yml': ('model_one:\n'
+                        '  constraints:\n'
+                        '    not_null:\n'
+                        '      - id\n'
+                        '      - name\n'
+                        '    unique:\n'
+                        '      - id\n'),
+        }]
+
+        all_projects = {'root': self.root_project_config,
+                        'snowplow': self.snowplow_project_config}
+
+        expected_models = dbt.parser.parse_sql_nodes(
+            models, self.root_project_config, all_projects)
+        expected_tests = dbt.parser.parse_schema_tests(
+            tests, self.root_project_config, all_projects)
+
+        parse_cache = dbt.parse_cache.ParseCache()
+        parse_pool = dbt.parser.get_parse_pool(2)
+
+        try:
+            for _ in range(2):
+                parsed_models = dbt.parser.parse_sql_nodes(
+                    models, self.root_project_config, all_projects,
+                    parse_cache=parse_cache, parse_pool=parse_pool)
+                parsed_tests = dbt.parser.parse_schema_tests(
+                    tests, self.root_project_config, all_projects,
+                    parse_cache=parse_cache, parse_pool=parse_pool)
+
+                self.assertEquals(parsed_models, expected_models)
+                self.assertEquals(list(parsed_models.keys()),
+                                  list(expected_models.keys()))
+                self.assertEquals(parsed_tests, expected_tests)
+        finally:
+            parse_pool.close()
+            parse_pool.join()
+
+        # the second pass was restored from the cache
+        self.assertEquals(parse_cache.misses, 22)
+        self.assertEquals(parse_cache.hits, 22)
@@ -0,0 +1,180 @@
+from mock import patch, MagicMock
+import unittest
+
+import dbt.flags  # noqa
+import dbt.parser  # noqa
+import dbt.adapters.default
+import dbt.runner
+
+from dbt.adapters.postgres import PostgresAdapter
+from dbt.adapters.relation_cache import RelationCache
+from dbt.schema import Column
+
+
+class RelationCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = RelationCache()
+        self.cache.set_relations('analytics', {'events': 'table',
+                                               'users': 'view'})
+        self.cache.set_schema_columns('analytics', {
+            'events': [Column('id', 'integer', None)],
+        })
+
+    def test__relations_are_updated_in_place(self):
+        self.cache.add_relation('analytics', 'orders__dbt_tmp', 'table')
+        self.cache.drop_relation('analytics', 'users')
+        self.cache.rename_relation('analytics', 'orders__dbt_tmp', 'orders')
+
+        self.assertEqual(self.cache.get_relations('analytics'),
+                         {'events': 'table', 'orders': 'table'})
+        self.assertIsNone(self.cache.get_relations('other_schema'))
+
+    def test__rename_of_unknown_relation_forgets_schema(self):
+        self.cache.rename_relation('analytics', 'unknown', 'orders')
+
+        self.assertIsNone(self.cache.get_relations('analytics'))
+
+    def test__columns(self):
+        self.assertEqual(
+            [col.name for col in self.cache.get_columns('analytics',
+                                                        'events')],
+            ['id'])
+
+        # tables that aren't in a loaded schema don't exist
+        self.assertEqual(self.cache.get_columns('analytics', 'missing'), [])
+        self.assertIsNone(self.cache.get_columns('other_schema', 'events'))
+
+    def test__created_and_renamed_tables_have_stale_columns(self):
+        self.cache.add_relation('analytics', 'orders__dbt_tmp', 'table')
+        self.assertIsNone(self.cache.get_columns('analytics',
+                                                 'orders__dbt_tmp'))
+
+        self.cache.rename_relation('analytics', 'orders__dbt_tmp', 'orders')
+        self.assertIsNone(self.cache.get_columns('analytics', 'orders'))
+
+        self.cache.rename_relation('analytics', 'events', 'old_events')
+        self.assertEqual(self.cache.get_columns('analytics', 'events'), [])
+        self.assertEqual(
+            len(self.cache.get_columns('analytics', 'old_events')), 1)
+
+
+class AdapterRelationCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        dbt.adapters.default.relation_cache.clear()
+
+        self.profile = {'type': 'postgres', 'schema': 'analytics'}
+
+    def tearDown(self):
+        dbt.adapters.default.relation_cache.clear()
+
+    @patch.object(PostgresAdapter, 'add_query')
+    @patch.object(PostgresAdapter, 'query_for_existing')
+    def test__catalog_is_queried_once_per_schema(self, query_for_existing,
+                                                 add_query):
+        add_query.return_value = (None, None)
+        query_for_existing.return_value = {'events': 'table'}
+
+        self.assertTrue(PostgresAdapter.table_exists(
+            self.profile, 'analytics', 'events'))
+        self.assertFalse(PostgresAdapter.table_exists(
+            self.profile, 'analytics', 'orders'))
+
+        PostgresAdapter.drop(self.profile, 'events', 'table')
+        PostgresAdapter.cache_created_relation('analytics', 'orders__dbt_tmp',
+                                               'table')
+        PostgresAdapter.rename(self.profile, 'orders__dbt_tmp', 'orders')
+
+        self.assertEqual(PostgresAdapter.list_relations(self.profile,
+                                                        'analytics'),
+                         {'orders': 'table'})
+        self.assertEqual(query_for_existing.call_count, 1)
+
+    @patch.object(PostgresAdapter, 'add_query')
+    def test__columns_are_loaded_per_schema(self, add_query):
+        cursor = MagicMock()
+        add_query.return_value = (None, cursor)
+
+        cursor.fetchall.return_value = [
+            ('events', 'id', 'integer', None),
+            ('events', 'name', 'text', None),
+            ('users', 'id', 'integer', None),
+        ]
+
+        for table in ['events', 'users', 'events']:
+            PostgresAdapter.get_columns_in_table(self.profile, 'analytics',
+                                                 table)
+
+        self.assertEqual(add_query.call_count, 1)
+
+        # once a table has been modified, only its columns are re-read
+        PostgresAdapter.cache_created_relation('analytics', 'events', 'table')
+        cursor.fetchall.return_value = [('id', 'integer', None)]
+
+        columns = PostgresAdapter.get_columns_in_table(self.profile,
+                                                       'analytics', 'events')
+
+        self.assertEqual([col.name for col in columns], ['id'])
+        self.assertEqual(add_query.call_count, 2)
+
+    @patch.object(PostgresAdapter, 'add_query')
+    @patch.object(PostgresAdapter, 'query_for_existing')
+    def test__rollback_clears_cache(self, query_for_existing, add_query):
+        add_query.return_value = (None, None)
+        query_for_existing.return_value = {'events': 'table'}
+
+        self.assertTrue(PostgresAdapter.table_exists(
+            self.profile, 'analytics', 'events'))
+
+        PostgresAdapter.drop(self.profile, 'events', 'table')
+        self.assertFalse(PostgresAdapter.table_exists(
+            self.profile, 'analytics', 'events'))
+
+        connection = {'name': 'events', 'transaction_open': True,
+                      'handle': MagicMock()}
+
+        with patch('dbt.flags.STRICT_MODE', False), \
+                patch.object(PostgresAdapter, 'reload',
+                             return_value=connection), \
+                patch.object(PostgresAdapter, 'find_pool'):
+            PostgresAdapter.rollback(connection)
+
+        connection['handle'].rollback.assert_called_once_with()
+
+        # the drop was rolled back, so the table is there after all
+        self.assertTrue(PostgresAdapter.table_exists(
+            self.profile, 'analytics', 'events'))
+        self.assertEqual(query_for_existing.call_count, 2)
+
+    @patch('dbt.runner.get_adapter')
+    def test__model_hooks_clear_cache(self, get_adapter):
+        get_adapter.return_value = PostgresAdapter
+
+        model = {
+            'name': 'orders',
+            'config': {
+                'enabled': True,
+                'materialized': 'view',
+                'pre-hook': [],
+                'post-hook': [],
+            },
+        }
+
+        dbt.adapters.default.relation_cache.set_relations(
+            'analytics', {'events': 'table'})
+
+        with patch.object(PostgresAdapter, 'execute_model'), \
+                patch.object(PostgresAdapter, 'add_query',
+                             return_value=(None, None)):
+            dbt.runner.execute_model(self.profile, model, {})
+
+            self.assertEqual(
+                PostgresAdapter.list_relations(self.profile, 'analytics'),
+                {'events': 'table', 'orders': 'view'})
+
+            model['config']['post-hook'] = ['drop table analytics.events']
+            dbt.runner.execute_model(self.profile, model, {})
+
+        self.assertIsNone(
+            dbt.adapters.default.relation_cache.get_relations('analytics'))
@@ -1,13 +1,42 @@
 from mock import MagicMock, patch
+import os
+import shutil
+import tempfile
 import unittest
 
 import dbt.flags
+import dbt.compilation
+import dbt.exceptions
+import dbt.linker
 import dbt.parser
 import dbt.runner
 
 from collections import OrderedDict
 
 
+def add_node(linker, flat_graph, unique_id, materialized='view',
+             depends_on=None, **kwargs):
+    """adds a node to both the linker and the flat graph. The node's type and
+    name are taken from its unique id, and `kwargs` are added to it."""
+    if depends_on is None:
+        depends_on = []
+
+    node = {
+        'unique_id': unique_id,
+        'name': unique_id.split('.')[-1],
+        'resource_type': unique_id.split('.')[0],
+        'config': {'materialized': materialized},
+        'depends_on': {'nodes': depends_on, 'macros': []},
+    }
+    node.update(kwargs)
+
+    linker.add_node(unique_id)
+    linker.update_node_data(unique_id, node)
+    flat_graph['nodes'][unique_id] = node
+
+    return node
+
+
 class TestRunner(unittest.TestCase):
 
     def setUp(self):
@@ -271,3 +300,457 @@ class TestRunner(unittest.TestCase):
         mock_adapter_truncate.assert_not_called()
         mock_adapter_rename.assert_called_once()
         mock_adapter_execute_model.assert_called_once()
+
+
+class TestNodeTimings(unittest.TestCase):
+
+    def setUp(self):
+        self.target_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.target_path)
+
+    def test__load_node_timings__missing_file(self):
+        self.assertEqual(dbt.runner.load_node_timings(self.target_path), {})
+
+    def test__write_node_timings__merges_results(self):
+        def result(unique_id, execution_time, **kwargs):
+            return dbt.runner.RunModelResult(
+                {'unique_id': unique_id},
+                execution_time=execution_time,
+                **kwargs)
+
+        dbt.runner.write_node_timings(self.target_path, [
+            result('model.root.a', 1.5),
+            result('model.root.b', 2.5),
+        ])
+
+        dbt.runner.write_node_timings(self.target_path, [
+            result('model.root.a', 3.0),
+            result('model.root.b', 9.0, skip=True),
+            result('model.root.c', 9.0, error='failed'),
+        ])
+
+        self.assertEqual(
+            dbt.runner.load_node_timings(self.target_path),
+            {'model.root.a': 3.0, 'model.root.b': 2.5})
+
+
+class LowMemoryTest(unittest.TestCase):
+
+    def setUp(self):
+        dbt.flags.STRICT_MODE = False
+
+        self.run_manager = dbt.runner.RunManager(
+            MagicMock(), None, MagicMock(threads=1, low_memory=True))
+        self.run_manager.compiler = MagicMock(expanded_ctes={
+            'model.root.ephemeral': OrderedDict(),
+        })
+
+        self.linker = dbt.linker.Linker()
+        self.flat_graph = {'nodes': {}, 'macros': {}}
+
+        for name, materialized in [('view', 'view'),
+                                   ('table', 'table')]:
+            add_node(self.linker, self.flat_graph,
+                     'model.root.{}'.format(name), materialized,
+                     compiled_sql='select 1',
+                     injected_sql='select 1',
+                     wrapped_sql='create view as (select 1)',
+                     build_path='build/root/{}.sql'.format(name))
+
+        # ephemeral models aren't written to the build directory
+        add_node(self.linker, self.flat_graph, 'model.root.ephemeral',
+                 'ephemeral', compiled_sql='select 1', injected_sql='select 1',
+                 extra_ctes=OrderedDict(), extra_ctes_injected=True)
+
+        self.linker.dependency('model.root.view', 'model.root.ephemeral')
+        self.linker.dependency('model.root.table', 'model.root.ephemeral')
+
+    def get_node(self, name):
+        return self.flat_graph['nodes']['model.root.{}'.format(name)]
+
+    def finish(self, name, consumers):
+        self.run_manager.free_finished_node(
+            self.linker, self.flat_graph, 'model.root.{}'.format(name),
+            consumers)
+
+    def test__free_finished_node__keeps_ephemeral_ctes_until_consumed(self):
+        consumers = self.run_manager.get_ephemeral_consumers(
+            self.linker, self.linker.nodes())
+        self.assertEqual(consumers, {'model.root.ephemeral': 2})
+
+        self.finish('ephemeral', consumers)
+        self.assertIn('model.root.ephemeral',
+                      self.run_manager.compiler.expanded_ctes)
+
+        self.finish('view', consumers)
+        self.assertIsNone(self.get_node('view')['wrapped_sql'])
+        self.assertIn('model.root.ephemeral',
+                      self.run_manager.compiler.expanded_ctes)
+
+        self.finish('table', consumers)
+        self.assertNotIn('model.root.ephemeral',
+                         self.run_manager.compiler.expanded_ctes)
+
+    def test__free_finished_node__keeps_ephemeral_sql(self):
+        consumers = self.run_manager.get_ephemeral_consumers(
+            self.linker, self.linker.nodes())
+
+        for name in ['ephemeral', 'view', 'table']:
+            self.finish(name, consumers)
+
+        # the ephemeral model has no build_path to read its sql back from,
+        # so it keeps it, and can still be expanded into a late consumer
+        self.assertEqual(self.get_node('ephemeral')['compiled_sql'],
+                         'select 1')
+
+        model = {
+            'unique_id': 'model.root.late',
+            'config': {'materialized': 'view'},
+            'compiled_sql': 'select * from __dbt__CTE__ephemeral',
+            'extra_ctes': OrderedDict([('model.root.ephemeral', None)]),
+        }
+
+        model, _ = dbt.compilation.prepend_ctes(model, self.flat_graph, {})
+        self.assertIn('__dbt__CTE__ephemeral as (\nselect 1\n)',
+                      model['injected_sql'])
+
+    def test__get_ephemeral_consumers__only_counts_selected_nodes(self):
+        consumers = self.run_manager.get_ephemeral_consumers(
+            self.linker, ['model.root.ephemeral', 'model.root.view'])
+        self.assertEqual(consumers, {'model.root.ephemeral': 1})
+
+
+@patch.object(dbt.runner.RunManager, 'node_context', return_value={})
+class InjectRuntimeConfigTest(unittest.TestCase):
+
+    def setUp(self):
+        self.run_manager = dbt.runner.RunManager(
+            MagicMock(), None, MagicMock(threads=1))
+
+    def test__unwrapped_sql_is_shared(self, node_context):
+        sql = ''.join(['select * from ', 'events'])
+        node = {'compiled_sql': sql, 'injected_sql': sql, 'wrapped_sql': sql}
+
+        node = self.run_manager.inject_runtime_config(node)
+
+        self.assertIs(node['wrapped_sql'], sql)
+
+    def test__rendered_sql_is_kept(self, node_context):
+        node = {
+            'compiled_sql': 'select 1',
+            'injected_sql': 'select 1',
+            'wrapped_sql': "create view x as (select {{ 'a' }})",
+        }
+
+        node = self.run_manager.inject_runtime_config(node)
+
+        self.assertEqual(node['wrapped_sql'], 'create view x as (select a)')
+
+
+class AncestorEphemeralNodesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.run_manager = dbt.runner.RunManager(
+            MagicMock(), None, MagicMock(threads=1))
+
+        self.linker = dbt.linker.Linker()
+        self.flat_graph = {'nodes': {}, 'macros': {}}
+
+        for unique_id, materialized in [
+                ('model.root.base', 'ephemeral'),
+                ('model.root.table', 'table'),
+                ('model.root.staging', 'ephemeral'),
+                ('model.root.nested', 'ephemeral'),
+                ('model.root.view', 'view'),
+                ('model.other.view', 'ephemeral')]:
+            add_node(self.linker, self.flat_graph, unique_id, materialized)
+
+        # base -> table -> staging -> nested -> view
+        self.linker.dependency('model.root.table', 'model.root.base')
+        self.linker.dependency('model.root.staging', 'model.root.table')
+        self.linker.dependency('model.root.nested', 'model.root.staging')
+        self.linker.dependency('model.root.view', 'model.root.nested')
+
+    def get_ancestor_ephemeral_nodes(self, selected_nodes):
+        return self.run_manager.get_ancestor_ephemeral_nodes(
+            self.flat_graph, self.linker.graph, set(selected_nodes))
+
+    def test__stops_at_non_ephemeral_nodes(self):
+        self.assertEqual(
+            self.get_ancestor_ephemeral_nodes(['model.root.view']),
+            set(['model.root.nested', 'model.root.staging']))
+
+        self.assertEqual(
+            self.get_ancestor_ephemeral_nodes(['model.root.table']),
+            set(['model.root.base']))
+
+        self.assertEqual(
+            self.get_ancestor_ephemeral_nodes(['model.root.view',
+                                               'model.root.table']),
+            set(['model.root.nested', 'model.root.staging',
+                 'model.root.base']))
+
+    def test__ignores_same_named_nodes_in_other_packages(self):
+        # model.other.view shares a name with the selected node
+        self.assertNotIn(
+            'model.other.view',
+            self.get_ancestor_ephemeral_nodes(['model.root.view']))
+
+
+class BatchSchemaTestsTest(unittest.TestCase):
+
+    def setUp(self):
+        dbt.flags.STRICT_MODE = False
+
+        self.run_manager = dbt.runner.RunManager(
+            MagicMock(), None, MagicMock(threads=2, low_memory=False,
+                                         batch_schema_tests=True))
+        self.run_manager.compiler = MagicMock()
+        self.run_manager.compiler.compile_node.side_effect = \
+            lambda node, flat_graph: node
+
+        self.linker = dbt.linker.Linker()
+        self.flat_graph = {'nodes': {}, 'macros': {}}
+
+        for model in ['a', 'b']:
+            self.add_node('model.root.{}'.format(model), set(), [])
+
+        for name, model, tags in [('not_null_a_id', 'a', {'schema'}),
+                                  ('unique_a_id', 'a', {'schema'}),
+                                  ('not_null_b_id', 'b', {'schema'}),
+                                  ('data_test_a', 'a', {'data'})]:
+            self.add_node('test.root.{}'.format(name), tags,
+                          ['model.root.{}'.format(model)])
+
+    def add_node(self, unique_id, tags, depends_on):
+        add_node(self.linker, self.flat_graph, unique_id,
+                 depends_on=depends_on, tags=tags,
+                 wrapped_sql='select count(*) from {};\n'.format(unique_id))
+
+    def test__get_batched_test_sql(self):
+        tests = [{'wrapped_sql': '\nselect count(*) from a;\n'},
+                 {'wrapped_sql': 'with x as (select 1) select count(*) '
+                                 'from x'}]
+
+        self.assertEqual(
+            dbt.runner.get_batched_test_sql(tests),
+            'select\n'
+            '(\nselect count(*) from a\n) as test_0,\n'
+            '(\nwith x as (select 1) select count(*) from x\n) as test_1')
+
+    @patch('dbt.runner.get_adapter')
+    @patch.object(dbt.runner.RunManager, 'inject_runtime_config',
+                  side_effect=lambda node: node)
+    def test__execute_nodes__batches_schema_tests_by_model(
+            self, inject_runtime_config, get_adapter):
+        tests = [node for node in self.linker.nodes()
+                 if node.startswith('test.')]
+
+        def execute_test_batch(profile, batch, connection_name):
+            return [len(batch)] * len(batch)
+
+        with patch('dbt.runner.execute_test_batch',
+                   side_effect=execute_test_batch) as batch_mock, \
+                patch('dbt.runner.execute_test',
+                      return_value=0) as single_mock:
+            results = self.run_manager.execute_nodes(
+                self.linker, self.flat_graph,
+                self.linker.as_ready_queue(tests, ephemeral_only=True),
+                MagicMock())
+
+        batches = sorted(sorted(test['name'] for test in call[0][1])
+                         for call in batch_mock.call_args_list)
+        self.assertEqual(batches, [['not_null_a_id', 'unique_a_id'],
+                                   ['not_null_b_id']])
+
+        # data tests still run on their own
+        self.assertEqual(single_mock.call_count, 1)
+
+        statuses = {result.node['name']: result.status for result in results}
+        self.assertEqual(statuses, {'not_null_a_id': 2, 'unique_a_id': 2,
+                                    'not_null_b_id': 1, 'data_test_a': 0})
+
+    @patch('dbt.runner.get_adapter')
+    @patch.object(dbt.runner.RunManager, 'inject_runtime_config',
+                  side_effect=lambda node: node)
+    def test__execute_nodes__failed_batch_runs_tests_one_at_a_time(
+            self, inject_runtime_config, get_adapter):
+        tests = ['test.root.not_null_a_id', 'test.root.unique_a_id']
+
+        with patch('dbt.runner.execute_test_batch',
+                   side_effect=RuntimeError('bad batch')), \
+                patch('dbt.runner.execute_test', return_value=3):
+            results = self.run_manager.execute_nodes(
+                self.linker, self.flat_graph,
+                self.linker.as_ready_queue(tests, ephemeral_only=True),
+                MagicMock())
+
+        self.assertEqual(sorted(result.node['name'] for result in results),
+                         ['not_null_a_id', 'unique_a_id'])
+        self.assertEqual([result.status for result in results], [3, 3])
+
+    @patch('dbt.runner.get_adapter')
+    def test__execute_test_batch__bad_results(self, get_adapter):
+        cursor = MagicMock()
+        get_adapter.return_value.execute_one.return_value = (None, cursor)
+        tests = [{'wrapped_sql': 'select 0'}, {'wrapped_sql': 'select 1'}]
+
+        cursor.fetchall.return_value = [(0, 1)]
+        self.assertEqual(
+            dbt.runner.execute_test_batch({}, tests, 'test_batch.a'), [0, 1])
+
+        cases = [
+            ([], 'Returned 0 rows instead of 1'),
+            ([(0, 1), (0, 1)], 'Returned 2 rows instead of 1'),
+            ([(0,)], 'Returned 1 cols instead of 2'),
+            ([(0, 1, 2)], 'Returned 3 cols instead of 2'),
+        ]
+
+        for rows, message in cases:
+            cursor.fetchall.return_value = rows
+
+            with self.assertRaises(RuntimeError) as context:
+                dbt.runner.execute_test_batch({}, tests, 'test_batch.a')
+
+            self.assertIn(message, str(context.exception))
+
+    def test__get_schema_test_batch_key(self):
+        self.add_node('test.root.relationships_a_id__id__b', {'schema'},
+                      ['model.root.a', 'model.root.b'])
+        self.add_node('test.root.accepted_values_a_x', {'schema'},
+                      ['model.root.a', 'model.root.a'])
+        self.add_node('test.root.no_refs', {'schema'}, [])
+
+        cases = [
+            ('test.root.not_null_a_id', 'model.root.a'),
+            ('test.root.not_null_b_id', 'model.root.b'),
+            ('test.root.accepted_values_a_x', 'model.root.a'),
+            ('test.root.relationships_a_id__id__b', None),
+            ('test.root.no_refs', None),
+            ('test.root.data_test_a', None),
+            ('model.root.a', None),
+        ]
+
+        for unique_id, expected in cases:
+            self.assertEqual(
+                dbt.runner.get_schema_test_batch_key(
+                    self.linker.get_node(unique_id)),
+                expected, unique_id)
+
+    @patch('dbt.runner.get_adapter')
+    @patch.object(dbt.runner.RunManager, 'inject_runtime_config',
+                  side_effect=lambda node: node)
+    def test__execute_nodes__tests_on_two_models_run_on_their_own(
+            self, inject_runtime_config, get_adapter):
+        # the test is listed against b first, but it's attached to a
+        self.add_node('test.root.relationships_a_id__id__b', {'schema'},
+                      ['model.root.b', 'model.root.a'])
+        tests = ['test.root.not_null_a_id', 'test.root.unique_a_id',
+                 'test.root.not_null_b_id',
+                 'test.root.relationships_a_id__id__b']
+
+        with patch('dbt.runner.execute_test_batch',
+                   side_effect=lambda profile, batch, name: [0] * len(batch)
+                   ) as batch_mock, \
+                patch('dbt.runner.execute_test',
+                      return_value=0) as single_mock:
+            results = self.run_manager.execute_nodes(
+                self.linker, self.flat_graph,
+                self.linker.as_ready_queue(tests, ephemeral_only=True),
+                MagicMock())
+
+        batches = sorted(sorted(test['name'] for test in call[0][1])
+                         for call in batch_mock.call_args_list)
+        self.assertEqual(batches, [['not_null_a_id', 'unique_a_id'],
+                                   ['not_null_b_id']])
+        self.assertEqual(
+            [call[0][1]['name'] for call in single_mock.call_args_list],
+            ['relationships_a_id__id__b'])
+        self.assertEqual(len(results), 4)
+
+    @patch('dbt.runner.get_adapter')
+    @patch.object(dbt.runner.RunManager, 'inject_runtime_config',
+                  side_effect=lambda node: node)
+    def test__execute_nodes__any_batch_error_runs_tests_one_at_a_time(
+            self, inject_runtime_config, get_adapter):
+        tests = ['test.root.not_null_a_id', 'test.root.unique_a_id']
+        errors = [
+            dbt.exceptions.CompilationException('bad compile'),
+            dbt.exceptions.InternalException('bad dbt'),
+            KeyError('bad key'),
+        ]
+
+        for error in errors:
+            with patch('dbt.runner.execute_test_batch', side_effect=error), \
+                    patch('dbt.runner.execute_test', return_value=3):
+                results = self.run_manager.execute_nodes(
+                    self.linker, self.flat_graph,
+                    self.linker.as_ready_queue(tests, ephemeral_only=True),
+                    MagicMock())
+
+            self.assertEqual(
+                sorted(result.node['name'] for result in results),
+                ['not_null_a_id', 'unique_a_id'], repr(error))
+            self.assertEqual([result.status for result in results], [3, 3],
+                             repr(error))
+
+    @patch('dbt.runner.get_adapter')
+    @patch.object(dbt.runner.RunManager, 'inject_runtime_config',
+                  side_effect=lambda node: node)
+    def test__execute_nodes__reraises_dbt_exceptions_from_workers(
+            self, inject_runtime_config, get_adapter):
+        tests = ['test.root.not_null_a_id', 'test.root.data_test_a']
+        error = dbt.exceptions.NotImplementedException('not here')
+
+        with patch('dbt.runner.execute_test_batch', side_effect=error), \
+                patch('dbt.runner.execute_test', side_effect=error):
+            with self.assertRaises(dbt.exceptions.NotImplementedException):
+                self.run_manager.execute_nodes(
+                    self.linker, self.flat_graph,
+                    self.linker.as_ready_queue(tests, ephemeral_only=True),
+                    MagicMock())
+
+    @patch('dbt.runner.get_adapter')
+    @patch.object(dbt.runner.RunManager, 'inject_runtime_config',
+                  side_effect=lambda node: node)
+    def test__execute_nodes__failing_test_skips_downstream_models(
+            self, inject_runtime_config, get_adapter):
+        self.add_node('model.root.c', set(), ['model.root.a'])
+        self.linker.dependency('model.root.c', 'model.root.a')
+
+        for node in self.linker.nodes():
+            for parent in self.flat_graph['nodes'][node]['depends_on'][
+                    'nodes']:
+                self.linker.dependency(node, parent)
+
+        selected = ['model.root.a', 'model.root.c',
+                    'test.root.not_null_a_id']
+        linker = self.linker.block_on_tests(['test.root.not_null_a_id'],
+                                            selected)
+
+        with patch('dbt.runner.execute_test_batch', return_value=[1]), \
+                patch('dbt.runner.execute_model',
+                      return_value='CREATE VIEW') as execute_model:
+            results = self.run_manager.execute_nodes(
+                linker, self.flat_graph,
+                linker.as_ready_queue(selected),
+                self.run_manager.on_model_failure(linker, selected))
+
+        self.assertEqual(execute_model.call_count, 1)
+
+        results = {result.node['name']: result for result in results}
+        self.assertTrue(results['not_null_a_id'].failed)
+        self.assertTrue(results['c'].skipped)
+
+    def test__on_model_failure__leaves_flat_graph_alone(self):
+        self.add_node('model.root.c', set(), ['model.root.a'])
+        self.linker.dependency('model.root.c', 'model.root.a')
+
+        on_failure = self.run_manager.on_model_failure(
+            self.linker, ['model.root.a', 'model.root.c'])
+        on_failure(self.linker.get_node('model.root.a'))
+
+        self.assertTrue(self.linker.get_node('model.root.c')['skip'])
+        self.assertNotIn('skip', self.flat_graph['nodes']['model.root.c'])
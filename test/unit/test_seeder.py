@@ -0,0 +1,528 @@
+from mock import ANY, MagicMock, call, patch
+from collections import namedtuple
+import datetime
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import dbt.flags  # noqa
+import dbt.parser  # noqa
+import dbt.adapters.factory  # noqa
+import dbt.source  # noqa
+import dbt.version  # noqa
+import multiprocessing.dummy  # noqa
+import psycopg2  # noqa
+import sqlalchemy.dialects.postgresql  # noqa
+
+from dbt.compat import text_type
+
+try:
+    import csvkit
+    from csvkit import sniffer, typeinference
+except ImportError:
+    # seed types are only inferred the same way by csvkit 0.9
+    csvkit = sniffer = typeinference = None
+
+# dbt.seeder reads seed files with csvkit 0.9, which none of these tests
+# need, so it's stubbed out while dbt.seeder is imported
+with patch.dict(sys.modules, {'csvkit': MagicMock()}):
+    import dbt.seeder
+
+
+def copied_data(cursor):
+    """returns the sql and the data of each COPY run on `cursor`"""
+    return [(args[0], args[1].getvalue().decode('utf-8'))
+            for args, _ in cursor.copy_expert.call_args_list]
+
+
+NoneType = type(None)
+
+FakeCsv = namedtuple('FakeCsv', ['name', 'filepath'])
+
+
+def use_csvkit(test):
+    """runs `test` with dbt.seeder using the real csvkit"""
+    test = patch.multiple(dbt.seeder, csvkit=csvkit, sniffer=sniffer,
+                          typeinference=typeinference)(test)
+
+    return unittest.skipIf(csvkit is None, 'needs csvkit 0.9')(test)
+
+
+class FormatCsvTest(unittest.TestCase):
+
+    def test__format_csv_value(self):
+        cases = [
+            (None, ''),
+            (u'', u'""'),
+            (u'plain', u'"plain"'),
+            (u'say "hi"', u'"say ""hi"""'),
+            (u'"', u'""""'),
+            (u'back\\slash\\', u'"back\\slash\\"'),
+            (u'two\nlines', u'"two\nlines"'),
+            (u'crlf\r\n', u'"crlf\r\n"'),
+            (u'a,b', u'"a,b"'),
+            (u'caf\xe9', u'"caf\xe9"'),
+            (1, u'"1"'),
+            (1.5, u'"1.5"'),
+            (True, u'"True"'),
+        ]
+
+        for value, expected in cases:
+            self.assertEqual(dbt.seeder.format_csv_value(value), expected,
+                             repr(value))
+
+    def test__format_csv_row(self):
+        self.assertEqual(
+            dbt.seeder.format_csv_row([1, None, u'', u'x']),
+            u'"1",,"","x"\n')
+
+
+class CopyRowsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.seeder = dbt.seeder.Seeder(MagicMock())
+        self.cursor = MagicMock()
+
+    def test__copy_rows(self):
+        rows = [
+            (1, u'say "hi"', None),
+            (2, u'', u'back\\slash'),
+            (3, u'two\nlines', u'caf\xe9'),
+        ]
+
+        self.seeder.copy_rows(self.cursor, 'schema', 'table',
+                              ['id', 'name', 'note'], rows)
+
+        self.assertEqual(copied_data(self.cursor), [(
+            'COPY "schema"."table" ("id", "name", "note") FROM STDIN '
+            'WITH CSV',
+            u'"1","say ""hi""",\n'
+            u'"2","","back\\slash"\n'
+            u'"3","two\nlines","caf\xe9"\n'
+        )])
+        self.cursor.execute.assert_not_called()
+
+    def test__copy_rows__all_nulls(self):
+        self.seeder.copy_rows(self.cursor, 'schema', 'table', ['a', 'b'],
+                              [(None, None), (None, u'')])
+
+        self.assertEqual(copied_data(self.cursor)[0][1], u',\n,""\n')
+
+    def test__insert_into_table__copies_each_chunk(self):
+        seed_file = MagicMock()
+        seed_file.get_rows.return_value = iter([[(1,), (2,)], [(3,)]])
+        columns = [dbt.seeder.SeedColumn('id')]
+
+        self.seeder.insert_into_table(self.cursor, 'schema', 'table',
+                                      seed_file, columns, use_copy=True)
+
+        seed_file.get_rows.assert_called_once_with(columns)
+        self.assertEqual([data for _, data in copied_data(self.cursor)],
+                         [u'"1"\n"2"\n', u'"3"\n'])
+        self.cursor.execute.assert_not_called()
+
+
+class InsertRowsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.seeder = dbt.seeder.Seeder(MagicMock())
+        self.cursor = MagicMock()
+
+    def executed(self):
+        return [args for args, _ in self.cursor.execute.call_args_list]
+
+    def test__insert_rows(self):
+        rows = [
+            (1, u'say "hi"', None),
+            (2, u'', u'back\\slash\nnewline'),
+        ]
+
+        self.seeder.insert_rows(self.cursor, 'schema', 'table',
+                                ['id', 'name', 'note'], rows)
+
+        # values are passed as they are, as query parameters
+        self.assertEqual(self.executed(), [(
+            'INSERT INTO "schema"."table" ("id", "name", "note") VALUES  '
+            '(%s, %s, %s),\n'
+            '(%s, %s, %s)',
+            [1, u'say "hi"', None, 2, u'', u'back\\slash\nnewline'],
+        )])
+        self.cursor.copy_expert.assert_not_called()
+
+    def test__insert_rows__escapes_percents_in_names(self):
+        self.seeder.insert_rows(self.cursor, 'sch%ema', 'ta%ble',
+                                ['100%'], [(u'50%',)])
+
+        self.assertEqual(self.executed(), [(
+            'INSERT INTO "sch%%ema"."ta%%ble" ("100%%") VALUES  (%s)',
+            [u'50%'],
+        )])
+
+    def test__insert_rows__batches(self):
+        rows = [(index, u'row {}'.format(index)) for index in range(5)]
+
+        with patch.object(dbt.seeder, 'INSERT_BATCH_SIZE', 2):
+            self.seeder.insert_rows(self.cursor, 'schema', 'table',
+                                    ['id', 'name'], rows)
+
+        executed = self.executed()
+        self.assertEqual(len(executed), 3)
+
+        for (sql, values), batch in zip(executed,
+                                        [rows[0:2], rows[2:4], rows[4:]]):
+            self.assertEqual(sql.count('(%s, %s)'), len(batch))
+            self.assertEqual(values, [value for row in batch
+                                      for value in row])
+
+    def test__insert_rows__exact_batch(self):
+        rows = [(index,) for index in range(4)]
+
+        with patch.object(dbt.seeder, 'INSERT_BATCH_SIZE', 2):
+            self.seeder.insert_rows(self.cursor, 'schema', 'table', ['id'],
+                                    rows)
+
+        self.assertEqual([values for _, values in self.executed()],
+                         [[0, 1], [2, 3]])
+
+    def test__insert_rows__no_rows(self):
+        self.seeder.insert_rows(self.cursor, 'schema', 'table', ['id'], [])
+
+        self.cursor.execute.assert_not_called()
+
+    def test__insert_into_table__inserts_each_chunk(self):
+        seed_file = MagicMock()
+        seed_file.get_rows.return_value = iter([[(1,), (2,)], [(3,)]])
+        columns = [dbt.seeder.SeedColumn('id')]
+
+        self.seeder.insert_into_table(self.cursor, 'schema', 'table',
+                                      seed_file, columns)
+
+        self.assertEqual([values for _, values in self.executed()],
+                         [[1, 2], [3]])
+        self.cursor.copy_expert.assert_not_called()
+
+
+class CombineTypesTest(unittest.TestCase):
+
+    def test__combine_types(self):
+        date = datetime.date
+        dt = datetime.datetime
+        time = datetime.time
+
+        cases = [
+            (None, int, int),
+            (None, NoneType, NoneType),
+            (NoneType, int, int),
+            (int, NoneType, int),
+            (NoneType, NoneType, NoneType),
+            (int, int, int),
+            (int, float, float),
+            (float, int, float),
+            (int, text_type, text_type),
+            (text_type, int, text_type),
+            (bool, int, text_type),
+            (bool, bool, bool),
+            (date, dt, dt),
+            (dt, date, dt),
+            (date, text_type, text_type),
+            (date, time, text_type),
+            (dt, time, text_type),
+            (float, date, text_type),
+        ]
+
+        for first, second, expected in cases:
+            self.assertIs(dbt.seeder.combine_types(first, second), expected,
+                          (first, second))
+
+
+class SeedColumnTest(unittest.TestCase):
+
+    # each column is split into chunks of two values, so every case has a
+    # type that only shows up after the first chunk
+    cases = [
+        ('int', ['1', '2', '3', '-4']),
+        ('int to float', ['1', '2', '3', '4.5']),
+        ('float to int', ['1.5', '2', '3', '4']),
+        ('int to text', ['1', '2', '3', 'x']),
+        ('bool to text', ['true', 'false', '1', '2']),
+        ('date to text', ['2017-01-01', '2017-01-02', 'hello', '']),
+        ('date to datetime', ['2017-01-01', '2017-01-02',
+                              '2017-01-03 12:00:00']),
+        ('date to time', ['2017-01-01', '', '12:00:00']),
+        ('all null', ['', '', '', '']),
+        ('nulls then int', ['', 'NULL', '', '3']),
+        ('mixed nulls', ['1', '', 'n/a', '2', '', '1.5']),
+        ('nulls then text', ['', '', 'abc', 'de']),
+    ]
+
+    def infer_in_chunks(self, values, chunk_size=2):
+        column = dbt.seeder.SeedColumn('column')
+
+        for start in range(0, len(values), chunk_size):
+            column.update(values[start:start + chunk_size])
+
+        return column
+
+    @use_csvkit
+    def test__update__matches_whole_column(self):
+        for name, values in self.cases:
+            # csvkit replaces null-like values in the list it's given
+            expected_type, expected_values = \
+                typeinference.normalize_column_type(list(values))
+
+            column = self.infer_in_chunks(list(values))
+
+            self.assertIs(column.type, expected_type, name)
+            self.assertEqual(column.normalize(list(values)),
+                             expected_values, name)
+            self.assertEqual(column.has_nulls, None in expected_values,
+                             name)
+
+            if expected_type is int:
+                ints = [value for value in expected_values
+                        if value is not None]
+                self.assertEqual(column.min_value, min(ints), name)
+                self.assertEqual(column.max_value, max(ints), name)
+
+    @use_csvkit
+    def test__update__max_length(self):
+        column = self.infer_in_chunks(['a', '', 'abcd', 'ab'])
+
+        self.assertIs(column.type, text_type)
+        self.assertEqual(column.max_length, 4)
+        self.assertTrue(column.has_nulls)
+
+    def test__empty_name(self):
+        self.assertEqual(dbt.seeder.SeedColumn('').name, '_unnamed')
+
+
+class SeedFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'seed.csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_csv(self, rows):
+        with open(self.path, 'w') as fh:
+            fh.write('\n'.join(','.join(row) for row in rows) + '\n')
+
+    @use_csvkit
+    def test__infer_columns__matches_whole_file(self):
+        columns = {
+            'id': ['1', '2', '3', '4', '5'],
+            'amount': ['1', '2', '3', '4', '5.5'],
+            'code': ['1', '2', '', '4', 'x'],
+            'day': ['2017-01-01', '2017-01-02', '2017-01-03', '', 'never'],
+            'empty': ['', '', '', '', ''],
+            'late': ['', '', '', '', '7'],
+        }
+        headers = sorted(columns)
+        self.write_csv([headers] +
+                       list(zip(*[columns[header] for header in headers])))
+
+        with patch.object(dbt.seeder, 'CHUNK_SIZE', 2):
+            seed_file = dbt.seeder.SeedFile(self.path)
+            inferred = seed_file.infer_columns()
+            rows = [row for chunk in seed_file.get_rows(inferred)
+                    for row in chunk]
+
+        expected = [typeinference.normalize_column_type(columns[header])
+                    for header in headers]
+
+        self.assertEqual([column.name for column in inferred], headers)
+        self.assertEqual([column.type for column in inferred],
+                         [column_type for column_type, _ in expected])
+        expected_rows = zip(*[values for _, values in expected])
+        self.assertEqual(rows, list(expected_rows))
+        self.assertEqual(seed_file.num_rows, 5)
+
+
+class SeedCsvTest(unittest.TestCase):
+
+    def setUp(self):
+        self.project = MagicMock()
+        self.profile = {'type': 'postgres', 'threads': 4}
+        self.project.run_environment.return_value = self.profile
+
+        self.seeder = dbt.seeder.Seeder(self.project)
+        self.adapter = MagicMock()
+        self.adapter.get_default_schema.return_value = 'schema'
+
+        # each file's hash is the file's name, with a suffix for the files
+        # that have changed since they were last loaded
+        self.changed = set()
+        self.hashes = {}
+
+        patches = [
+            patch.object(dbt.seeder, 'get_adapter',
+                         return_value=self.adapter),
+            patch.object(dbt.seeder, 'get_seed_hash',
+                         side_effect=self.get_seed_hash),
+            patch.object(self.seeder, 'do_seed'),
+        ]
+
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def get_seed_hash(self, path):
+        if path in self.changed:
+            return path + ' (changed)'
+
+        return path
+
+    def add_csv(self, name, changed=False):
+        csv = FakeCsv(name, '{}.csv'.format(name))
+
+        if changed:
+            self.changed.add(csv.filepath)
+
+        return csv
+
+    def seeded(self):
+        return [args[2].name for args, _
+                in self.seeder.do_seed.call_args_list]
+
+    def test__existing_tables(self):
+        cursor = MagicMock()
+        cursor.fetchall.return_value = [
+            ('loaded', 'dbt seed: abc123'),
+            ('not_commented', None),
+            ('commented', 'a table someone commented'),
+            ('empty_hash', 'dbt seed: '),
+        ]
+
+        existing = self.seeder.existing_tables(cursor, 'schema')
+
+        self.assertEqual(existing, {
+            'loaded': 'abc123',
+            'not_commented': None,
+            'commented': None,
+            'empty_hash': '',
+        })
+
+        sql = cursor.execute.call_args[0][0]
+        self.assertIn('pg_description', sql)
+        self.assertIn("n.nspname = 'schema'", sql)
+        self.assertIn("c.relkind = 'r'", sql)
+
+    def test__seed_csv__skips_unchanged_file(self):
+        csv = self.add_csv('unchanged')
+
+        self.seeder.seed_csv(self.profile, 'schema', csv,
+                             {'unchanged': 'unchanged.csv'}, False)
+
+        self.seeder.do_seed.assert_not_called()
+        self.adapter.get_connection.assert_not_called()
+
+    def test__seed_csv__reloads_changed_file(self):
+        csv = self.add_csv('changed', changed=True)
+        existing = {'changed': 'changed.csv'}
+
+        self.seeder.seed_csv(self.profile, 'schema', csv, existing, False)
+
+        self.seeder.do_seed.assert_called_once_with(
+            'schema', ANY, csv, 'changed.csv (changed)', existing, False,
+            True)
+        self.adapter.get_connection.assert_called_once_with(
+            self.profile, 'seed.changed')
+        self.adapter.release_connection.assert_called_once_with(
+            self.profile, 'seed.changed')
+
+    def test__seed_csv__loads_new_and_unhashed_tables(self):
+        self.seeder.seed_csv(self.profile, 'schema', self.add_csv('new'),
+                             {}, False)
+        self.seeder.seed_csv(self.profile, 'schema',
+                             self.add_csv('unhashed'), {'unhashed': None},
+                             False)
+
+        self.assertEqual(self.seeded(), ['new', 'unhashed'])
+
+    def test__seed_csv__drop_existing_reloads_unchanged_file(self):
+        csv = self.add_csv('unchanged')
+
+        self.seeder.seed_csv(self.profile, 'schema', csv,
+                             {'unchanged': 'unchanged.csv'}, True)
+
+        self.assertEqual(self.seeded(), ['unchanged'])
+
+    def test__seed_csv__releases_connection_on_error(self):
+        self.seeder.do_seed.side_effect = RuntimeError('boom')
+
+        with self.assertRaises(RuntimeError):
+            self.seeder.seed_csv(self.profile, 'schema',
+                                 self.add_csv('broken'), {}, False)
+
+        self.adapter.release_connection.assert_called_once_with(
+            self.profile, 'seed.broken')
+
+    def run_seed(self, csvs, existing, **kwargs):
+        with patch.object(self.seeder, 'find_csvs', return_value=csvs), \
+             patch.object(self.seeder, 'existing_tables',
+                          return_value=existing), \
+             patch.object(dbt.seeder, 'ThreadPool',
+                          wraps=dbt.seeder.ThreadPool) as thread_pool:
+            self.seeder.seed(**kwargs)
+
+        return thread_pool
+
+    def test__seed__skips_unchanged_files(self):
+        csvs = [
+            self.add_csv('unchanged'),
+            self.add_csv('changed', changed=True),
+            self.add_csv('new'),
+            self.add_csv('also_unchanged'),
+        ]
+        existing = {
+            'unchanged': 'unchanged.csv',
+            'changed': 'changed.csv',
+            'also_unchanged': 'also_unchanged.csv',
+            'not_a_seed': None,
+        }
+
+        thread_pool = self.run_seed(csvs, existing)
+
+        thread_pool.assert_called_once_with(4)
+        self.assertEqual(sorted(self.seeded()), ['changed', 'new'])
+
+        # only the files that are loaded take a connection of their own
+        self.assertEqual(
+            sorted(self.adapter.get_connection.call_args_list[1:]),
+            [call(self.profile, 'seed.changed'),
+             call(self.profile, 'seed.new')])
+        self.assertEqual(self.adapter.release_connection.call_count, 3)
+
+    def test__seed__drop_existing_reloads_everything(self):
+        csvs = [self.add_csv('unchanged'), self.add_csv('new')]
+
+        self.run_seed(csvs, {'unchanged': 'unchanged.csv'},
+                      drop_existing=True)
+
+        self.assertEqual(sorted(self.seeded()), ['new', 'unchanged'])
+
+    def test__seed__threads(self):
+        csvs = [self.add_csv('first'), self.add_csv('second')]
+
+        thread_pool = self.run_seed(csvs, {}, threads=1)
+
+        thread_pool.assert_called_once_with(1)
+        self.assertEqual(self.seeded(), ['first', 'second'])
+
+        # the profile the connections are taken with is sized the same
+        profile = self.adapter.get_connection.call_args[0][0]
+        self.assertEqual(profile['threads'], 1)
+        self.assertEqual(self.profile['threads'], 4)
+
+    def test__seed__last_file_with_a_name_wins(self):
+        first = FakeCsv('seed', 'first/seed.csv')
+        last = FakeCsv('seed', 'last/seed.csv')
+
+        self.run_seed([first, last], {})
+
+        self.assertEqual([args[2] for args, _
+                          in self.seeder.do_seed.call_args_list], [last])
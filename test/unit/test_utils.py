@@ -0,0 +1,88 @@
+import unittest
+
+import dbt.flags  # noqa
+import dbt.utils
+
+
+class NameIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.flat_graph = {
+            'nodes': {
+                'model.root.events': {'name': 'events'},
+                'model.root.users': {'name': 'users'},
+                'model.snowplow.events': {'name': 'snowplow events'},
+                'test.root.events': {'name': 'events test'},
+            },
+            'macros': {
+                'macro.root.my_macro': {'name': 'my_macro'},
+            }
+        }
+
+    def find_model(self, name, package, index):
+        return dbt.utils.find_model_by_name(self.flat_graph, name, package,
+                                            index)
+
+    def test__find_by_name__matches_scan(self):
+        index = dbt.utils.NameIndex(self.flat_graph['nodes'])
+
+        for (name, package) in [('events', 'root'),
+                                ('events', 'snowplow'),
+                                ('users', None),
+                                ('users', 'snowplow'),
+                                ('missing', None)]:
+            self.assertEqual(self.find_model(name, package, index),
+                             self.find_model(name, package, None))
+
+    def test__find_by_name__ignores_other_resource_types(self):
+        index = dbt.utils.NameIndex(self.flat_graph['nodes'])
+
+        self.assertIsNone(index.find(dbt.utils.NodeType.Model, 'my_macro'))
+        self.assertEqual(
+            dbt.utils.find_macro_by_name(
+                self.flat_graph, 'my_macro', None,
+                dbt.utils.NameIndex(self.flat_graph['macros'])),
+            {'name': 'my_macro'})
+
+    def test__find_by_name__sees_added_and_replaced_nodes(self):
+        index = dbt.utils.NameIndex(self.flat_graph['nodes'])
+
+        self.flat_graph['nodes']['model.root.orders'] = {'name': 'orders'}
+        self.assertEqual(self.find_model('orders', None, index),
+                         {'name': 'orders'})
+
+        self.flat_graph['nodes']['model.root.users'] = {'name': 'new users'}
+        self.assertEqual(self.find_model('users', 'root', index),
+                         {'name': 'new users'})
+
+    def test__find_by_name__rebuilds_stale_index(self):
+        index = dbt.utils.NameIndex(self.flat_graph['nodes'])
+
+        del self.flat_graph['nodes']['model.root.users']
+        self.flat_graph['nodes']['model.root.orders'] = {'name': 'orders'}
+
+        self.assertIsNone(self.find_model('users', None, index))
+        self.assertEqual(self.find_model('orders', None, index),
+                         {'name': 'orders'})
+
+    def test__find_by_name__sees_swapped_nodes(self):
+        index = dbt.utils.NameIndex(self.flat_graph['nodes'])
+
+        del self.flat_graph['nodes']['model.root.users']
+        self.flat_graph['nodes']['model.root.orders'] = {'name': 'orders'}
+
+        # the graph is the same size, so only the keys show the swap
+        self.assertEqual(self.find_model('orders', None, index),
+                         {'name': 'orders'})
+        self.assertIsNone(self.find_model('users', None, index))
+        self.assertNotIn('model.root.users', index.unique_ids)
+
+    def test__sync__removes_nodes(self):
+        index = dbt.utils.NameIndex(self.flat_graph['nodes'])
+
+        del self.flat_graph['nodes']['model.snowplow.events']
+        index.sync(self.flat_graph['nodes'])
+
+        self.assertEqual(index.by_name[('model', 'events')],
+                         ['model.root.events'])
+        self.assertIsNone(index.find('model', 'events', 'snowplow'))